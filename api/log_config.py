@@ -0,0 +1,172 @@
+"""Logging setup for the Voting API.
+
+Handlers only put records on an in-process queue; a listener thread
+formats them and writes them to stdout, so request handlers never wait
+on log I/O. Fields passed with ``extra`` are appended to the message as
+key=value pairs.
+
+Hot paths do not log every request at INFO. They count requests in an
+EventSummary, which logs one INFO line per LOG_SUMMARY_INTERVAL_S, and
+log single requests at INFO only for a LOG_SAMPLE_RATE fraction of them
+(the uvicorn access log is sampled the same way).
+"""
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+from collections import Counter
+from typing import Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# Fraction of hot-path requests logged individually at INFO (0 to 1)
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0"))
+# Seconds between hot-path summary lines
+LOG_SUMMARY_INTERVAL_S = float(os.getenv("LOG_SUMMARY_INTERVAL_S", "10"))
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+# Attributes every LogRecord has; anything else was passed in extra
+# (except uvicorn's color_message, an ANSI-coloured copy of the message)
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {
+    "message",
+    "asctime",
+    "color_message",
+}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_summaries: list["EventSummary"] = []
+
+
+class StructuredFormatter(logging.Formatter):
+    """Formatter appending the extra fields of a record as key=value pairs."""
+
+    def formatMessage(self, record: logging.LogRecord) -> str:
+        line = super().formatMessage(record)
+        fields = " ".join(
+            f"{key}={value}"
+            for key, value in vars(record).items()
+            if key not in _RECORD_ATTRIBUTES
+        )
+        return f"{line} {fields}" if fields else line
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler leaving all formatting to the listener thread.
+
+    The queue never leaves the process, so records need not be rendered
+    to plain strings before they are queued.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class _SampleFilter(logging.Filter):
+    """Pass a LOG_SAMPLE_RATE fraction of records."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return sampled()
+
+
+def sampled() -> bool:
+    """Decide whether to log a single hot-path event at INFO.
+
+    Returns:
+        True for a LOG_SAMPLE_RATE fraction of calls
+    """
+    return LOG_SAMPLE_RATE > 0 and random.random() < LOG_SAMPLE_RATE
+
+
+class EventSummary:
+    """Count hot-path events and log them as one INFO line per interval.
+
+    The interval is checked as events are added, so a quiet period logs
+    nothing; the app calls flush_summaries() on shutdown for the rest.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        message: str,
+        interval_s: float = LOG_SUMMARY_INTERVAL_S,
+    ):
+        self._logger = logger
+        self._message = message
+        self._interval_s = interval_s
+        self._counts: Counter = Counter()
+        self._started = time.monotonic()
+        _summaries.append(self)
+
+    def add(self, **counts: int) -> None:
+        """Count events, logging the summary if the interval has passed.
+
+        Args:
+            **counts: Number of events per summary field
+        """
+        self._counts.update(counts)
+        if time.monotonic() - self._started >= self._interval_s:
+            self.flush()
+
+    def flush(self) -> None:
+        """Log the counts so far, if any, and start a new interval."""
+        now = time.monotonic()
+        if self._counts:
+            self._logger.info(
+                self._message,
+                extra={**self._counts, "interval_s": round(now - self._started, 1)},
+            )
+        self._counts = Counter()
+        self._started = now
+
+
+def flush_summaries() -> None:
+    """Log every pending event summary."""
+    for summary in _summaries:
+        summary.flush()
+
+
+def setup_logging() -> None:
+    """Route all logging through a queue to a stdout listener thread.
+
+    Replaces the root handlers and those uvicorn installs on its own
+    loggers, so every record is written by the listener. Safe to call
+    more than once.
+    """
+    global _listener
+
+    if _listener is not None:
+        return
+
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(StructuredFormatter(LOG_FORMAT))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(log_queue, handler)
+
+    root = logging.getLogger()
+    root.handlers = [_DeferredQueueHandler(log_queue)]
+    root.setLevel(getattr(logging, LOG_LEVEL.upper(), logging.INFO))
+
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+    logging.getLogger("uvicorn.access").addFilter(_SampleFilter())
+
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """Write out every record still queued and stop the listener."""
+    global _listener
+
+    if _listener is None:
+        return
+
+    _listener.stop()
+    _listener = None
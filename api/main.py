@@ -2,6 +2,7 @@
 Voting API - Cats vs Dogs
 FastAPI application for voting system with Redis Streams
 """
+import asyncio
 import logging
 import os
 from contextlib import asynccontextmanager
@@ -9,19 +10,19 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from log_config import flush_summaries, setup_logging
 from redis_client import init_redis, close_redis
 from db_client import init_db, close_db
 from routes.vote import router as vote_router
 from routes.results import router as results_router
+from services import results_listener, results_service, results_stream
 from middleware.security import (
     SecurityHeadersMiddleware,
     RequestSizeLimitMiddleware,
 )
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+# Configure logging (queued, written by a background thread)
+setup_logging()
 logger = logging.getLogger(__name__)
 
 
@@ -40,13 +41,26 @@ async def lifespan(app: FastAPI):
         await init_db()
         logger.info("PostgreSQL initialized successfully")
     except Exception as e:
-        logger.error(f"Failed to initialize services: {e}")
+        logger.error("Failed to initialize services", extra={"error": str(e)})
         raise
 
+    # Keep the results cache up to date from the consumer's notifications
+    listener = None
+    if results_service.CACHE_PUSH_TTL_SECONDS > 0:
+        listener = asyncio.create_task(results_listener.listen())
+
     yield
 
     # Shutdown
     logger.info("Shutting down Voting API")
+    flush_summaries()
+    if listener is not None:
+        listener.cancel()
+        try:
+            await listener
+        except asyncio.CancelledError:
+            pass
+    await results_stream.close()
     await close_redis()
     await close_db()
 
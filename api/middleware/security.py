@@ -78,8 +78,8 @@ class RequestSizeLimitMiddleware(BaseHTTPMiddleware):
 
             if content_length > MAX_REQUEST_SIZE:
                 logger.warning(
-                    f"Request rejected: size {content_length} bytes "
-                    f"exceeds limit {MAX_REQUEST_SIZE} bytes"
+                    "Request rejected: body too large",
+                    extra={"size": content_length, "limit": MAX_REQUEST_SIZE},
                 )
                 return JSONResponse(
                     status_code=413,
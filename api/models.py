@@ -65,3 +65,35 @@ class VoteResults(BaseModel):
     cats_percentage: float = Field(..., ge=0, le=100)
     dogs_percentage: float = Field(..., ge=0, le=100)
     last_updated: datetime
+
+
+class VoteHistoryBucket(BaseModel):
+    """Votes cast during one history bucket.
+
+    Attributes:
+        bucket: Start of the bucket (UTC)
+        cats: Votes for cats in the bucket
+        dogs: Votes for dogs in the bucket
+        total: Votes in the bucket
+    """
+
+    bucket: datetime
+    cats: int = Field(..., ge=0)
+    dogs: int = Field(..., ge=0)
+    total: int = Field(..., ge=0)
+
+
+class VoteHistory(BaseModel):
+    """Response model for vote history endpoint.
+
+    Attributes:
+        step: Bucket size (minute or hour)
+        start: Start of the requested range
+        end: End of the requested range (exclusive)
+        buckets: Votes per bucket, oldest first, including empty buckets
+    """
+
+    step: Literal["minute", "hour"]
+    start: datetime
+    end: datetime
+    buckets: list[VoteHistoryBucket]
@@ -22,7 +22,7 @@ async def init_redis() -> None:
     global _redis_client
 
     redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
-    logger.info(f"Initializing Redis connection to {redis_url}")
+    logger.info("Initializing Redis connection", extra={"url": redis_url})
 
     try:
         pool = ConnectionPool.from_url(
@@ -34,7 +34,7 @@ async def init_redis() -> None:
         await _redis_client.ping()
         logger.info("Redis connection established successfully")
     except Exception as e:
-        logger.error(f"Failed to connect to Redis: {e}")
+        logger.error("Failed to connect to Redis", extra={"error": str(e)})
         raise ConnectionError(f"Redis connection failed: {e}")
 
 
@@ -76,5 +76,5 @@ async def check_redis_health() -> bool:
         await client.ping()
         return True
     except Exception as e:
-        logger.error(f"Redis health check failed: {e}")
+        logger.error("Redis health check failed", extra={"error": str(e)})
         return False
@@ -1,19 +1,57 @@
 """Results endpoint routes."""
-from fastapi import APIRouter, Depends, HTTPException, status, Response
+from datetime import datetime, timedelta, timezone
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status, Response
+from fastapi.responses import StreamingResponse
 import asyncpg
 import logging
 
-from models import VoteResults
+from log_config import EventSummary, sampled
+from models import VoteHistory, VoteResults
 from db_client import get_db
 from services.results_service import (
-    fetch_vote_results,
+    fetch_vote_history,
+    fetch_results_body,
     DatabaseUnavailableError,
 )
+from services import results_stream
 
 logger = logging.getLogger(__name__)
 
+# Requests per endpoint, logged once per summary interval
+results_summary = EventSummary(logger, "Results requests served")
+
 router = APIRouter(prefix="/api", tags=["results"])
 
+# Bucket length per history step
+HISTORY_STEPS = {"minute": timedelta(minutes=1), "hour": timedelta(hours=1)}
+# Default history range, and the most buckets one request may return
+DEFAULT_HISTORY_BUCKETS = 60
+MAX_HISTORY_BUCKETS = 1440
+
+RESULTS_CACHE_CONTROL = "public, max-age=2"
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an entity tag.
+
+    Uses the weak comparison RFC 9110 prescribes for If-None-Match.
+
+    Args:
+        if_none_match: If-None-Match header value, if any
+        etag: Current entity tag
+
+    Returns:
+        True if the client's copy is current
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(",")
+    )
+
 
 @router.get(
     "/results",
@@ -21,52 +59,194 @@ router = APIRouter(prefix="/api", tags=["results"])
     status_code=status.HTTP_200_OK,
     responses={
         200: {"description": "Current vote results"},
+        304: {"description": "Results unchanged since the If-None-Match ETag"},
         503: {"description": "Database service unavailable"},
         500: {"description": "Internal server error"},
     },
 )
 async def get_results(
-    response: Response, db_pool: asyncpg.Pool = Depends(get_db)
-) -> VoteResults:
+    if_none_match: Optional[str] = Header(None),
+    db_pool: asyncpg.Pool = Depends(get_db),
+) -> Response:
     """Get current voting results.
 
     Returns aggregated vote counts and percentages for cats vs dogs.
-    Results are cached for 2 seconds to reduce database load.
+    Results are cached for 2 seconds to reduce database load, together
+    with their encoded JSON body, which is returned as it is (the
+    response model only documents it). Each response carries an ETag;
+    a request whose If-None-Match still matches gets an empty 304
+    instead of the body.
+
+    Args:
+        if_none_match: ETag(s) of the client's cached results
+        db_pool: PostgreSQL connection pool (injected dependency)
+
+    Returns:
+        JSON vote results with counts and percentages, or an empty 304
+
+    Raises:
+        HTTPException: 503 if database is unavailable
+        HTTPException: 500 for other errors
+    """
+    try:
+        results, body, etag = await fetch_results_body(db_pool)
+        headers = {"ETag": etag, "Cache-Control": RESULTS_CACHE_CONTROL}
+
+        if etag_matches(if_none_match, headers["ETag"]):
+            results_summary.add(not_modified=1)
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        results_summary.add(results=1)
+        if sampled():
+            logger.info(
+                "Results returned",
+                extra={
+                    "cats": results.cats,
+                    "dogs": results.dogs,
+                    "total": results.total,
+                },
+            )
+        return Response(body, media_type="application/json", headers=headers)
+
+    except DatabaseUnavailableError as e:
+        results_summary.add(errors=1)
+        logger.error("Database unavailable", extra={"error": str(e)})
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Results service temporarily unavailable",
+        )
+
+    except Exception as e:
+        results_summary.add(errors=1)
+        logger.error("Unexpected error fetching results", extra={"error": str(e)})
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to fetch results",
+        )
+
+
+@router.get(
+    "/results/stream",
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "description": "Server-Sent Events with the results on every change",
+            "content": {"text/event-stream": {}},
+        },
+    },
+)
+async def stream_results(
+    db_pool: asyncpg.Pool = Depends(get_db),
+) -> StreamingResponse:
+    """Stream vote results as Server-Sent Events.
+
+    Sends a "results" event with the same body as GET /api/results on
+    connect and whenever the counts change. One poller per API process
+    reads the results for all connected clients.
+
+    Args:
+        db_pool: PostgreSQL connection pool (injected dependency)
+
+    Returns:
+        Streaming text/event-stream response
+    """
+    results_summary.add(streams=1)
+
+    return StreamingResponse(
+        results_stream.subscribe(db_pool),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Tell nginx-style proxies not to buffer the events
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+@router.get(
+    "/results/history",
+    response_model=VoteHistory,
+    status_code=status.HTTP_200_OK,
+    responses={
+        200: {"description": "Votes per minute or hour"},
+        400: {"description": "Invalid time range"},
+        503: {"description": "Database service unavailable"},
+        500: {"description": "Internal server error"},
+    },
+)
+async def get_results_history(
+    response: Response,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    step: Literal["minute", "hour"] = "minute",
+    db_pool: asyncpg.Pool = Depends(get_db),
+) -> VoteHistory:
+    """Get votes over time from the per-minute/per-hour rollups.
+
+    Defaults to the last 60 buckets. Times without a timezone are
+    treated as UTC.
 
     Args:
         response: FastAPI Response object for headers
+        start: Start of the range (query parameter "from")
+        end: End of the range, exclusive (query parameter "to")
+        step: Bucket size (minute or hour)
         db_pool: PostgreSQL connection pool (injected dependency)
 
     Returns:
-        Vote results with counts and percentages
+        Vote counts per bucket
 
     Raises:
+        HTTPException: 400 if the range is empty or has too many buckets
         HTTPException: 503 if database is unavailable
         HTTPException: 500 for other errors
     """
-    logger.info("Fetching vote results")
+    bucket = HISTORY_STEPS[step]
 
-    # Set cache control header
-    response.headers["Cache-Control"] = "public, max-age=2"
+    end = end or datetime.now(timezone.utc)
+    start = start or end - bucket * DEFAULT_HISTORY_BUCKETS
+    if start.tzinfo is None:
+        start = start.replace(tzinfo=timezone.utc)
+    if end.tzinfo is None:
+        end = end.replace(tzinfo=timezone.utc)
 
-    try:
-        results = await fetch_vote_results(db_pool)
-        logger.info(
-            f"Results returned: cats={results.cats}, "
-            f"dogs={results.dogs}, total={results.total}"
+    if start >= end:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'from' must be before 'to'",
         )
-        return results
+    if (end - start) / bucket > MAX_HISTORY_BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Range exceeds {MAX_HISTORY_BUCKETS} buckets of one {step}",
+        )
+
+    logger.debug(
+        "Fetching vote history", extra={"step": step, "from": start, "to": end}
+    )
+
+    # Rollups are updated continuously, same freshness as /results
+    response.headers["Cache-Control"] = RESULTS_CACHE_CONTROL
+
+    try:
+        history = await fetch_vote_history(db_pool, step, start, end)
+        results_summary.add(history=1)
+        return history
 
     except DatabaseUnavailableError as e:
-        logger.error(f"Database unavailable: {e}")
+        results_summary.add(errors=1)
+        logger.error("Database unavailable", extra={"error": str(e)})
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Results service temporarily unavailable",
         )
 
     except Exception as e:
-        logger.error(f"Unexpected error fetching results: {e}")
+        results_summary.add(errors=1)
+        logger.error(
+            "Unexpected error fetching vote history", extra={"error": str(e)}
+        )
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to fetch results",
+            detail="Failed to fetch vote history",
         )
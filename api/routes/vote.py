@@ -1,14 +1,18 @@
 """Vote endpoint routes."""
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from redis.asyncio import Redis
 import logging
 
+from log_config import EventSummary, sampled
 from models import VoteRequest, VoteResponse
 from redis_client import get_redis
 from services.vote_service import write_vote_to_stream, RedisUnavailableError
 
 logger = logging.getLogger(__name__)
 
+# Votes per option (and Redis failures), logged once per summary interval
+vote_summary = EventSummary(logger, "Votes recorded")
+
 router = APIRouter(prefix="/api", tags=["voting"])
 
 
@@ -23,12 +27,13 @@ router = APIRouter(prefix="/api", tags=["voting"])
     },
 )
 async def submit_vote(
-    vote: VoteRequest, redis_client: Redis = Depends(get_redis)
+    vote: VoteRequest, request: Request, redis_client: Redis = Depends(get_redis)
 ) -> VoteResponse:
     """Submit a vote for cats or dogs.
 
     Args:
         vote: Vote request containing option (cats or dogs)
+        request: Incoming request, source of the audit fields
         redis_client: Redis client (injected dependency)
 
     Returns:
@@ -37,13 +42,20 @@ async def submit_vote(
     Raises:
         HTTPException: 503 if Redis is unavailable
     """
-    logger.info(f"Received vote: option={vote.option}")
-
     try:
         # Write vote to Redis Stream
-        stream_id = await write_vote_to_stream(redis_client, vote.option)
+        stream_id = await write_vote_to_stream(
+            redis_client,
+            vote.option,
+            source_ip=request.client.host if request.client else None,
+            user_agent=request.headers.get("user-agent"),
+        )
 
-        logger.info(f"Vote recorded: option={vote.option}, stream_id={stream_id}")
+        vote_summary.add(**{vote.option: 1})
+        if sampled():
+            logger.info(
+                "Vote recorded", extra={"option": vote.option, "stream_id": stream_id}
+            )
 
         return VoteResponse(
             message="Vote recorded successfully",
@@ -52,7 +64,8 @@ async def submit_vote(
         )
 
     except RedisUnavailableError as e:
-        logger.error(f"Redis unavailable: {e}")
+        vote_summary.add(errors=1)
+        logger.error("Redis unavailable", extra={"error": str(e)})
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Voting service temporarily unavailable",
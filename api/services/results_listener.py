@@ -0,0 +1,75 @@
+"""Totals notifications from the consumer, applied to the results cache."""
+import asyncio
+import json
+from datetime import datetime, timezone
+import logging
+
+from redis_client import get_redis
+from services import results_service
+from services.vote_service import STREAM_NAME
+
+logger = logging.getLogger(__name__)
+
+# Must match the consumer (published after every committed batch)
+RESULTS_CHANNEL = f"{STREAM_NAME}:results"
+# Seconds between attempts to subscribe again after losing the subscription
+RESUBSCRIBE_DELAY_SECONDS = 1
+
+
+async def listen() -> None:
+    """Apply totals notifications to the results cache until cancelled.
+
+    While subscribed, the cache counts as up to date for
+    CACHE_PUSH_TTL_SECONDS; if the subscription is lost it falls back to
+    the short TTL until subscribed again.
+    """
+    while True:
+        try:
+            client = await get_redis()
+            async with client.pubsub() as pubsub:
+                await pubsub.subscribe(RESULTS_CHANNEL)
+                results_service.set_push_active(True)
+                logger.info(
+                    "Subscribed to results notifications",
+                    extra={"channel": RESULTS_CHANNEL},
+                )
+
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        handle_message(message["data"])
+
+        except Exception as e:
+            logger.warning(
+                "Results notifications unavailable", extra={"error": str(e)}
+            )
+
+        finally:
+            results_service.set_push_active(False)
+
+        await asyncio.sleep(RESUBSCRIBE_DELAY_SECONDS)
+
+
+def handle_message(data: str) -> None:
+    """Apply one totals notification to the results cache.
+
+    Args:
+        data: JSON object of option totals and "updated_at" (epoch ms)
+    """
+    try:
+        message = json.loads(data)
+        counts = {
+            option: int(message[option])
+            for option in ("cats", "dogs")
+            if option in message
+        }
+        updated_at = datetime.fromtimestamp(
+            message["updated_at"] / 1000, timezone.utc
+        )
+    except (ValueError, TypeError, KeyError) as e:
+        logger.warning(
+            "Ignoring malformed results notification", extra={"error": str(e)}
+        )
+        return
+
+    if results_service.apply_totals(counts, updated_at):
+        logger.debug("Results updated from notification", extra=counts)
@@ -1,18 +1,41 @@
 """Results service for fetching vote results."""
+import asyncio
+import hashlib
+import os
 import time
 from datetime import datetime
-from typing import Optional
+from typing import Callable, Literal, Optional
 import asyncpg
 import logging
 
-from models import VoteResults
+from models import VoteHistory, VoteHistoryBucket, VoteResults
 
 logger = logging.getLogger(__name__)
 
-# Simple in-memory cache
-_cache: Optional[dict] = None
-_cache_timestamp: float = 0
+# In-memory results cache: fresh for CACHE_TTL_SECONDS, then served for
+# CACHE_STALE_SECONDS more while one background query refreshes it, and
+# for up to CACHE_STALE_IF_ERROR_SECONDS in total while the database fails
 CACHE_TTL_SECONDS = 2
+CACHE_STALE_SECONDS = float(os.getenv("RESULTS_CACHE_STALE_S", "10"))
+CACHE_STALE_IF_ERROR_SECONDS = float(
+    os.getenv("RESULTS_CACHE_STALE_IF_ERROR_S", "300")
+)
+# While the consumer's totals notifications are received (see
+# results_listener), the cache is updated in place and only re-queried
+# after this long as a backstop (0 disables the notifications)
+CACHE_PUSH_TTL_SECONDS = float(os.getenv("RESULTS_CACHE_PUSH_TTL_S", "30"))
+
+_cache: Optional[VoteResults] = None
+_cache_timestamp: float = 0
+# The cached results, their JSON response body and its ETag, encoded once
+# per change
+_encoded: Optional[tuple[VoteResults, bytes, str]] = None
+# The one query refreshing the cache, shared by every request waiting on it
+_refresh: Optional[asyncio.Task] = None
+# Whether the cache is kept up to date by totals notifications
+_push_active = False
+# Called whenever the cached results change
+_update_callbacks: set[Callable[[], None]] = set()
 
 
 class ResultsServiceError(Exception):
@@ -28,10 +51,16 @@ class DatabaseUnavailableError(ResultsServiceError):
 
 
 async def fetch_vote_results(db_pool: asyncpg.Pool) -> VoteResults:
-    """Fetch current vote results from PostgreSQL.
+    """Fetch current vote results, from the cache where possible.
 
-    Uses get_vote_results() database function to retrieve aggregated counts.
-    Implements 2-second cache to reduce database load.
+    Results younger than CACHE_TTL_SECONDS (CACHE_PUSH_TTL_SECONDS while
+    totals notifications keep them up to date) are returned as they are.
+    For CACHE_STALE_SECONDS after that they are still returned at once,
+    while a background query refreshes them. Older results wait for a
+    query, and all concurrent requests share that one query, so the
+    database sees at most one get_vote_results() per API process however
+    many clients poll. If it fails, results up to
+    CACHE_STALE_IF_ERROR_SECONDS old are returned instead.
 
     Args:
         db_pool: PostgreSQL connection pool
@@ -40,16 +69,235 @@ async def fetch_vote_results(db_pool: asyncpg.Pool) -> VoteResults:
         VoteResults with current counts and percentages
 
     Raises:
-        DatabaseUnavailableError: If database operation fails
+        DatabaseUnavailableError: If database operation fails and no
+            recent enough results are cached
     """
-    global _cache, _cache_timestamp
+    age = time.monotonic() - _cache_timestamp
+    ttl = _cache_ttl()
 
-    # Check cache
-    current_time = time.time()
-    if _cache and (current_time - _cache_timestamp) < CACHE_TTL_SECONDS:
+    if _cache is not None and age < ttl:
         logger.debug("Returning cached results")
         return _cache
 
+    if _cache is not None and age < ttl + CACHE_STALE_SECONDS:
+        _start_refresh(db_pool)
+        logger.debug(
+            "Returning stale results while refreshing",
+            extra={"age_s": round(age, 1)},
+        )
+        return _cache
+
+    try:
+        # Shielded: a cancelled request must not cancel the shared query
+        return await asyncio.shield(_start_refresh(db_pool))
+
+    except DatabaseUnavailableError:
+        if _cache is not None and age < CACHE_STALE_IF_ERROR_SECONDS:
+            logger.warning(
+                "Returning stale results, database unavailable",
+                extra={"age_s": round(age, 1)},
+            )
+            return _cache
+        raise
+
+
+async def fetch_results_body(
+    db_pool: asyncpg.Pool,
+) -> tuple[VoteResults, bytes, str]:
+    """Fetch current vote results along with their encoded JSON body.
+
+    The body is encoded once per change of the cached results (with
+    pydantic's compiled serializer, the same output FastAPI produces for
+    the response model) and reused by every request until the next one,
+    so requests served from the cache do no validation or serialization.
+
+    Args:
+        db_pool: PostgreSQL connection pool
+
+    Returns:
+        Tuple of (results, UTF-8 JSON body, ETag of the body)
+
+    Raises:
+        DatabaseUnavailableError: If database operation fails and no
+            recent enough results are cached
+    """
+    global _encoded
+
+    results = await fetch_vote_results(db_pool)
+
+    if _encoded is None or _encoded[0] is not results:
+        body = results.model_dump_json().encode()
+        _encoded = (results, body, results_etag(body))
+
+    return _encoded
+
+
+def results_etag(body: bytes) -> str:
+    """Strong ETag of an encoded results body.
+
+    Derived from the body itself, so equal bodies get equal tags on every
+    API replica, and results with the same counts but different bytes
+    (e.g. last_updated from a notification rather than the database) do
+    not share one.
+
+    Args:
+        body: Encoded JSON body
+
+    Returns:
+        Quoted entity tag, e.g. '"3f2a9c0b7d1e4a56"'
+    """
+    return f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+
+
+def _cache_ttl() -> float:
+    """Seconds cached results are served without a query."""
+    return CACHE_PUSH_TTL_SECONDS if _push_active else CACHE_TTL_SECONDS
+
+
+def set_push_active(active: bool) -> None:
+    """Record whether totals notifications are being received.
+
+    On subscribing, results cached before it may have missed updates, so
+    they are marked expired (still served while one query refreshes them).
+
+    Args:
+        active: True once subscribed, False when the subscription is lost
+    """
+    global _push_active, _cache_timestamp
+
+    if active and not _push_active:
+        _cache_timestamp = min(
+            _cache_timestamp, time.monotonic() - CACHE_PUSH_TTL_SECONDS
+        )
+    _push_active = active
+
+
+def apply_totals(counts: dict[str, int], updated_at: datetime) -> bool:
+    """Update the cached results in place from a totals notification.
+
+    Totals only grow, so each option keeps the higher of its cached and
+    notified count; notifications arriving out of order (from concurrent
+    consumer writers) cannot move the results backwards. Options missing
+    from the notification keep their cached count. Without cached
+    results, only a notification carrying both options is used.
+
+    Args:
+        counts: Mapping of option to its new total
+        updated_at: Commit time of the batch
+
+    Returns:
+        True if the cached results changed
+    """
+    global _cache, _cache_timestamp
+
+    if _cache is None:
+        if not {"cats", "dogs"} <= counts.keys():
+            return False
+        cats, dogs = counts["cats"], counts["dogs"]
+    else:
+        cats = max(_cache.cats, counts.get("cats", 0))
+        dogs = max(_cache.dogs, counts.get("dogs", 0))
+
+    _cache_timestamp = time.monotonic()
+    if _cache is not None and (cats, dogs) == (_cache.cats, _cache.dogs):
+        return False
+
+    _cache = _build_results(cats, dogs, updated_at)
+    _notify_updated()
+
+    return True
+
+
+def _build_results(cats: int, dogs: int, last_updated: datetime) -> VoteResults:
+    """Build VoteResults from totals, computing the percentages.
+
+    Args:
+        cats: Vote count for cats
+        dogs: Vote count for dogs
+        last_updated: Timestamp of the last vote update
+
+    Returns:
+        VoteResults for the totals
+    """
+    total = cats + dogs
+    return VoteResults(
+        cats=cats,
+        dogs=dogs,
+        total=total,
+        cats_percentage=round(cats / total * 100, 2) if total else 0.0,
+        dogs_percentage=round(dogs / total * 100, 2) if total else 0.0,
+        last_updated=last_updated,
+    )
+
+
+def add_update_callback(callback: Callable[[], None]) -> None:
+    """Call callback whenever the cached results change.
+
+    Args:
+        callback: Function taking no arguments
+    """
+    _update_callbacks.add(callback)
+
+
+def remove_update_callback(callback: Callable[[], None]) -> None:
+    """Stop calling a callback added with add_update_callback().
+
+    Args:
+        callback: The function to remove
+    """
+    _update_callbacks.discard(callback)
+
+
+def _notify_updated() -> None:
+    """Call every update callback."""
+    for callback in list(_update_callbacks):
+        callback()
+
+
+def _start_refresh(db_pool: asyncpg.Pool) -> asyncio.Task:
+    """Start a results query unless one is already running.
+
+    Args:
+        db_pool: PostgreSQL connection pool
+
+    Returns:
+        The running query task
+    """
+    global _refresh
+
+    if _refresh is None or _refresh.done():
+        _refresh = asyncio.create_task(_query_vote_results(db_pool))
+        _refresh.add_done_callback(_refresh_done)
+
+    return _refresh
+
+
+def _refresh_done(task: asyncio.Task) -> None:
+    """Mark the error of a refresh nobody awaited as handled.
+
+    The query already logged it; without this, asyncio reports it again
+    when the task is garbage collected.
+    """
+    if not task.cancelled():
+        task.exception()
+
+
+async def _query_vote_results(db_pool: asyncpg.Pool) -> VoteResults:
+    """Query vote results from PostgreSQL and cache them.
+
+    Uses get_vote_results() database function to retrieve aggregated counts.
+
+    Args:
+        db_pool: PostgreSQL connection pool
+
+    Returns:
+        VoteResults with current counts and percentages
+
+    Raises:
+        DatabaseUnavailableError: If database operation fails
+    """
+    global _cache, _cache_timestamp
+
     try:
         # Call database function
         async with db_pool.acquire() as conn:
@@ -82,19 +330,88 @@ async def fetch_vote_results(db_pool: asyncpg.Pool) -> VoteResults:
             last_updated=last_updated,
         )
 
+        # A notification applied while the query ran may be newer than
+        # its snapshot (with COUNTER_MODE=redis, PostgreSQL always lags);
+        # totals only grow, so each option keeps the higher count
+        if _cache is not None and (
+            _cache.cats > cats_count or _cache.dogs > dogs_count
+        ):
+            if _cache.cats >= cats_count and _cache.dogs >= dogs_count:
+                vote_results = _cache
+            else:
+                vote_results = _build_results(
+                    max(_cache.cats, cats_count),
+                    max(_cache.dogs, dogs_count),
+                    last_updated,
+                )
+
         # Update cache
+        changed = vote_results is not _cache
         _cache = vote_results
-        _cache_timestamp = current_time
+        _cache_timestamp = time.monotonic()
+        if changed:
+            _notify_updated()
 
         logger.info(
-            f"Fetched vote results: cats={cats_count}, "
-            f"dogs={dogs_count}, total={total}"
+            "Fetched vote results",
+            extra={"cats": cats_count, "dogs": dogs_count, "total": total},
         )
 
         return vote_results
 
     except Exception as e:
-        logger.error(f"Failed to fetch vote results: {e}")
+        logger.error("Failed to fetch vote results", extra={"error": str(e)})
+        raise DatabaseUnavailableError(f"Database operation failed: {e}")
+
+
+async def fetch_vote_history(
+    db_pool: asyncpg.Pool,
+    step: Literal["minute", "hour"],
+    start: datetime,
+    end: datetime,
+) -> VoteHistory:
+    """Fetch votes per minute or hour from the rollup table.
+
+    Uses get_vote_history() database function, which reads only the
+    vote_rollups buckets in range, so cost grows with the number of
+    buckets rather than the number of votes.
+
+    Args:
+        db_pool: PostgreSQL connection pool
+        step: Bucket size (minute or hour)
+        start: Start of the range
+        end: End of the range (exclusive)
+
+    Returns:
+        VoteHistory with one entry per bucket
+
+    Raises:
+        DatabaseUnavailableError: If database operation fails
+    """
+    try:
+        async with db_pool.acquire() as conn:
+            rows = await conn.fetch(
+                "SELECT * FROM get_vote_history($1, $2, $3)", step, start, end
+            )
+
+        buckets = [
+            VoteHistoryBucket(
+                bucket=row["bucket"],
+                cats=row["cats"],
+                dogs=row["dogs"],
+                total=row["cats"] + row["dogs"],
+            )
+            for row in rows
+        ]
+
+        logger.debug(
+            "Fetched vote history", extra={"step": step, "buckets": len(buckets)}
+        )
+
+        return VoteHistory(step=step, start=start, end=end, buckets=buckets)
+
+    except Exception as e:
+        logger.error("Failed to fetch vote history", extra={"error": str(e)})
         raise DatabaseUnavailableError(f"Database operation failed: {e}")
 
 
@@ -103,7 +420,9 @@ def clear_cache() -> None:
 
     Useful for testing or manual cache invalidation.
     """
-    global _cache, _cache_timestamp
+    global _cache, _cache_timestamp, _encoded, _refresh
     _cache = None
     _cache_timestamp = 0
+    _encoded = None
+    _refresh = None
     logger.debug("Results cache cleared")
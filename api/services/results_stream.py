@@ -0,0 +1,175 @@
+"""Results stream: one poller per process fanning changes out to SSE clients."""
+import asyncio
+import os
+from typing import AsyncIterator, Optional
+import asyncpg
+import logging
+
+from services import results_service
+from services.results_service import DatabaseUnavailableError, fetch_results_body
+
+logger = logging.getLogger(__name__)
+
+# Most seconds between the poller's result checks (served from the results
+# cache); totals notifications wake it up at once
+POLL_INTERVAL_SECONDS = float(os.getenv("RESULTS_STREAM_POLL_S", "1"))
+# Undelivered events a client may fall behind by before it is disconnected
+CLIENT_BUFFER_SIZE = int(os.getenv("RESULTS_STREAM_BUFFER", "8"))
+# Seconds between comment lines keeping idle connections (and proxies) open
+KEEPALIVE_SECONDS = float(os.getenv("RESULTS_STREAM_KEEPALIVE_S", "15"))
+
+KEEPALIVE_EVENT = b": keepalive\n\n"
+
+# One bounded queue per connected client; None in a queue ends its stream
+_clients: set[asyncio.Queue] = set()
+_poller: Optional[asyncio.Task] = None
+# Latest results event, sent to clients as they connect
+_latest_event: Optional[bytes] = None
+
+
+async def subscribe(db_pool: asyncpg.Pool) -> AsyncIterator[bytes]:
+    """Stream results events to one client.
+
+    Yields the latest results at once, then every change the poller
+    detects, and a keepalive comment when nothing changed for
+    KEEPALIVE_SECONDS. The poller runs while at least one client is
+    connected. A client that falls CLIENT_BUFFER_SIZE events behind is
+    disconnected rather than buffered without bound; EventSource clients
+    reconnect and start again from the latest results.
+
+    Args:
+        db_pool: PostgreSQL connection pool
+
+    Yields:
+        Encoded Server-Sent Events
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=CLIENT_BUFFER_SIZE)
+    if _latest_event is not None:
+        queue.put_nowait(_latest_event)
+    _clients.add(queue)
+    _start_poller(db_pool)
+    logger.debug("Results stream client connected", extra={"clients": len(_clients)})
+
+    try:
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                event = KEEPALIVE_EVENT
+            if event is None:
+                return
+            yield event
+
+    finally:
+        _clients.discard(queue)
+        logger.debug(
+            "Results stream client disconnected", extra={"clients": len(_clients)}
+        )
+
+
+def _start_poller(db_pool: asyncpg.Pool) -> None:
+    """Start the poller unless it is already running.
+
+    Args:
+        db_pool: PostgreSQL connection pool
+    """
+    global _poller
+
+    if _poller is None or _poller.done():
+        _poller = asyncio.create_task(_poll(db_pool))
+
+
+async def _poll(db_pool: asyncpg.Pool) -> None:
+    """Publish results whenever they change, until no client is left.
+
+    Args:
+        db_pool: PostgreSQL connection pool
+    """
+    last_counts = None
+    # Set by the results cache on every change, so updates go out at once
+    updated = asyncio.Event()
+    results_service.add_update_callback(updated.set)
+
+    try:
+        while _clients:
+            # Cleared before reading, so no update can slip in unnoticed
+            updated.clear()
+            try:
+                results, body, _ = await fetch_results_body(db_pool)
+            except DatabaseUnavailableError:
+                # Already logged; clients keep the last results meanwhile
+                results = None
+
+            if results is not None and (results.cats, results.dogs) != last_counts:
+                last_counts = (results.cats, results.dogs)
+                # Same JSON body as GET /api/results
+                publish(b"event: results\ndata: " + body + b"\n\n")
+
+            try:
+                await asyncio.wait_for(updated.wait(), POLL_INTERVAL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    finally:
+        results_service.remove_update_callback(updated.set)
+
+
+def publish(event: bytes) -> None:
+    """Send one encoded event to every connected client.
+
+    The event is encoded once for all clients. Clients whose buffer is
+    full are disconnected.
+
+    Args:
+        event: Encoded Server-Sent Event
+    """
+    global _latest_event
+
+    _latest_event = event
+
+    evicted = 0
+    for queue in list(_clients):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            _end_stream(queue)
+            evicted += 1
+
+    if evicted:
+        logger.warning(
+            "Disconnected slow results stream clients",
+            extra={"evicted": evicted, "clients": len(_clients)},
+        )
+
+
+def _end_stream(queue: asyncio.Queue) -> None:
+    """Drop a client's undelivered events and end its stream.
+
+    Args:
+        queue: The client's event queue
+    """
+    _clients.discard(queue)
+    while not queue.empty():
+        queue.get_nowait()
+    queue.put_nowait(None)
+
+
+async def close() -> None:
+    """End every stream and stop the poller.
+
+    Called on application shutdown, so open connections do not hold it up.
+    """
+    global _poller, _latest_event
+
+    for queue in list(_clients):
+        _end_stream(queue)
+
+    if _poller is not None:
+        _poller.cancel()
+        try:
+            await _poller
+        except asyncio.CancelledError:
+            pass
+        _poller = None
+
+    _latest_event = None
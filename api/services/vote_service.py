@@ -1,12 +1,43 @@
 """Vote service for handling vote business logic."""
+import ipaddress
+import os
+import struct
 import time
 import uuid
+import zlib
 from typing import Literal
 from redis.asyncio import Redis
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Must match the consumer; >1 spreads votes over "<STREAM_NAME>:<n>" streams
+STREAM_NAME = os.getenv("STREAM_NAME", "votes")
+STREAM_PARTITIONS = int(os.getenv("STREAM_PARTITIONS", "1"))
+# Safety cap on entries per stream (approximate MAXLEN, 0 disables it); the
+# consumer trims acknowledged entries, this only bounds a stalled consumer
+STREAM_MAXLEN = int(os.getenv("STREAM_MAXLEN", "0"))
+
+# Longer User-Agent headers are truncated before they reach the stream
+USER_AGENT_MAX_LENGTH = 512
+
+# Stream entry format: "legacy" (one string field per value) or "compact"
+# (one binary field, see encode_vote). Consumers older than compact entries
+# drop them as malformed, so compact is opt-in once every consumer reads it
+STREAM_ENCODINGS = ("legacy", "compact")
+STREAM_ENCODING = os.getenv("STREAM_ENCODING", "legacy").lower()
+if STREAM_ENCODING not in STREAM_ENCODINGS:
+    raise ValueError(
+        f"STREAM_ENCODING must be 'legacy' or 'compact', not {STREAM_ENCODING!r}"
+    )
+
+# Compact entry: field name, format version and 1-byte option codes
+COMPACT_FIELD = "v"
+COMPACT_VERSION = 1
+OPTION_CODES = {"cats": 1, "dogs": 2}
+# version, option, timestamp (ms, uint64), request ID (UUID bytes)
+_COMPACT_HEADER = struct.Struct(">BBQ16s")
+
 
 class VoteServiceError(Exception):
     """Base exception for vote service errors."""
@@ -20,14 +51,75 @@ class RedisUnavailableError(VoteServiceError):
     pass
 
 
+def stream_for(request_id: str) -> str:
+    """Pick the vote stream partition for a request.
+
+    Args:
+        request_id: Unique request ID, hashed to spread votes evenly
+
+    Returns:
+        Redis Stream name
+    """
+    if STREAM_PARTITIONS <= 1:
+        return STREAM_NAME
+    partition = zlib.crc32(request_id.encode()) % STREAM_PARTITIONS
+    return f"{STREAM_NAME}:{partition}"
+
+
+def encode_vote(
+    option: Literal["cats", "dogs"],
+    timestamp: int,
+    request_id: uuid.UUID,
+    source_ip: str | None = None,
+    user_agent: str | None = None,
+) -> bytes:
+    """Pack a vote into a compact stream entry value.
+
+    Layout (big-endian): version (1 byte), option code (1 byte),
+    timestamp in milliseconds (8 bytes), request ID (16 bytes), source IP
+    length (1 byte: 0, 4 or 16) and packed address, User-Agent length
+    (2 bytes) and UTF-8 bytes.
+
+    Args:
+        option: Vote option (cats or dogs)
+        timestamp: Vote time in milliseconds since the epoch
+        request_id: Unique request ID
+        source_ip: Client IP address; omitted if not a valid address
+        user_agent: Client User-Agent header, truncated
+
+    Returns:
+        Encoded entry value
+    """
+    try:
+        packed_ip = ipaddress.ip_address(source_ip).packed if source_ip else b""
+    except ValueError:
+        packed_ip = b""
+    agent = (user_agent or "")[:USER_AGENT_MAX_LENGTH].encode()
+
+    return b"".join((
+        _COMPACT_HEADER.pack(
+            COMPACT_VERSION, OPTION_CODES[option], timestamp, request_id.bytes
+        ),
+        bytes((len(packed_ip),)),
+        packed_ip,
+        len(agent).to_bytes(2, "big"),
+        agent,
+    ))
+
+
 async def write_vote_to_stream(
-    redis_client: Redis, option: Literal["cats", "dogs"]
+    redis_client: Redis,
+    option: Literal["cats", "dogs"],
+    source_ip: str | None = None,
+    user_agent: str | None = None,
 ) -> str:
     """Write vote event to Redis Stream.
 
     Args:
         redis_client: Redis client instance
         option: Vote option (cats or dogs)
+        source_ip: Client IP address for the audit trail (optional)
+        user_agent: Client User-Agent header for the audit trail (optional)
 
     Returns:
         Redis Stream message ID
@@ -37,22 +129,48 @@ async def write_vote_to_stream(
     """
     try:
         # Generate unique request ID for tracking
-        request_id = str(uuid.uuid4())
+        request_uuid = uuid.uuid4()
+        request_id = str(request_uuid)
         timestamp = int(time.time() * 1000)  # Milliseconds
 
-        # Write to Redis Stream using XADD
-        message_id = await redis_client.xadd(
-            "votes",
-            {"option": option, "timestamp": str(timestamp), "request_id": request_id},
-        )
-
-        logger.info(
-            f"Vote written to stream: option={option}, "
-            f"request_id={request_id}, stream_id={message_id}"
+        if STREAM_ENCODING == "compact":
+            fields = {
+                COMPACT_FIELD: encode_vote(
+                    option, timestamp, request_uuid, source_ip, user_agent
+                )
+            }
+        else:
+            fields = {
+                "option": option,
+                "timestamp": str(timestamp),
+                "request_id": request_id,
+            }
+            # Audit fields, stored by the consumer in vote_events
+            if source_ip:
+                fields["source_ip"] = source_ip
+            if user_agent:
+                fields["user_agent"] = user_agent[:USER_AGENT_MAX_LENGTH]
+
+        stream = stream_for(request_id)
+        if STREAM_MAXLEN > 0:
+            message_id = await redis_client.xadd(
+                stream, fields, maxlen=STREAM_MAXLEN, approximate=True
+            )
+        else:
+            message_id = await redis_client.xadd(stream, fields)
+
+        logger.debug(
+            "Vote written to stream",
+            extra={
+                "option": option,
+                "request_id": request_id,
+                "stream": stream,
+                "stream_id": message_id,
+            },
         )
 
         return message_id
 
     except Exception as e:
-        logger.error(f"Failed to write vote to Redis Stream: {e}")
+        logger.error("Failed to write vote to Redis Stream", extra={"error": str(e)})
         raise RedisUnavailableError(f"Redis operation failed: {e}")
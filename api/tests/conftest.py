@@ -5,6 +5,11 @@ without actual Redis/PostgreSQL connections.
 """
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
+from fastapi.testclient import TestClient
+
+from db_client import get_db
+from main import app
+from services.results_service import clear_cache
 
 
 # Global patches for lifespan and dependency injection
@@ -41,3 +46,28 @@ def mock_redis_client():
 def mock_db_pool():
     """Mock PostgreSQL connection pool (function-scoped)."""
     return AsyncMock()
+
+
+@pytest.fixture(scope="function")
+def mock_db_conn():
+    """Mock PostgreSQL connection handed out by pooled_db (function-scoped)."""
+    return AsyncMock()
+
+
+@pytest.fixture(scope="function")
+def pooled_db(mock_db_conn):
+    """Mock PostgreSQL pool whose acquire() context yields mock_db_conn."""
+    pool = MagicMock()
+    pool.acquire.return_value.__aenter__ = AsyncMock(return_value=mock_db_conn)
+    pool.acquire.return_value.__aexit__ = AsyncMock(return_value=False)
+    return pool
+
+
+@pytest.fixture(scope="function")
+def db_app_client(pooled_db):
+    """Test client with get_db overridden by pooled_db and no cached results."""
+    clear_cache()
+    app.dependency_overrides[get_db] = lambda: pooled_db
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+    clear_cache()
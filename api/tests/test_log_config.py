@@ -0,0 +1,73 @@
+"""Unit tests for logging setup."""
+import logging
+from unittest.mock import MagicMock, patch
+
+import log_config
+
+
+def test_formatter_appends_extra_fields():
+    """Test fields passed in extra are appended as key=value pairs."""
+    formatter = log_config.StructuredFormatter("%(levelname)s - %(message)s")
+    record = logging.makeLogRecord(
+        {"levelname": "INFO", "msg": "Vote recorded", "option": "cats", "stream_id": "1-0"}
+    )
+
+    assert formatter.format(record) == "INFO - Vote recorded option=cats stream_id=1-0"
+
+
+def test_formatter_without_extra_fields():
+    """Test plain records are formatted unchanged."""
+    formatter = log_config.StructuredFormatter("%(levelname)s - %(message)s")
+    record = logging.makeLogRecord({"levelname": "INFO", "msg": "Starting"})
+
+    assert formatter.format(record) == "INFO - Starting"
+
+
+def test_formatter_skips_uvicorn_color_message():
+    """Test uvicorn's coloured copy of the message is not appended."""
+    formatter = log_config.StructuredFormatter("%(levelname)s - %(message)s")
+    record = logging.makeLogRecord({
+        "levelname": "INFO",
+        "msg": "Started server process",
+        "color_message": "Started server process \x1b[36m1\x1b[0m",
+    })
+
+    assert formatter.format(record) == "INFO - Started server process"
+
+
+def test_summary_logs_once_per_interval():
+    """Test events are counted and logged together after the interval."""
+    logger = MagicMock()
+    summary = log_config.EventSummary(logger, "Votes recorded", interval_s=60)
+
+    summary.add(cats=1)
+    summary.add(dogs=1)
+    summary.add(cats=1)
+    logger.info.assert_not_called()
+
+    summary.flush()
+
+    message = logger.info.call_args.args[0]
+    fields = logger.info.call_args.kwargs["extra"]
+    assert message == "Votes recorded"
+    assert fields["cats"] == 2
+    assert fields["dogs"] == 1
+
+
+def test_summary_skips_empty_interval():
+    """Test nothing is logged when no events were counted."""
+    logger = MagicMock()
+    summary = log_config.EventSummary(logger, "Votes recorded", interval_s=0)
+
+    summary.flush()
+
+    logger.info.assert_not_called()
+
+
+def test_sampled_follows_sample_rate():
+    """Test LOG_SAMPLE_RATE 0 logs nothing and 1 logs everything."""
+    with patch.object(log_config, "LOG_SAMPLE_RATE", 0):
+        assert not any(log_config.sampled() for _ in range(100))
+
+    with patch.object(log_config, "LOG_SAMPLE_RATE", 1):
+        assert all(log_config.sampled() for _ in range(100))
@@ -1,12 +1,12 @@
 """Unit tests for results endpoint."""
 import pytest
 from unittest.mock import AsyncMock, patch
-from datetime import datetime
+from datetime import datetime, timezone
 from fastapi import status
 from fastapi.testclient import TestClient
 
 from main import app
-from services.results_service import DatabaseUnavailableError
+from services.results_service import DatabaseUnavailableError, results_etag
 
 
 @pytest.fixture
@@ -105,7 +105,7 @@ async def test_get_results_database_unavailable():
     """Test results fetch when database is unavailable."""
     # Arrange
     with patch("routes.results.get_db", return_value=AsyncMock()), patch(
-        "routes.results.fetch_vote_results",
+        "routes.results.fetch_results_body",
         side_effect=DatabaseUnavailableError("DB down"),
     ):
         client = TestClient(app)
@@ -201,3 +201,120 @@ async def test_get_results_caching_works(mock_db_pool):
 
     # Cleanup
     clear_cache()
+
+
+def test_get_results_history_success(db_app_client, mock_db_conn):
+    """Test history returns one entry per rollup bucket."""
+    mock_db_conn.fetch.return_value = [
+        {"bucket": datetime(2025, 11, 15, 12, 0, tzinfo=timezone.utc),
+         "cats": 3, "dogs": 1},
+        {"bucket": datetime(2025, 11, 15, 12, 1, tzinfo=timezone.utc),
+         "cats": 0, "dogs": 0},
+    ]
+
+    response = db_app_client.get(
+        "/api/results/history",
+        params={"from": "2025-11-15T12:00:00Z", "to": "2025-11-15T12:02:00Z"},
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert data["step"] == "minute"
+    assert [b["total"] for b in data["buckets"]] == [4, 0]
+    assert mock_db_conn.fetch.call_args.args[1] == "minute"
+
+
+def test_get_results_history_rejects_empty_range(db_app_client):
+    """Test 'from' after 'to' returns 400."""
+    response = db_app_client.get(
+        "/api/results/history",
+        params={"from": "2025-11-15T13:00:00Z", "to": "2025-11-15T12:00:00Z"},
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_get_results_history_rejects_too_many_buckets(db_app_client):
+    """Test ranges beyond the bucket limit return 400."""
+    response = db_app_client.get(
+        "/api/results/history",
+        params={
+            "from": "2025-11-01T00:00:00Z",
+            "to": "2025-11-15T00:00:00Z",
+            "step": "minute",
+        },
+    )
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_get_results_history_invalid_step(db_app_client):
+    """Test unknown step returns 422."""
+    response = db_app_client.get("/api/results/history", params={"step": "day"})
+
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_get_results_history_database_unavailable(db_app_client, pooled_db):
+    """Test history returns 503 when the database fails."""
+    pooled_db.acquire.side_effect = Exception("connection refused")
+
+    response = db_app_client.get("/api/results/history", params={"step": "hour"})
+
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+
+@pytest.fixture
+def etag_client(db_app_client, mock_db_conn):
+    """Create test client whose database returns fixed results."""
+    mock_db_conn.fetch.return_value = [
+        {"option": "cats", "count": 150, "percentage": 60.0,
+         "updated_at": datetime(2025, 11, 15, 12, 0, tzinfo=timezone.utc)},
+        {"option": "dogs", "count": 100, "percentage": 40.0,
+         "updated_at": datetime(2025, 11, 15, 12, 0, tzinfo=timezone.utc)},
+    ]
+    return db_app_client
+
+
+def test_get_results_sends_etag(etag_client):
+    """Test results carry an ETag derived from the response body."""
+    response = etag_client.get("/api/results")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["etag"] == results_etag(response.content)
+
+
+def test_get_results_not_modified(etag_client):
+    """Test a matching If-None-Match gets an empty 304."""
+    etag = etag_client.get("/api/results").headers["etag"]
+
+    response = etag_client.get(
+        "/api/results", headers={"If-None-Match": f'"1.1", W/{etag}'}
+    )
+
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert response.headers["cache-control"] == "public, max-age=2"
+
+
+def test_get_results_modified(etag_client):
+    """Test a stale If-None-Match gets the full results."""
+    response = etag_client.get("/api/results", headers={"If-None-Match": '"1.1"'})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["total"] == 250
+
+
+def test_get_results_body_encoded_once(etag_client):
+    """Test cache hits reuse the encoded body instead of serializing again."""
+    with patch(
+        "models.VoteResults.model_dump_json", autospec=True,
+        side_effect=lambda results: '{"encoded": "once"}',
+    ) as dump_json:
+        first = etag_client.get("/api/results")
+        second = etag_client.get("/api/results")
+
+    assert first.json() == second.json() == {"encoded": "once"}
+    assert first.headers["content-type"] == "application/json"
+    assert dump_json.call_count == 1
@@ -0,0 +1,216 @@
+"""Unit tests for results service caching."""
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+from services import results_listener, results_service
+from services.results_service import DatabaseUnavailableError
+
+
+def results_rows(cats: int, dogs: int) -> list[dict]:
+    """Build get_vote_results() rows for the given counts."""
+    total = cats + dogs
+    return [
+        {
+            "option": option,
+            "count": count,
+            "percentage": round(count / total * 100, 2) if total else 0.0,
+            "updated_at": datetime(2025, 11, 15, 12, 0, 0),
+        }
+        for option, count in (("cats", cats), ("dogs", dogs))
+    ]
+
+
+class FakeConnection:
+    """Connection whose get_vote_results() waits until released."""
+
+    def __init__(self) -> None:
+        self.rows = results_rows(1, 1)
+        self.error: Exception | None = None
+        self.queries = 0
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def fetch(self, query: str) -> list[dict]:
+        self.queries += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.rows
+
+
+@pytest.fixture
+def conn():
+    """Create a fake connection and clear the cache around the test."""
+    results_service.clear_cache()
+    yield FakeConnection()
+    results_service.clear_cache()
+
+
+@pytest.fixture
+def pool(conn):
+    """Create a mock pool whose acquire() yields the fake connection."""
+    pool = MagicMock()
+    pool.acquire.return_value.__aenter__.return_value = conn
+    return pool
+
+
+def expire_cache(seconds: float) -> None:
+    """Age the cached results by the given number of seconds."""
+    results_service._cache_timestamp -= seconds
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_query(pool, conn):
+    """Test requests arriving together on an empty cache run one query."""
+    conn.release.clear()
+
+    requests = [
+        asyncio.create_task(results_service.fetch_vote_results(pool))
+        for _ in range(50)
+    ]
+    await asyncio.sleep(0)
+    conn.release.set()
+    results = await asyncio.gather(*requests)
+
+    assert conn.queries == 1
+    assert {result.total for result in results} == {2}
+
+
+@pytest.mark.asyncio
+async def test_stale_results_served_while_refreshing(pool, conn):
+    """Test expired results are returned at once and refreshed in the background."""
+    await results_service.fetch_vote_results(pool)
+    expire_cache(results_service.CACHE_TTL_SECONDS)
+    conn.rows = results_rows(5, 5)
+    conn.release.clear()
+
+    # Both return the old results without waiting on the running query
+    first = await results_service.fetch_vote_results(pool)
+    second = await results_service.fetch_vote_results(pool)
+    assert first.total == second.total == 2
+    await asyncio.sleep(0)
+    assert conn.queries == 2
+
+    conn.release.set()
+    await results_service._refresh
+
+    assert (await results_service.fetch_vote_results(pool)).total == 10
+    assert conn.queries == 2
+
+
+@pytest.mark.asyncio
+async def test_stale_results_served_when_database_fails(pool, conn):
+    """Test cached results outlive the stale window while the database fails."""
+    await results_service.fetch_vote_results(pool)
+    expire_cache(
+        results_service.CACHE_TTL_SECONDS + results_service.CACHE_STALE_SECONDS
+    )
+    conn.error = Exception("connection refused")
+
+    result = await results_service.fetch_vote_results(pool)
+
+    assert result.total == 2
+
+
+@pytest.mark.asyncio
+async def test_database_failure_without_usable_cache(pool, conn):
+    """Test errors are raised when no recent enough results are cached."""
+    conn.error = Exception("connection refused")
+
+    with pytest.raises(DatabaseUnavailableError):
+        await results_service.fetch_vote_results(pool)
+
+    conn.error = None
+    await results_service.fetch_vote_results(pool)
+    expire_cache(results_service.CACHE_STALE_IF_ERROR_SECONDS)
+    conn.error = Exception("connection refused")
+
+    with patch.object(results_service, "CACHE_STALE_SECONDS", 0):
+        with pytest.raises(DatabaseUnavailableError):
+            await results_service.fetch_vote_results(pool)
+
+
+@pytest.mark.asyncio
+async def test_notifications_update_cache_in_place(pool, conn):
+    """Test totals notifications update cached results without a query."""
+    await results_service.fetch_vote_results(pool)
+    updated_at = datetime(2025, 11, 15, 12, 0, 5, tzinfo=timezone.utc)
+
+    assert results_service.apply_totals({"cats": 4}, updated_at)
+    # An older notification arriving late does not move totals back
+    assert not results_service.apply_totals({"cats": 3, "dogs": 1}, updated_at)
+
+    result = await results_service.fetch_vote_results(pool)
+    assert (result.cats, result.dogs, result.total) == (4, 1, 5)
+    assert result.cats_percentage == 80.0
+    assert conn.queries == 1
+
+
+@pytest.mark.asyncio
+async def test_refresh_does_not_undo_notification(pool, conn):
+    """Test a query started before a notification keeps the notified totals."""
+    await results_service.fetch_vote_results(pool)
+    expire_cache(results_service.CACHE_TTL_SECONDS)
+    conn.rows = results_rows(1, 799)
+    conn.release.clear()
+
+    # The refresh reads its snapshot, then a newer notification lands
+    await results_service.fetch_vote_results(pool)
+    await asyncio.sleep(0)
+    updated_at = datetime(2025, 11, 15, 12, 0, 5, tzinfo=timezone.utc)
+    results_service.apply_totals({"cats": 5, "dogs": 900}, updated_at)
+    conn.release.set()
+    await results_service._refresh
+
+    result = await results_service.fetch_vote_results(pool)
+    assert (result.cats, result.dogs) == (5, 900)
+
+
+@pytest.mark.asyncio
+async def test_etag_follows_body_not_counts(pool, conn):
+    """Test equal counts with different bodies do not share an ETag."""
+    updated_at = datetime(2025, 11, 15, 12, 0, 5, tzinfo=timezone.utc)
+    results_service.apply_totals({"cats": 1, "dogs": 799}, updated_at)
+    _, pushed_body, pushed_etag = await results_service.fetch_results_body(pool)
+
+    # A refresh with the same counts builds its body from the database row
+    conn.rows = results_rows(1, 799)
+    expire_cache(results_service.CACHE_TTL_SECONDS)
+    await results_service.fetch_vote_results(pool)
+    await results_service._refresh
+    _, queried_body, queried_etag = await results_service.fetch_results_body(pool)
+
+    assert queried_body != pushed_body
+    assert queried_etag != pushed_etag
+    assert queried_etag == results_service.results_etag(queried_body)
+
+
+@pytest.mark.asyncio
+async def test_push_ttl_applies_while_subscribed(pool, conn):
+    """Test subscribed replicas keep results past the short TTL."""
+    await results_service.fetch_vote_results(pool)
+    try:
+        results_service.set_push_active(True)
+        # Results cached before subscribing are refreshed once
+        await results_service.fetch_vote_results(pool)
+        await results_service._refresh
+        assert conn.queries == 2
+
+        expire_cache(results_service.CACHE_TTL_SECONDS)
+        await results_service.fetch_vote_results(pool)
+        assert conn.queries == 2
+    finally:
+        results_service.set_push_active(False)
+
+
+def test_malformed_notification_ignored(conn):
+    """Test notifications that are not valid totals leave the cache alone."""
+    results_listener.handle_message('{"cats": "many", "updated_at": 0}')
+    results_listener.handle_message("not json")
+    assert results_service._cache is None
+
+    results_listener.handle_message('{"cats": 2, "dogs": 1, "updated_at": 0}')
+    assert results_service._cache.total == 3
@@ -0,0 +1,113 @@
+"""Unit tests for the results event stream."""
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+from unittest.mock import patch
+
+from models import VoteResults
+from services import results_service, results_stream
+
+
+def vote_results(cats: int, dogs: int) -> VoteResults:
+    """Build VoteResults for the given counts."""
+    total = cats + dogs
+    return VoteResults(
+        cats=cats,
+        dogs=dogs,
+        total=total,
+        cats_percentage=round(cats / total * 100, 2) if total else 0.0,
+        dogs_percentage=round(dogs / total * 100, 2) if total else 0.0,
+        last_updated=datetime(2025, 11, 15, 12, 0, 0),
+    )
+
+
+class FakeResults:
+    """Stand-in for fetch_results_body() counting its calls."""
+
+    def __init__(self) -> None:
+        self.results = vote_results(1, 1)
+        self.calls = 0
+
+    async def __call__(self, db_pool) -> tuple[VoteResults, bytes, str]:
+        self.calls += 1
+        body = self.results.model_dump_json().encode()
+        return self.results, body, results_service.results_etag(body)
+
+
+@pytest_asyncio.fixture
+async def results():
+    """Patch the poller's results source and stop the stream afterwards."""
+    fake = FakeResults()
+    with patch.object(results_stream, "fetch_results_body", fake), \
+         patch.object(results_stream, "POLL_INTERVAL_SECONDS", 0.01):
+        yield fake
+        await results_stream.close()
+
+
+def event_data(event: bytes) -> dict:
+    """Decode the JSON data of a results event."""
+    lines = event.decode().splitlines()
+    assert lines[0] == "event: results"
+    return json.loads(lines[1].removeprefix("data: "))
+
+
+@pytest.mark.asyncio
+async def test_clients_share_one_poller(results):
+    """Test every client gets each change from the same poll."""
+    streams = [results_stream.subscribe(None) for _ in range(20)]
+
+    first = await asyncio.gather(*(anext(stream) for stream in streams))
+    assert {event_data(event)["total"] for event in first} == {2}
+    calls = results.calls
+
+    results.results = vote_results(3, 2)
+    second = await asyncio.gather(*(anext(stream) for stream in streams))
+    assert {event_data(event)["total"] for event in second} == {5}
+    # One poll per interval for all clients, not one per client
+    assert results.calls - calls < 20
+
+    for stream in streams:
+        await stream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_unchanged_results_not_resent(results):
+    """Test polls that find the same counts send nothing."""
+    with patch.object(results_stream, "KEEPALIVE_SECONDS", 0.05):
+        stream = results_stream.subscribe(None)
+        await anext(stream)
+
+        assert await anext(stream) == results_stream.KEEPALIVE_EVENT
+        assert results.calls > 1
+
+        await stream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_slow_client_disconnected(results):
+    """Test a client that stops reading is evicted once its buffer is full."""
+    slow = results_stream.subscribe(None)
+    await anext(slow)
+
+    for count in range(results_stream.CLIENT_BUFFER_SIZE + 1):
+        results_stream.publish(f"event: results\ndata: {count}\n\n".encode())
+
+    with pytest.raises(StopAsyncIteration):
+        await anext(slow)
+    assert not results_stream._clients
+
+
+@pytest.mark.asyncio
+async def test_poller_stops_without_clients(results):
+    """Test the poller exits once the last client disconnects."""
+    stream = results_stream.subscribe(None)
+    await anext(stream)
+    poller = results_stream._poller
+
+    await stream.aclose()
+    await asyncio.wait_for(poller, 1)
+
+    assert poller.done()
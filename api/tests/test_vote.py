@@ -1,10 +1,13 @@
 """Unit tests for vote endpoint."""
 import pytest
+import uvicorn
 from unittest.mock import AsyncMock, patch
 from fastapi import status
 from fastapi.testclient import TestClient
 
 from main import app
+from redis_client import get_redis
+from services import vote_service
 from services.vote_service import RedisUnavailableError
 
 
@@ -217,3 +220,64 @@ async def test_submit_vote_malformed_json():
 
             # Assert - FastAPI returns 422 for JSON decode errors
             assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_submit_vote_records_client_audit_fields():
+    """Test the client IP and User-Agent are passed to the stream entry."""
+    mock_redis = AsyncMock()
+    mock_redis.xadd.return_value = "1234567890-0"
+    app.dependency_overrides[get_redis] = lambda: mock_redis
+
+    try:
+        client = TestClient(app)
+        with patch.object(vote_service, "STREAM_ENCODING", "legacy"):
+            response = client.post(
+                "/api/vote",
+                json={"option": "cats"},
+                headers={"User-Agent": "vote-test/1.0"},
+            )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == status.HTTP_201_CREATED
+    _, fields = mock_redis.xadd.call_args.args
+    assert fields["user_agent"] == "vote-test/1.0"
+    assert fields["source_ip"] == "testclient"
+
+
+def proxied_client(forwarded_allow_ips: str) -> TestClient:
+    """Test client for the app wrapped as uvicorn --proxy-headers serves it."""
+    config = uvicorn.Config(
+        app,
+        proxy_headers=True,
+        forwarded_allow_ips=forwarded_allow_ips,
+        log_config=None,
+    )
+    config.load()
+    return TestClient(config.loaded_app)
+
+
+@pytest.mark.parametrize(
+    "trusted, source_ip",
+    [("testclient", "203.0.113.7"), ("127.0.0.1", "testclient")],
+)
+def test_submit_vote_source_ip_behind_proxy(trusted, source_ip):
+    """Test X-Forwarded-For gives the client IP only from a trusted proxy."""
+    mock_redis = AsyncMock()
+    mock_redis.xadd.return_value = "1234567890-0"
+    app.dependency_overrides[get_redis] = lambda: mock_redis
+
+    try:
+        with patch.object(vote_service, "STREAM_ENCODING", "legacy"):
+            response = proxied_client(trusted).post(
+                "/api/vote",
+                json={"option": "cats"},
+                # Spoofed by the client, then the address the proxy saw
+                headers={"X-Forwarded-For": "198.51.100.1, 203.0.113.7"},
+            )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == status.HTTP_201_CREATED
+    _, fields = mock_redis.xadd.call_args.args
+    assert fields["source_ip"] == source_ip
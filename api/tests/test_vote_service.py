@@ -0,0 +1,175 @@
+"""Unit tests for vote service."""
+import importlib.util
+import ipaddress
+import uuid
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from services import vote_service
+
+
+def load_vote_service(monkeypatch, encoding: str | None):
+    """Import a fresh copy of vote_service with STREAM_ENCODING set (or unset)."""
+    if encoding is None:
+        monkeypatch.delenv("STREAM_ENCODING", raising=False)
+    else:
+        monkeypatch.setenv("STREAM_ENCODING", encoding)
+    spec = importlib.util.spec_from_file_location(
+        "fresh_vote_service", vote_service.__file__
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.mark.asyncio
+async def test_write_vote_single_partition():
+    """Test votes go to the base stream when it is not partitioned."""
+    mock_redis = AsyncMock()
+    mock_redis.xadd.return_value = "1234567890-0"
+
+    with patch.object(vote_service, "STREAM_PARTITIONS", 1):
+        message_id = await vote_service.write_vote_to_stream(mock_redis, "cats")
+
+    assert message_id == "1234567890-0"
+    assert mock_redis.xadd.call_args.args[0] == "votes"
+
+
+@pytest.mark.asyncio
+async def test_write_vote_partitioned():
+    """Test votes go to one of the partition streams."""
+    mock_redis = AsyncMock()
+    mock_redis.xadd.return_value = "1234567890-0"
+
+    with patch.object(vote_service, "STREAM_PARTITIONS", 4):
+        await vote_service.write_vote_to_stream(mock_redis, "dogs")
+        stream, fields = mock_redis.xadd.call_args.args
+
+        assert stream in {"votes:0", "votes:1", "votes:2", "votes:3"}
+        assert stream == vote_service.stream_for(fields["request_id"])
+
+
+def test_stream_for_spreads_requests():
+    """Test request IDs hash to every partition."""
+    with patch.object(vote_service, "STREAM_PARTITIONS", 4):
+        streams = {vote_service.stream_for(f"request-{i}") for i in range(100)}
+
+    assert streams == {"votes:0", "votes:1", "votes:2", "votes:3"}
+
+
+@pytest.mark.asyncio
+async def test_write_vote_includes_audit_fields():
+    """Test client IP and User-Agent are added to the stream entry."""
+    mock_redis = AsyncMock()
+    mock_redis.xadd.return_value = "1234567890-0"
+
+    with patch.object(vote_service, "STREAM_ENCODING", "legacy"):
+        await vote_service.write_vote_to_stream(
+            mock_redis, "cats", source_ip="203.0.113.7", user_agent="x" * 1000
+        )
+
+    _, fields = mock_redis.xadd.call_args.args
+    assert fields["source_ip"] == "203.0.113.7"
+    assert fields["user_agent"] == "x" * vote_service.USER_AGENT_MAX_LENGTH
+
+
+@pytest.mark.asyncio
+async def test_write_vote_omits_missing_audit_fields():
+    """Test entries stay valid when audit fields are unknown."""
+    mock_redis = AsyncMock()
+    mock_redis.xadd.return_value = "1234567890-0"
+
+    with patch.object(vote_service, "STREAM_ENCODING", "legacy"):
+        await vote_service.write_vote_to_stream(mock_redis, "dogs")
+
+    _, fields = mock_redis.xadd.call_args.args
+    assert "source_ip" not in fields
+    assert "user_agent" not in fields
+
+
+@pytest.mark.asyncio
+async def test_write_vote_caps_stream_length():
+    """Test STREAM_MAXLEN adds an approximate MAXLEN to XADD."""
+    mock_redis = AsyncMock()
+    mock_redis.xadd.return_value = "1234567890-0"
+
+    with patch.object(vote_service, "STREAM_MAXLEN", 100000):
+        await vote_service.write_vote_to_stream(mock_redis, "cats")
+
+    assert mock_redis.xadd.call_args.kwargs == {
+        "maxlen": 100000,
+        "approximate": True,
+    }
+
+
+@pytest.mark.asyncio
+async def test_write_vote_uncapped_by_default():
+    """Test XADD has no MAXLEN when STREAM_MAXLEN is 0."""
+    mock_redis = AsyncMock()
+    mock_redis.xadd.return_value = "1234567890-0"
+
+    with patch.object(vote_service, "STREAM_MAXLEN", 0):
+        await vote_service.write_vote_to_stream(mock_redis, "cats")
+
+    assert mock_redis.xadd.call_args.kwargs == {}
+
+
+def test_encode_vote_compact_layout():
+    """Test the compact entry packs every field in the documented layout."""
+    request_id = uuid.uuid4()
+
+    value = vote_service.encode_vote(
+        "dogs", 1700000000123, request_id, "2001:db8::1", "ua/1"
+    )
+
+    assert value[0] == vote_service.COMPACT_VERSION
+    assert value[1] == vote_service.OPTION_CODES["dogs"]
+    assert int.from_bytes(value[2:10], "big") == 1700000000123
+    assert value[10:26] == request_id.bytes
+    assert value[26] == 16
+    assert ipaddress.ip_address(value[27:43]) == ipaddress.ip_address("2001:db8::1")
+    assert int.from_bytes(value[43:45], "big") == 4
+    assert value[45:] == b"ua/1"
+
+
+def test_encode_vote_drops_invalid_source_ip():
+    """Test a source that is not an IP address is left out."""
+    value = vote_service.encode_vote("cats", 0, uuid.uuid4(), "testclient", None)
+
+    assert value[26] == 0
+    assert value[27:] == b"\x00\x00"
+
+
+@pytest.mark.asyncio
+async def test_write_vote_compact_single_field():
+    """Test compact encoding writes one binary field."""
+    mock_redis = AsyncMock()
+    mock_redis.xadd.return_value = "1234567890-0"
+
+    with patch.object(vote_service, "STREAM_ENCODING", "compact"):
+        await vote_service.write_vote_to_stream(
+            mock_redis, "cats", source_ip="203.0.113.7", user_agent="ua"
+        )
+
+    _, fields = mock_redis.xadd.call_args.args
+    assert list(fields) == ["v"]
+    assert len(fields["v"]) == 26 + 1 + 4 + 2 + 2
+
+
+def test_stream_encoding_defaults_to_legacy(monkeypatch):
+    """Test compact entries are opt-in, so older consumers keep reading votes."""
+    assert load_vote_service(monkeypatch, None).STREAM_ENCODING == "legacy"
+
+
+@pytest.mark.parametrize("encoding", ["legacy", "COMPACT"])
+def test_stream_encoding_accepted(monkeypatch, encoding):
+    """Test both formats are accepted, regardless of case."""
+    assert load_vote_service(monkeypatch, encoding).STREAM_ENCODING == encoding.lower()
+
+
+@pytest.mark.parametrize("encoding", ["binary", ""])
+def test_stream_encoding_rejected(monkeypatch, encoding):
+    """Test an unknown format fails at import instead of falling back."""
+    with pytest.raises(ValueError, match="STREAM_ENCODING"):
+        load_vote_service(monkeypatch, encoding)
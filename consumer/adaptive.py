@@ -0,0 +1,123 @@
+"""
+Lag-adaptive read sizing for voting consumer.
+
+The XREADGROUP COUNT and BLOCK used by the reader follow consumer group
+lag instead of being fixed at import time:
+
+- When lag builds (sampled from XINFO GROUPS every
+  Config.LAG_SAMPLE_INTERVAL_MS, or a read comes back full) the batch
+  size doubles, up to Config.MAX_BATCH_SIZE, so each commit and ack
+  round trip covers more votes during a surge.
+- When the consumer is idle the batch size halves back towards
+  Config.BATCH_SIZE and reads block for only Config.IDLE_BLOCK_MS, so
+  small batches commit quickly and the reader stays responsive.
+"""
+import time
+
+import structlog
+
+from config import Config
+import metrics
+import redis_client
+
+logger = structlog.get_logger()
+
+# Current XREADGROUP COUNT and BLOCK
+_batch_size: int = Config.BATCH_SIZE
+_block_ms: int = Config.IDLE_BLOCK_MS
+_lag: int = 0
+_next_sample: float = 0.0
+
+
+def batch_size() -> int:
+    """Current XREADGROUP COUNT."""
+    return _batch_size
+
+
+def block_ms() -> int:
+    """Current XREADGROUP BLOCK in milliseconds."""
+    return _block_ms
+
+
+def lag() -> int:
+    """Consumer group lag seen at the last sample."""
+    return _lag
+
+
+def reset() -> None:
+    """Return to the idle settings (e.g. when the pipeline restarts)."""
+    global _batch_size, _block_ms, _lag, _next_sample
+
+    _batch_size = Config.BATCH_SIZE
+    _block_ms = Config.IDLE_BLOCK_MS
+    _lag = 0
+    _next_sample = 0.0
+
+
+def _resize(size: int, block: int) -> None:
+    """Apply new read settings, logging changes."""
+    global _batch_size, _block_ms
+
+    size = max(Config.BATCH_SIZE, min(Config.MAX_BATCH_SIZE, size))
+
+    if size != _batch_size or block != _block_ms:
+        logger.debug("read_size_adapted", batch_size=size, block_ms=block, lag=_lag)
+
+    _batch_size = size
+    _block_ms = block
+
+
+async def sample(streams: list[str]) -> None:
+    """
+    Sample consumer group lag and adapt the read settings.
+
+    Also publishes lag and pending entries list size per stream as metrics.
+
+    Does nothing until Config.LAG_SAMPLE_INTERVAL_MS has passed since the
+    previous sample.
+
+    Args:
+        streams: Streams the reader currently reads.
+    """
+    global _lag, _next_sample
+
+    now = time.monotonic()
+    if now < _next_sample:
+        return
+    _next_sample = now + Config.LAG_SAMPLE_INTERVAL_MS / 1000
+
+    _lag = 0
+    lag_known = True
+    for stream in streams:
+        lag, pending = await redis_client.get_group_stats(stream)
+        metrics.PENDING_ENTRIES.labels(stream=stream).set(pending)
+        if lag is None:
+            lag_known = False
+            continue
+        metrics.STREAM_LAG.labels(stream=stream).set(lag)
+        _lag += lag
+
+    # Unknown lag keeps the current settings; reads still adapt in observe()
+    if not lag_known:
+        return
+
+    if _lag > _batch_size:
+        _resize(_batch_size * 2, Config.BLOCK_MS)
+    elif _lag == 0:
+        _resize(_batch_size // 2, Config.IDLE_BLOCK_MS)
+
+
+def observe(count: int) -> None:
+    """
+    Adapt the read settings to the size of a read.
+
+    A full read means more entries are waiting, so the batch size grows
+    without waiting for the next lag sample.
+
+    Args:
+        count: Number of entries the last read returned.
+    """
+    if count >= _batch_size:
+        _resize(_batch_size * 2, Config.BLOCK_MS)
+    elif count == 0:
+        _resize(_batch_size // 2, Config.IDLE_BLOCK_MS)
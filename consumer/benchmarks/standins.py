@@ -0,0 +1,194 @@
+"""
+In-process stand-ins for Redis and PostgreSQL, used by bench_consumer.
+
+install_fake_redis() points the consumer's Redis clients at one
+in-memory fakeredis server (pip install fakeredis). FakeDatabase
+replaces the db_client functions the consumer calls with an in-memory
+store that keeps the checkpoint compare-and-set and waits a fixed
+latency per simulated round trip. Neither models server CPU or lock
+contention: they measure the consumer's own overhead and how well it
+hides round-trip latency.
+"""
+import asyncio
+import math
+import time
+from datetime import datetime
+
+import db_client
+import redis_client
+
+# Interval at which an emulated blocking XREADGROUP polls for entries
+POLL_INTERVAL_S = 0.001
+
+
+def install_fake_redis():
+    """
+    Replace the consumer's Redis clients with fakeredis clients.
+
+    Both share one new in-memory server, so every call starts empty.
+
+    Returns:
+        A decoding client of the same server, for the vote generator.
+
+    Raises:
+        ImportError: If fakeredis is not installed.
+    """
+    import fakeredis
+
+    class BlockingFakeRedis(fakeredis.aioredis.FakeRedis):
+        """FakeRedis whose XREADGROUP waits up to BLOCK for entries."""
+
+        async def xreadgroup(self, *args, block=None, **kwargs):
+            # BLOCK 0 waits forever
+            timeout_s = math.inf if block == 0 else (block or 0) / 1000
+            deadline = time.monotonic() + timeout_s
+
+            while True:
+                response = await super().xreadgroup(*args, **kwargs)
+                if (
+                    any(messages for _, messages in response or [])
+                    or block is None
+                    or time.monotonic() >= deadline
+                ):
+                    return response
+                await asyncio.sleep(POLL_INTERVAL_S)
+
+    server = fakeredis.FakeServer()
+    redis_client._client = BlockingFakeRedis(server=server, decode_responses=True)
+    redis_client._raw_client = BlockingFakeRedis(server=server, decode_responses=False)
+
+    return BlockingFakeRedis(server=server, decode_responses=True)
+
+
+class _FakeWriterConnection:
+    """Stand-in for db_client.WriterConnection; holds nothing."""
+
+    async def connection(self) -> None:
+        return None
+
+    async def close(self) -> None:
+        pass
+
+    async def __aenter__(self) -> "_FakeWriterConnection":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        pass
+
+
+class FakeDatabase:
+    """
+    In-memory stand-in for the PostgreSQL side of db_client.
+
+    Every function costs the round trips its real counterpart makes
+    (a batch commit is BEGIN, commit_vote_batch, apply_vote_rollups,
+    COPY and COMMIT), each waiting latency_ms.
+    """
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_s = latency_ms / 1000
+        self.round_trips = 0
+        self.counts = {"cats": 0, "dogs": 0}
+        self.checkpoints: dict[tuple[str, str, str], str] = {}
+        self.flushed_version = 0
+
+    def install(self) -> None:
+        """Replace the db_client functions the consumer uses."""
+        db_client.get_pool = self.get_pool
+        db_client.close_pool = self.close_pool
+        db_client.ensure_counter_slots = self.ensure_counter_slots
+        db_client.WriterConnection = _FakeWriterConnection
+        db_client.load_checkpoint = self.load_checkpoint
+        db_client.commit_batch = self.commit_batch
+        db_client.load_counter_state = self.load_counter_state
+        db_client.flush_counters = self.flush_counters
+
+    async def _round_trips(self, count: int) -> None:
+        self.round_trips += count
+        await asyncio.sleep(self.latency_s * count)
+
+    async def get_pool(self) -> None:
+        """Stand-in for db_client.get_pool()."""
+        return None
+
+    async def close_pool(self) -> None:
+        """Stand-in for db_client.close_pool()."""
+        pass
+
+    async def ensure_counter_slots(self, slots: int) -> None:
+        """Stand-in for db_client.ensure_counter_slots()."""
+        await self._round_trips(1)
+
+    async def load_checkpoint(self, stream: str, group: str, consumer: str) -> str:
+        """Stand-in for db_client.load_checkpoint()."""
+        await self._round_trips(1)
+        return self.checkpoints.setdefault((stream, group, consumer), "0-0")
+
+    async def commit_batch(
+        self,
+        stream: str,
+        group: str,
+        consumer: str,
+        expected_id: str,
+        last_id: str,
+        cats_delta: int,
+        dogs_delta: int,
+        events: list[tuple] | None = None,
+        rollups: dict[datetime, list[int]] | None = None,
+        writer: object | None = None,
+    ) -> dict[str, int]:
+        """Stand-in for db_client.commit_batch()."""
+        key = (stream, group, consumer)
+        await self._round_trips(3 + bool(rollups) + bool(events))
+
+        if self.checkpoints.get(key, "0-0") != expected_id:
+            raise db_client.CheckpointConflictError(
+                f"Stream checkpoint for {stream}/{group}/{consumer} "
+                f"is no longer {expected_id}"
+            )
+
+        self.checkpoints[key] = last_id
+        self.counts["cats"] += cats_delta
+        self.counts["dogs"] += dogs_delta
+
+        return {
+            option: self.counts[option]
+            for option, delta in (("cats", cats_delta), ("dogs", dogs_delta))
+            if delta
+        }
+
+    async def load_counter_state(
+        self, counter: str, group: str, streams: list[str]
+    ) -> tuple[dict[str, int], int, dict[tuple[str, str], str]]:
+        """Stand-in for db_client.load_counter_state()."""
+        await self._round_trips(3)
+        checkpoints = {
+            (stream, consumer): last_id
+            for (stream, owner_group, consumer), last_id in self.checkpoints.items()
+            if owner_group == group and stream in streams
+        }
+        return dict(self.counts), self.flushed_version, checkpoints
+
+    async def flush_counters(
+        self,
+        counter: str,
+        version: int,
+        cats: int,
+        dogs: int,
+        group: str,
+        checkpoints: dict[tuple[str, str], str],
+        rollups: dict[datetime, list[int]],
+        events: list[tuple],
+    ) -> bool:
+        """Stand-in for db_client.flush_counters()."""
+        await self._round_trips(3 + bool(rollups) + bool(events))
+
+        if version <= self.flushed_version:
+            return False
+
+        self.flushed_version = version
+        self.counts = {"cats": cats, "dogs": dogs}
+        for (stream, consumer), last_id in checkpoints.items():
+            self.checkpoints[(stream, group, consumer)] = last_id
+
+        return True
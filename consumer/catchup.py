@@ -0,0 +1,176 @@
+"""
+Backlog catch-up mode for voting consumer.
+
+Runs for a stream when the consumer starts reading it (startup or a
+newly acquired partition) and whenever consumer group lag crosses
+Config.CATCHUP_LAG_THRESHOLD. Catch-up reclaims entries stranded in the
+pending entries list (PEL), e.g. by a crashed pod, and then drains the
+backlog in chunks of Config.CATCHUP_BATCH_SIZE through the same bulk
+commit path as normal batches, before the reader returns to
+low-latency tailing.
+"""
+from typing import Awaitable, Callable
+
+import structlog
+
+from config import Config
+import redis_client
+
+logger = structlog.get_logger()
+
+# Hands (stream, batch, consumer owning its checkpoint) to the writers
+Submit = Callable[[str, list[tuple[str, dict]], str], Awaitable[None]]
+
+
+async def drain_own_pending(
+    stream: str, submit: Submit, should_stop: Callable[[], bool]
+) -> int:
+    """
+    Re-read this consumer's own pending entries from the start.
+
+    Every unacknowledged entry of this consumer is delivered again,
+    including batches still in flight; the checkpoint filters those out,
+    but the work is only worth it when little can be in flight.
+
+    Args:
+        stream: Redis Stream name.
+        submit: Coroutine that hands a batch to the writers.
+        should_stop: Returns True once shutdown has been requested.
+
+    Returns:
+        Number of entries submitted.
+    """
+    total = 0
+    last_id = "0"
+
+    while not should_stop():
+        messages = await redis_client.read_backlog(
+            stream, last_id, Config.CATCHUP_BATCH_SIZE
+        )
+        if not messages:
+            break
+
+        await submit(stream, messages, Config.CONSUMER_NAME)
+        total += len(messages)
+        last_id = messages[-1][0]
+
+    return total
+
+
+async def reclaim_stale(
+    stream: str, submit: Submit, should_stop: Callable[[], bool]
+) -> int:
+    """
+    Take over entries other consumers left pending and submit them.
+
+    Scans the whole pending entries list; each owner's entries are
+    submitted under that owner's checkpoint, as one run from its oldest
+    pending entry (see redis_client.claim_stale_messages).
+
+    Args:
+        stream: Redis Stream name.
+        submit: Coroutine that hands a batch to the writers.
+        should_stop: Returns True once shutdown has been requested.
+
+    Returns:
+        Number of entries submitted.
+    """
+    total = 0
+    cursor: str | None = "-"
+    blocked: set[str] = set()
+
+    while cursor is not None and not should_stop():
+        cursor, stale = await redis_client.claim_stale_messages(
+            stream, cursor, Config.CATCHUP_BATCH_SIZE, blocked
+        )
+
+        for owner, messages in stale.items():
+            await submit(stream, messages, owner)
+            total += len(messages)
+
+    return total
+
+
+async def drain_backlog(
+    stream: str, submit: Submit, should_stop: Callable[[], bool]
+) -> int:
+    """
+    Read undelivered entries in large chunks until the stream is caught up.
+
+    Args:
+        stream: Redis Stream name.
+        submit: Coroutine that hands a batch to the writers.
+        should_stop: Returns True once shutdown has been requested.
+
+    Returns:
+        Number of entries submitted.
+    """
+    total = 0
+
+    while not should_stop():
+        messages = await redis_client.read_backlog(
+            stream, ">", Config.CATCHUP_BATCH_SIZE
+        )
+
+        if messages:
+            await submit(stream, messages, Config.CONSUMER_NAME)
+            total += len(messages)
+
+        # A short read means we reached the tail of the stream
+        if len(messages) < Config.CATCHUP_BATCH_SIZE:
+            break
+
+    return total
+
+
+async def lag_exceeded(stream: str) -> bool:
+    """
+    Check whether consumer group lag on a stream warrants catch-up mode.
+
+    Args:
+        stream: Redis Stream name.
+
+    Returns:
+        True if lag is at or above Config.CATCHUP_LAG_THRESHOLD; False
+        if it is unknown.
+    """
+    lag = await redis_client.get_group_lag(stream)
+
+    if lag is not None and lag >= Config.CATCHUP_LAG_THRESHOLD:
+        logger.info("lag_threshold_exceeded", stream=stream, lag=lag)
+        return True
+
+    return False
+
+
+async def run(
+    stream: str,
+    submit: Submit,
+    should_stop: Callable[[], bool],
+    include_own: bool,
+) -> None:
+    """
+    Run one catch-up pass: reclaim pending entries, then drain the backlog.
+
+    Args:
+        stream: Redis Stream name.
+        submit: Coroutine that hands a batch to the writers.
+        should_stop: Returns True once shutdown has been requested.
+        include_own: Also re-read this consumer's own pending entries
+            (on startup or when the stream was just acquired).
+    """
+    logger.info("catchup_started", stream=stream, include_own=include_own)
+
+    own = 0
+    if include_own:
+        own = await drain_own_pending(stream, submit, should_stop)
+    claimed = await reclaim_stale(stream, submit, should_stop)
+    backlog = await drain_backlog(stream, submit, should_stop)
+
+    logger.info(
+        "catchup_finished",
+        stream=stream,
+        own_pending=own,
+        claimed=claimed,
+        backlog=backlog
+    )
@@ -0,0 +1,110 @@
+"""
+Stream entry decoding for voting consumer.
+
+The API writes votes in one of two formats, and both may be found in a
+stream at the same time:
+
+- Legacy entries: one UTF-8 field per value ("option", "timestamp",
+  "request_id" and the optional "source_ip" and "user_agent").
+- Compact entries: a single binary field "v" (big-endian):
+
+      version     1 byte   (1)
+      option      1 byte   (1 = cats, 2 = dogs)
+      timestamp   8 bytes  milliseconds since the epoch
+      request_id  16 bytes UUID
+      ip length   1 byte   (0, 4 or 16), then the packed source IP
+      ua length   2 bytes, then the UTF-8 User-Agent
+
+Entries are read with a bytes-mode client and decoded here into the
+same dict the legacy format produces, so processing does not depend on
+the format.
+"""
+import ipaddress
+import struct
+import uuid
+
+# Compact entry field name and supported format version
+COMPACT_FIELD = b"v"
+COMPACT_VERSION = 1
+OPTIONS = {1: "cats", 2: "dogs"}
+# Packed source IP lengths: none, IPv4, IPv6
+IP_LENGTHS = (0, 4, 16)
+
+# version, option, timestamp, request ID
+_HEADER = struct.Struct(">BBQ16s")
+
+
+def decode_compact(payload: bytes) -> dict:
+    """
+    Unpack a compact entry value.
+
+    Args:
+        payload: Value of the "v" field.
+
+    Returns:
+        Message data with "option", "timestamp" (int milliseconds),
+        "request_id" and, when present, "source_ip" and "user_agent".
+        An unknown option code is returned as its number, so the entry
+        is rejected as an invalid vote.
+
+    Raises:
+        ValueError: If the payload is truncated, of an unknown version or
+            has an invalid source IP length.
+    """
+    if payload[:1] != bytes((COMPACT_VERSION,)):
+        raise ValueError(f"unsupported entry version {payload[:1].hex() or 'none'}")
+
+    try:
+        _, code, timestamp, request_id = _HEADER.unpack_from(payload)
+        offset = _HEADER.size
+        ip_length = payload[offset]
+    except (struct.error, IndexError) as e:
+        raise ValueError(f"truncated compact entry: {e}") from e
+
+    if ip_length not in IP_LENGTHS:
+        raise ValueError(f"invalid source IP length {ip_length}")
+
+    packed_ip = payload[offset + 1:offset + 1 + ip_length]
+    offset += 1 + ip_length
+    ua_field = payload[offset:offset + 2]
+    ua_length = int.from_bytes(ua_field, "big")
+    agent = payload[offset + 2:offset + 2 + ua_length]
+
+    if len(packed_ip) != ip_length or len(ua_field) != 2 or len(agent) != ua_length:
+        raise ValueError("truncated compact entry")
+
+    data = {
+        "option": OPTIONS.get(code, str(code)),
+        "timestamp": timestamp,
+        "request_id": str(uuid.UUID(bytes=request_id)),
+    }
+    if ip_length:
+        data["source_ip"] = str(ipaddress.ip_address(packed_ip))
+    if ua_length:
+        data["user_agent"] = agent.decode(errors="replace")
+
+    return data
+
+
+def decode_fields(fields: dict[bytes, bytes]) -> dict:
+    """
+    Decode the fields of a stream entry read in bytes mode.
+
+    Args:
+        fields: Raw entry fields.
+
+    Returns:
+        Message data as a dict of str keys (see decode_compact for the
+        compact format).
+
+    Raises:
+        ValueError: If a compact entry cannot be decoded.
+    """
+    payload = fields.get(COMPACT_FIELD)
+    if payload is not None:
+        return decode_compact(payload)
+
+    return {
+        key.decode(errors="replace"): value.decode(errors="replace")
+        for key, value in fields.items()
+    }
@@ -0,0 +1,347 @@
+"""
+Redis-native vote counters with write-behind persistence for voting consumer.
+
+With Config.COUNTER_MODE = "redis" batches are applied to Redis instead
+of PostgreSQL: one Lua script moves the batch's stream checkpoint
+(compare-and-set, as commit_vote_batch() does in PostgreSQL), HINCRBYs
+the totals and queues the per-minute rollup deltas and audit rows. A
+flusher then persists everything to PostgreSQL once per
+Config.FLUSH_INTERVAL_MS, so PostgreSQL takes one transaction per flush
+instead of one per batch.
+
+Every applied batch bumps a version number. A flush freezes the current
+state under that version (totals, checkpoints, and the rollup and audit
+queues renamed out of the way) and commits it with
+flush_vote_counters(), which only applies versions newer than the last
+one flushed. Retrying a flush, or two processes flushing the same
+snapshot, is therefore harmless, and the stream checkpoints in
+PostgreSQL always match the totals next to them.
+
+Redis holds the counts of record between flushes, so it must persist
+them (AOF is enabled in the chart). If the counter state is missing it
+is seeded from the last flush in PostgreSQL.
+"""
+import asyncio
+import json
+from datetime import datetime, timezone
+
+import structlog
+
+from config import Config
+import db_client
+import metrics
+import redis_client
+import retries
+
+logger = structlog.get_logger()
+
+# Apply one batch: KEYS = state, checkpoints, rollups, events;
+# ARGV = checkpoint field, expected ID, last ID, cats, dogs,
+# rollup field count, rollup field/delta pairs, audit rows
+_APPLY_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return redis.error_reply('NOSEED vote counters are not seeded')
+end
+if (redis.call('HGET', KEYS[2], ARGV[1]) or '0-0') ~= ARGV[2] then
+    return false
+end
+redis.call('HSET', KEYS[2], ARGV[1], ARGV[3])
+local cats = redis.call('HINCRBY', KEYS[1], 'cats', ARGV[4])
+local dogs = redis.call('HINCRBY', KEYS[1], 'dogs', ARGV[5])
+redis.call('HINCRBY', KEYS[1], 'version', 1)
+local fields = 6 + 2 * tonumber(ARGV[6])
+for i = 7, fields, 2 do
+    redis.call('HINCRBY', KEYS[3], ARGV[i], ARGV[i + 1])
+end
+for i = fields + 1, #ARGV do
+    redis.call('RPUSH', KEYS[4], ARGV[i])
+end
+return {cats, dogs}
+"""
+
+# Seed the counters from PostgreSQL unless they exist: KEYS = state,
+# checkpoints, rollups, events, flush, flush rollups, flush events;
+# ARGV = cats, dogs, version, checkpoint field/ID pairs
+_SEED_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+redis.call('DEL', KEYS[2], KEYS[3], KEYS[4], KEYS[5], KEYS[6], KEYS[7])
+redis.call('HSET', KEYS[1], 'cats', ARGV[1], 'dogs', ARGV[2],
+    'version', ARGV[3], 'flushed_version', ARGV[3])
+for i = 4, #ARGV, 2 do
+    redis.call('HSET', KEYS[2], ARGV[i], ARGV[i + 1])
+end
+return 1
+"""
+
+# Freeze the state for a flush, or return the unfinished previous one:
+# KEYS = state, checkpoints, rollups, events, flush, flush rollups,
+# flush events
+_SNAPSHOT_SCRIPT = """
+if redis.call('EXISTS', KEYS[5]) == 0 then
+    local state = redis.call(
+        'HMGET', KEYS[1], 'cats', 'dogs', 'version', 'flushed_version')
+    if not state[3] or state[3] == state[4] then
+        return false
+    end
+    redis.call('HSET', KEYS[5],
+        'version', state[3], 'cats', state[1], 'dogs', state[2])
+    local checkpoints = redis.call('HGETALL', KEYS[2])
+    for i = 1, #checkpoints, 2 do
+        redis.call('HSET', KEYS[5], 'checkpoint:' .. checkpoints[i],
+            checkpoints[i + 1])
+    end
+    if redis.call('EXISTS', KEYS[3]) == 1 then
+        redis.call('RENAME', KEYS[3], KEYS[6])
+    end
+    if redis.call('EXISTS', KEYS[4]) == 1 then
+        redis.call('RENAME', KEYS[4], KEYS[7])
+    end
+end
+return {redis.call('HGETALL', KEYS[5]), redis.call('HGETALL', KEYS[6])}
+"""
+
+# Drop a flushed snapshot if it is still the current one:
+# KEYS = state, flush, flush rollups, flush events; ARGV = version
+_FINISH_SCRIPT = """
+if redis.call('HGET', KEYS[2], 'version') ~= ARGV[1] then
+    return 0
+end
+redis.call('DEL', KEYS[2], KEYS[3], KEYS[4])
+local flushed = tonumber(redis.call('HGET', KEYS[1], 'flushed_version') or '0')
+if tonumber(ARGV[1]) > flushed then
+    redis.call('HSET', KEYS[1], 'flushed_version', ARGV[1])
+end
+return 1
+"""
+
+
+def counter_name() -> str:
+    """Name of the counter state, shared by every consumer of the stream."""
+    return f"{Config.STREAM_NAME}:counters"
+
+
+def _keys() -> list[str]:
+    """Redis keys: state, checkpoints, rollups, events and their flush copies."""
+    prefix = counter_name()
+    return [
+        f"{prefix}:state",
+        f"{prefix}:checkpoints",
+        f"{prefix}:rollups",
+        f"{prefix}:events",
+        f"{prefix}:flush",
+        f"{prefix}:flush:rollups",
+        f"{prefix}:flush:events",
+    ]
+
+
+def _checkpoint_field(stream: str, owner: str) -> str:
+    """Checkpoint hash field of a (stream, owner) pair."""
+    return f"{stream}|{owner}"
+
+
+def _encode_event(event: tuple) -> str:
+    """Serialize a vote_events row for the Redis audit queue."""
+    option, timestamp, source_ip, user_agent = event
+    return json.dumps(
+        [option, round(timestamp.timestamp() * 1000), source_ip, user_agent]
+    )
+
+
+def _decode_event(raw: str) -> tuple:
+    """Deserialize a queued vote_events row."""
+    option, timestamp_ms, source_ip, user_agent = json.loads(raw)
+    return (
+        option,
+        datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc),
+        source_ip,
+        user_agent,
+    )
+
+
+async def seed() -> None:
+    """
+    Create the Redis counter state from PostgreSQL if it does not exist.
+
+    Loads the counts, the version of the last flush and the stream
+    checkpoints it covers, so redelivered entries already included in
+    those counts are still skipped.
+
+    Raises:
+        Exception: If Redis or PostgreSQL operations fail.
+    """
+    client = await redis_client.get_client()
+    keys = _keys()
+
+    if await client.exists(keys[0]):
+        return
+
+    counts, version, checkpoints = await db_client.load_counter_state(
+        counter_name(), Config.CONSUMER_GROUP, retries.all_streams()
+    )
+
+    args: list = [counts.get("cats", 0), counts.get("dogs", 0), version]
+    for (stream, owner), last_id in checkpoints.items():
+        args += [_checkpoint_field(stream, owner), last_id]
+
+    if await client.eval(_SEED_SCRIPT, len(keys), *keys, *args):
+        logger.info(
+            "counters_seeded",
+            counter=counter_name(),
+            counts=counts,
+            version=version,
+            checkpoints=len(checkpoints)
+        )
+
+
+async def load_checkpoint(stream: str, owner: str) -> str:
+    """
+    Load the last applied stream ID for an owner from Redis.
+
+    Args:
+        stream: Redis Stream name.
+        owner: Consumer whose pending entries the checkpoint covers.
+
+    Returns:
+        Last applied stream ID ("0-0" if nothing was applied yet).
+    """
+    client = await redis_client.get_client()
+    last_id = await client.hget(_keys()[1], _checkpoint_field(stream, owner))
+    return last_id or "0-0"
+
+
+async def commit_batch(
+    stream: str,
+    owner: str,
+    expected_id: str,
+    last_id: str,
+    cats_delta: int,
+    dogs_delta: int,
+    events: list[tuple],
+    rollups: dict[datetime, list[int]],
+) -> dict[str, int]:
+    """
+    Apply a batch to the Redis counters and advance its checkpoint atomically.
+
+    Args:
+        stream: Redis Stream name.
+        owner: Consumer whose checkpoint covers the batch.
+        expected_id: Checkpoint value the batch was filtered against.
+        last_id: Highest stream ID in the batch.
+        cats_delta: Number of new votes for cats.
+        dogs_delta: Number of new votes for dogs.
+        events: vote_events rows to queue for the next flush.
+        rollups: Mapping of minute bucket to [cats, dogs] vote counts.
+
+    Returns:
+        Mapping of option to new count.
+
+    Raises:
+        db_client.CheckpointConflictError: If the checkpoint is no longer
+            expected_id.
+        Exception: If the Redis operation fails.
+    """
+    client = await redis_client.get_client()
+    keys = _keys()[:4]
+
+    rollup_args: list = []
+    for bucket, counts in rollups.items():
+        epoch = int(bucket.timestamp())
+        for option, count in zip(("cats", "dogs"), counts):
+            if count:
+                rollup_args += [f"{epoch}:{option}", count]
+
+    result = await client.eval(
+        _APPLY_SCRIPT,
+        len(keys),
+        *keys,
+        _checkpoint_field(stream, owner),
+        expected_id,
+        last_id,
+        cats_delta,
+        dogs_delta,
+        len(rollup_args) // 2,
+        *rollup_args,
+        *(_encode_event(event) for event in events)
+    )
+
+    if result is None:
+        raise db_client.CheckpointConflictError(
+            f"Stream checkpoint for {stream}/{owner} is no longer {expected_id}"
+        )
+
+    return {"cats": int(result[0]), "dogs": int(result[1])}
+
+
+async def flush() -> bool:
+    """
+    Persist the Redis counters to PostgreSQL.
+
+    Returns:
+        True if a snapshot was written, False if there was nothing new
+        or a newer one had already been flushed.
+
+    Raises:
+        Exception: If Redis or PostgreSQL operations fail; the snapshot
+            is kept and retried by the next flush.
+    """
+    client = await redis_client.get_client()
+    keys = _keys()
+
+    snapshot = await client.eval(_SNAPSHOT_SCRIPT, len(keys), *keys)
+    if snapshot is None:
+        return False
+
+    state = dict(zip(snapshot[0][::2], snapshot[0][1::2]))
+    version = int(state["version"])
+
+    checkpoints: dict[tuple[str, str], str] = {}
+    for field, last_id in state.items():
+        if field.startswith("checkpoint:"):
+            stream, _, owner = field.removeprefix("checkpoint:").rpartition("|")
+            checkpoints[(stream, owner)] = last_id
+
+    rollups: dict[datetime, list[int]] = {}
+    for field, count in zip(snapshot[1][::2], snapshot[1][1::2]):
+        epoch, _, option = field.partition(":")
+        bucket = datetime.fromtimestamp(int(epoch), tz=timezone.utc)
+        rollups.setdefault(bucket, [0, 0])[0 if option == "cats" else 1] += int(count)
+
+    events = [_decode_event(raw) for raw in await client.lrange(keys[6], 0, -1)]
+
+    with metrics.FLUSH_SECONDS.time():
+        applied = await db_client.flush_counters(
+            counter_name(),
+            version,
+            int(state["cats"]),
+            int(state["dogs"]),
+            Config.CONSUMER_GROUP,
+            checkpoints,
+            rollups,
+            events,
+        )
+
+    await client.eval(_FINISH_SCRIPT, 4, keys[0], *keys[4:], version)
+
+    logger.info(
+        "counters_flushed" if applied else "counters_flush_skipped",
+        counter=counter_name(),
+        version=version,
+        cats=int(state["cats"]),
+        dogs=int(state["dogs"]),
+        events=len(events)
+    )
+
+    return applied
+
+
+async def flusher() -> None:
+    """Flush every Config.FLUSH_INTERVAL_MS until cancelled."""
+    while True:
+        await asyncio.sleep(Config.FLUSH_INTERVAL_MS / 1000)
+
+        try:
+            await flush()
+        except Exception as e:
+            logger.error("counters_flush_error", error=str(e), exc_info=True)
@@ -1,18 +1,40 @@
 """
 PostgreSQL database client for voting consumer.
 
-Manages connection pool and provides vote increment functionality.
+Manages the connection pool and commits vote batches.
 """
+import random
+from datetime import datetime
+
 import asyncpg
 import structlog
 
 from config import Config
+import metrics
 
 logger = structlog.get_logger()
 
 # Global connection pool
 _pool: asyncpg.Pool | None = None
 
+# Columns of the vote_events rows written by commit_batch()
+VOTE_EVENT_COLUMNS = ["option", "timestamp", "source_ip", "user_agent"]
+
+# Statements commit_batch() runs, prepared on every WriterConnection
+WRITER_STATEMENTS = {
+    "commit_vote_batch": (
+        "SELECT option, new_count "
+        "FROM commit_vote_batch($1, $2, $3, $4, $5, $6, $7, $8)"
+    ),
+    "apply_vote_rollups": "SELECT apply_vote_rollups($1, $2, $3, $4)",
+}
+
+
+class CheckpointConflictError(Exception):
+    """Raised when a stream checkpoint was advanced by another writer."""
+
+    pass
+
 
 async def get_pool() -> asyncpg.Pool:
     """
@@ -31,7 +53,9 @@ async def get_pool() -> asyncpg.Pool:
         _pool = await asyncpg.create_pool(
             Config.DATABASE_URL,
             min_size=2,
-            max_size=10,
+            # A pinned connection per writer task plus room for other queries,
+            # never fewer than the default 10
+            max_size=max(10, Config.WRITER_CONCURRENCY + 2),
             command_timeout=10,
         )
         logger.info("postgres_pool_created")
@@ -50,45 +74,350 @@ async def close_pool() -> None:
         logger.info("postgres_pool_closed")
 
 
-async def increment_vote(option: str) -> tuple[str, int]:
+def pick_slot() -> int:
     """
-    Increment vote count for given option.
+    Pick the counter slot a write is added to.
+
+    Returns:
+        Random slot below Config.COUNTER_SLOTS.
+    """
+    return random.randrange(Config.COUNTER_SLOTS)
 
-    Calls PostgreSQL increment_vote() function which atomically
-    increments the vote count.
+
+async def ensure_counter_slots(slots: int) -> None:
+    """
+    Create the counter rows of slots 0 to slots - 1 that do not exist.
 
     Args:
-        option: Vote option ('cats' or 'dogs').
+        slots: Number of counter slots per option.
+
+    Raises:
+        Exception: If database operation fails.
+    """
+    pool = await get_pool()
+
+    async with pool.acquire() as conn:
+        await conn.execute("SELECT ensure_vote_slots($1)", slots)
+
+    logger.info("counter_slots_ensured", slots=slots)
+
+
+class WriterConnection:
+    """
+    Pool connection pinned to one writer task, with its statements prepared.
+
+    Saves the pool acquire and release of every call (asyncpg resets a
+    connection with an extra round trip on each release) and the
+    statement cache lookup. The connection is taken from the pool on
+    first use and taken again if it was lost.
+    """
+
+    def __init__(self) -> None:
+        self._conn: asyncpg.Connection | None = None
+        self.statements: dict[str, asyncpg.prepared_stmt.PreparedStatement] = {}
+
+    async def connection(self) -> asyncpg.Connection:
+        """
+        Get the pinned connection, acquiring and preparing it if needed.
+
+        Returns:
+            Connection with WRITER_STATEMENTS prepared in self.statements.
+
+        Raises:
+            Exception: If the connection cannot be acquired or prepared.
+        """
+        if self._conn is not None and not self._conn.is_closed():
+            return self._conn
+
+        await self.close()
+
+        pool = await get_pool()
+        conn = await pool.acquire()
+        try:
+            for name, query in WRITER_STATEMENTS.items():
+                self.statements[name] = await conn.prepare(query)
+        except Exception:
+            self.statements = {}
+            await pool.release(conn)
+            raise
+
+        self._conn = conn
+        return conn
+
+    async def close(self) -> None:
+        """Hand the connection back to the pool."""
+        conn, self._conn = self._conn, None
+        self.statements = {}
+
+        if conn is not None and _pool is not None:
+            await _pool.release(conn)
+
+    async def __aenter__(self) -> "WriterConnection":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+
+async def load_checkpoint(stream: str, group: str, consumer: str) -> str:
+    """
+    Load the last applied stream ID for a consumer, creating the row if needed.
+
+    Args:
+        stream: Redis Stream name.
+        group: Consumer group name.
+        consumer: Consumer whose pending entries the checkpoint covers.
 
     Returns:
-        Tuple of (option, new_count).
+        Last applied stream ID ("0-0" if nothing was applied yet).
 
     Raises:
-        ValueError: If option is invalid.
         Exception: If database operation fails.
     """
-    if option not in ("cats", "dogs"):
-        raise ValueError(f"Invalid vote option: {option}")
-
     pool = await get_pool()
 
     async with pool.acquire() as conn:
-        # Call increment_vote PostgreSQL function
-        result = await conn.fetchrow(
-            "SELECT * FROM increment_vote($1)",
-            option
+        last_id = await conn.fetchval(
+            """
+            WITH created AS (
+                INSERT INTO stream_checkpoints (stream_name, group_name, consumer_name)
+                VALUES ($1, $2, $3)
+                ON CONFLICT DO NOTHING
+                RETURNING last_id
+            )
+            SELECT last_id FROM created
+            UNION ALL
+            SELECT last_id FROM stream_checkpoints
+            WHERE stream_name = $1 AND group_name = $2 AND consumer_name = $3
+            LIMIT 1
+            """,
+            stream,
+            group,
+            consumer
         )
 
-        if result is None:
-            raise Exception(f"increment_vote returned no result for {option}")
+    logger.info(
+        "checkpoint_loaded",
+        stream=stream,
+        group=group,
+        consumer=consumer,
+        last_id=last_id
+    )
+
+    return last_id
+
+
+async def commit_batch(
+    stream: str,
+    group: str,
+    consumer: str,
+    expected_id: str,
+    last_id: str,
+    cats_delta: int,
+    dogs_delta: int,
+    events: list[tuple] | None = None,
+    rollups: dict[datetime, list[int]] | None = None,
+    writer: WriterConnection | None = None,
+) -> dict[str, int]:
+    """
+    Apply vote deltas and advance the stream checkpoint atomically.
 
-        new_option = result["option"]
-        new_count = result["new_count"]
+    Calls PostgreSQL commit_vote_batch() which moves the checkpoint from
+    expected_id to last_id and increments the counts, adds the batch to
+    the vote_rollups buckets, and bulk-loads its audit rows into
+    vote_events with COPY, all in one transaction, so a batch is either
+    fully applied and recorded, or not at all. Counts and rollups go to
+    one random counter slot, whose rows stay locked until the commit.
 
-        logger.info(
-            "vote_incremented",
-            option=new_option,
-            new_count=new_count
+    Args:
+        stream: Redis Stream name.
+        group: Consumer group name.
+        consumer: Consumer whose checkpoint covers the batch.
+        expected_id: Checkpoint value the batch was filtered against.
+        last_id: Highest stream ID in the batch.
+        cats_delta: Number of new votes for cats.
+        dogs_delta: Number of new votes for dogs.
+        events: vote_events rows as (option, timestamp, source_ip,
+            user_agent) tuples.
+        rollups: Mapping of minute bucket to [cats, dogs] vote counts.
+        writer: Pinned connection to commit on; a temporary one is used
+            without it.
+
+    Returns:
+        Mapping of option to new count, summed across slots, for each
+        option that changed.
+
+    Raises:
+        CheckpointConflictError: If the checkpoint is no longer expected_id.
+        Exception: If database operation fails.
+    """
+    if writer is None:
+        async with WriterConnection() as writer:
+            return await commit_batch(
+                stream,
+                group,
+                consumer,
+                expected_id,
+                last_id,
+                cats_delta,
+                dogs_delta,
+                events,
+                rollups,
+                writer
+            )
+
+    conn = await writer.connection()
+    statements = writer.statements
+    slot = pick_slot()
+
+    try:
+        with metrics.DB_WRITE_SECONDS.time():
+            async with conn.transaction():
+                rows = await statements["commit_vote_batch"].fetch(
+                    stream,
+                    group,
+                    consumer,
+                    expected_id,
+                    last_id,
+                    cats_delta,
+                    dogs_delta,
+                    slot
+                )
+                if rollups:
+                    buckets = list(rollups)
+                    await statements["apply_vote_rollups"].fetch(
+                        buckets,
+                        [rollups[bucket][0] for bucket in buckets],
+                        [rollups[bucket][1] for bucket in buckets],
+                        slot
+                    )
+                if events:
+                    await conn.copy_records_to_table(
+                        "vote_events",
+                        records=events,
+                        columns=VOTE_EVENT_COLUMNS,
+                    )
+    except asyncpg.SerializationError as e:
+        raise CheckpointConflictError(str(e)) from e
+
+    return {row["option"]: row["new_count"] for row in rows}
+
+
+async def load_counter_state(
+    counter: str, group: str, streams: list[str]
+) -> tuple[dict[str, int], int, dict[tuple[str, str], str]]:
+    """
+    Load the last flushed state of the Redis vote counters.
+
+    Args:
+        counter: Counter name (see counters.counter_name()).
+        group: Consumer group name.
+        streams: Streams whose checkpoints are included.
+
+    Returns:
+        Tuple of (counts, version, checkpoints) where counts maps each
+        option to its count summed across slots, version is the last
+        flushed version (0 if none) and checkpoints maps (stream,
+        consumer) to last_id.
+
+    Raises:
+        Exception: If database operation fails.
+    """
+    pool = await get_pool()
+
+    async with pool.acquire() as conn:
+        rows = await conn.fetch(
+            "SELECT option, SUM(count) AS count FROM votes GROUP BY option"
+        )
+        version = await conn.fetchval(
+            "SELECT version FROM counter_flushes WHERE counter_name = $1",
+            counter
         )
+        checkpoint_rows = await conn.fetch(
+            """
+            SELECT stream_name, consumer_name, last_id FROM stream_checkpoints
+            WHERE group_name = $1 AND stream_name = ANY($2)
+            """,
+            group,
+            streams
+        )
+
+    counts = {row["option"]: row["count"] for row in rows}
+    checkpoints = {
+        (row["stream_name"], row["consumer_name"]): row["last_id"]
+        for row in checkpoint_rows
+    }
+
+    return counts, version or 0, checkpoints
+
+
+async def flush_counters(
+    counter: str,
+    version: int,
+    cats: int,
+    dogs: int,
+    group: str,
+    checkpoints: dict[tuple[str, str], str],
+    rollups: dict[datetime, list[int]],
+    events: list[tuple],
+) -> bool:
+    """
+    Write a snapshot of the Redis vote counters in one transaction.
+
+    Calls PostgreSQL flush_vote_counters() which sets the counts and
+    stream checkpoints to the snapshot's values if its version is newer
+    than the last one flushed; the snapshot's rollup deltas and audit
+    rows are added in the same transaction only then, so flushing a
+    snapshot twice has no effect.
+
+    Args:
+        counter: Counter name (see counters.counter_name()).
+        version: Snapshot version.
+        cats: Total votes for cats.
+        dogs: Total votes for dogs.
+        group: Consumer group name.
+        checkpoints: Mapping of (stream, consumer) to last applied ID.
+        rollups: Mapping of minute bucket to [cats, dogs] vote counts.
+        events: vote_events rows.
+
+    Returns:
+        True if the snapshot was applied, False if it was already flushed.
+
+    Raises:
+        Exception: If database operation fails.
+    """
+    pool = await get_pool()
+    owners = list(checkpoints)
+
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            applied = await conn.fetchval(
+                "SELECT flush_vote_counters($1, $2, $3, $4, $5, $6, $7, $8)",
+                counter,
+                version,
+                cats,
+                dogs,
+                group,
+                [stream for stream, _ in owners],
+                [consumer for _, consumer in owners],
+                [checkpoints[owner] for owner in owners]
+            )
+            if not applied:
+                return False
+
+            if rollups:
+                buckets = list(rollups)
+                await conn.execute(
+                    "SELECT apply_vote_rollups($1, $2, $3)",
+                    buckets,
+                    [rollups[bucket][0] for bucket in buckets],
+                    [rollups[bucket][1] for bucket in buckets]
+                )
+            if events:
+                await conn.copy_records_to_table(
+                    "vote_events",
+                    records=events,
+                    columns=VOTE_EVENT_COLUMNS,
+                )
 
-        return new_option, new_count
+    return True
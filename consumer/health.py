@@ -0,0 +1,143 @@
+"""
+Health, readiness and metrics HTTP endpoint for voting consumer.
+
+A small threaded HTTP server on Config.METRICS_PORT serves:
+
+    /health   200 while every worker's event loop keeps heartbeating
+    /ready    200 once every worker has started and its pipeline runs
+    /metrics  Prometheus metrics (see metrics)
+
+Worker state lives in shared memory created before any worker is forked,
+one slot per worker, so the same server works in-process and in
+supervisor mode, where it runs in the supervisor and reports on the
+whole pod.
+"""
+import asyncio
+import json
+import multiprocessing
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import structlog
+
+from config import Config
+import metrics
+
+logger = structlog.get_logger()
+
+# Seconds between event loop heartbeats
+HEARTBEAT_INTERVAL_S = 1.0
+
+# Per-worker heartbeat (time.monotonic(), shared across processes) and ready flag
+_beats = multiprocessing.RawArray("d", Config.WORKER_PROCESSES)
+_ready = multiprocessing.RawArray("b", Config.WORKER_PROCESSES)
+
+# Slot of this process (set by the supervisor in each worker)
+_slot = 0
+
+for _index in range(Config.WORKER_PROCESSES):
+    _beats[_index] = time.monotonic()
+
+
+def reset_slot(index: int) -> None:
+    """
+    Reset a worker slot to "starting" (fresh heartbeat, not ready).
+
+    Args:
+        index: Worker index.
+    """
+    _beats[index] = time.monotonic()
+    _ready[index] = 0
+
+
+def set_slot(index: int) -> None:
+    """
+    Bind this process to a worker slot.
+
+    Args:
+        index: Worker index.
+    """
+    global _slot
+
+    _slot = index
+    reset_slot(index)
+
+
+def beat() -> None:
+    """Record that this worker's event loop is alive."""
+    _beats[_slot] = time.monotonic()
+
+
+def set_ready(ready: bool) -> None:
+    """
+    Mark this worker ready or not ready.
+
+    Args:
+        ready: True once the worker consumes, False while it is starting,
+            restarting its pipeline or shutting down.
+    """
+    _ready[_slot] = 1 if ready else 0
+
+
+async def heartbeat() -> None:
+    """Beat every HEARTBEAT_INTERVAL_S until cancelled."""
+    while True:
+        beat()
+        await asyncio.sleep(HEARTBEAT_INTERVAL_S)
+
+
+def is_live() -> bool:
+    """Check that every worker heartbeat is recent."""
+    deadline = time.monotonic() - Config.HEALTH_TIMEOUT_S
+    return all(beat_time >= deadline for beat_time in _beats)
+
+
+def is_ready() -> bool:
+    """Check that every worker is ready."""
+    return all(_ready)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Serve /health, /ready and /metrics."""
+
+    def do_GET(self) -> None:
+        if self.path == "/metrics":
+            self._send(200, metrics.exposition(), metrics.CONTENT_TYPE_LATEST)
+        elif self.path == "/health":
+            live = is_live()
+            self._send_status(live, "healthy" if live else "unhealthy")
+        elif self.path == "/ready":
+            ready = is_ready()
+            self._send_status(ready, "ready" if ready else "not_ready")
+        else:
+            self._send_status(False, "not_found", code=404)
+
+    def _send_status(self, ok: bool, status: str, code: int | None = None) -> None:
+        body = json.dumps({"status": status}).encode()
+        self._send(code or (200 if ok else 503), body, "application/json")
+
+    def _send(self, code: int, body: bytes, content_type: str) -> None:
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        # Probes and scrapes would flood the structured logs
+        pass
+
+
+def start_server() -> None:
+    """Serve the endpoint from a daemon thread (no-op if METRICS_PORT is 0)."""
+    if not Config.METRICS_PORT:
+        return
+
+    server = ThreadingHTTPServer(("", Config.METRICS_PORT), _Handler)
+    server.daemon_threads = True
+    threading.Thread(
+        target=server.serve_forever, name="health-server", daemon=True
+    ).start()
+
+    logger.info("health_server_started", port=Config.METRICS_PORT)
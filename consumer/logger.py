@@ -1,15 +1,148 @@
 """
 Structured logging setup for voting consumer.
 
-Uses structlog for consistent, parseable log output.
+Uses structlog for consistent, parseable log output. Loggers only put
+records on an in-process queue; a listener thread renders them to JSON
+and writes them to stdout, so the event loop never waits on log I/O.
+
+Per-batch events are logged at DEBUG (at INFO for a
+Config.LOG_SAMPLE_RATE fraction of them) and counted in a Summary; the
+summarizer() task logs the counts as one INFO event per
+Config.LOG_SUMMARY_INTERVAL_S instead.
 """
+import asyncio
+import atexit
 import logging
+import logging.handlers
+import os
+import queue
+import random
 import sys
+import time
+from collections import Counter
+from typing import Optional
 
 import structlog
 
 from config import Config
 
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler: Optional[logging.handlers.QueueHandler] = None
+_summaries: list["Summary"] = []
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler leaving JSON rendering to the listener thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The queue never leaves the process, and the structlog event
+        # dict in record.msg must reach ProcessorFormatter unrendered
+        return record
+
+
+def _start_listener() -> None:
+    """Start a listener thread writing queued records to stdout."""
+    global _listener
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(
+        structlog.stdlib.ProcessorFormatter(
+            processors=[
+                structlog.stdlib.ProcessorFormatter.remove_processors_meta,
+                structlog.processors.JSONRenderer(),
+            ],
+            # Records of other libraries, logged through plain logging
+            foreign_pre_chain=[
+                structlog.stdlib.add_logger_name,
+                structlog.stdlib.add_log_level,
+                structlog.processors.TimeStamper(fmt="iso"),
+                structlog.processors.format_exc_info,
+            ],
+        )
+    )
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    _handler.queue = log_queue
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    _listener.start()
+
+
+def _restart_after_fork() -> None:
+    """Give a forked worker its own queue and listener thread."""
+    if _listener is not None:
+        _start_listener()
+
+
+def stop_logging() -> None:
+    """Write out every record still queued and stop the listener."""
+    global _listener
+
+    if _listener is None:
+        return
+
+    _listener.stop()
+    _listener = None
+
+
+def sampled() -> bool:
+    """
+    Decide whether to log a single per-batch event at INFO.
+
+    Returns:
+        True for a Config.LOG_SAMPLE_RATE fraction of calls.
+    """
+    return Config.LOG_SAMPLE_RATE > 0 and random.random() < Config.LOG_SAMPLE_RATE
+
+
+class Summary:
+    """
+    Counts of per-batch events, logged by summarizer() as one INFO event.
+
+    Args:
+        event: Event name the counts are logged under.
+    """
+
+    def __init__(self, event: str):
+        self._logger = structlog.get_logger()
+        self._event = event
+        self._counts: Counter = Counter()
+        self._since = time.monotonic()
+        _summaries.append(self)
+
+    def add(self, **counts: int) -> None:
+        """
+        Add to the counts of the current interval.
+
+        Args:
+            **counts: Increment per field of the summary event.
+        """
+        self._counts.update(counts)
+
+    def flush(self) -> None:
+        """Log the counts with the seconds they cover, unless there are none."""
+        now = time.monotonic()
+        if self._counts:
+            self._logger.info(
+                self._event,
+                interval_s=round(now - self._since, 1),
+                **self._counts
+            )
+        self._counts = Counter()
+        self._since = now
+
+
+def flush_summaries() -> None:
+    """Log every summary with counts left."""
+    for summary in _summaries:
+        summary.flush()
+
+
+async def summarizer() -> None:
+    """Flush every summary each Config.LOG_SUMMARY_INTERVAL_S until cancelled."""
+    while True:
+        await asyncio.sleep(Config.LOG_SUMMARY_INTERVAL_S)
+        flush_summaries()
+
 
 def setup_logging() -> structlog.stdlib.BoundLogger:
     """
@@ -18,14 +151,20 @@ def setup_logging() -> structlog.stdlib.BoundLogger:
     Returns:
         Configured structlog logger instance.
     """
+    global _handler
+
     # Configure standard library logging
-    logging.basicConfig(
-        format="%(message)s",
-        stream=sys.stdout,
-        level=getattr(logging, Config.LOG_LEVEL.upper(), logging.INFO),
-    )
+    if _handler is None:
+        _handler = _DeferredQueueHandler(queue.SimpleQueue())
+        _start_listener()
+        os.register_at_fork(after_in_child=_restart_after_fork)
+        atexit.register(stop_logging)
+
+    root = logging.getLogger()
+    root.handlers = [_handler]
+    root.setLevel(getattr(logging, Config.LOG_LEVEL.upper(), logging.INFO))
 
-    # Configure structlog
+    # Configure structlog; rendering happens in the listener thread
     structlog.configure(
         processors=[
             structlog.stdlib.filter_by_level,
@@ -35,7 +174,7 @@ def setup_logging() -> structlog.stdlib.BoundLogger:
             structlog.processors.StackInfoRenderer(),
             structlog.processors.format_exc_info,
             structlog.processors.UnicodeDecoder(),
-            structlog.processors.JSONRenderer(),
+            structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
         ],
         context_class=dict,
         logger_factory=structlog.stdlib.LoggerFactory(),
@@ -7,14 +7,21 @@ Implements consumer group pattern with graceful shutdown.
 import asyncio
 import signal
 import sys
+import time
 from typing import NoReturn
 
 import structlog
 
 from config import Config
-from logger import setup_logging
+from logger import flush_summaries, setup_logging, stop_logging, summarizer
 import redis_client
 import db_client
+import counters
+import health
+import partitions
+import pipeline
+import retries
+import supervisor
 
 # Setup logging
 logger = setup_logging()
@@ -22,138 +29,51 @@ logger = setup_logging()
 # Shutdown flag
 shutdown_flag = False
 
+# Pause before restarting a failed pipeline, doubled while it keeps failing
+RESTART_DELAY_S = 1.0
+MAX_RESTART_DELAY_S = 10.0
 
-def signal_handler(signum: int, frame) -> None:
+
+def signal_handler(signum: int, frame=None) -> None:
     """
     Handle shutdown signals (SIGTERM, SIGINT).
 
     Args:
         signum: Signal number.
-        frame: Current stack frame.
+        frame: Current stack frame (None when run by the event loop).
     """
     global shutdown_flag
 
     sig_name = signal.Signals(signum).name
     logger.info("shutdown_signal_received", signal=sig_name)
     shutdown_flag = True
-
-
-async def process_message(message_id: str, message_data: dict) -> bool:
-    """
-    Process a single vote message.
-
-    Args:
-        message_id: Redis Stream message ID.
-        message_data: Message payload containing vote data.
-
-    Returns:
-        True if processing succeeded, False otherwise.
-    """
-    try:
-        # Extract vote from message
-        vote = message_data.get("option")
-
-        if not vote:
-            logger.warning(
-                "malformed_message_missing_option",
-                message_id=message_id,
-                data=message_data
-            )
-            return False
-
-        # Validate vote option
-        if vote not in ("cats", "dogs"):
-            logger.warning(
-                "invalid_vote_option",
-                message_id=message_id,
-                vote=vote
-            )
-            return False
-
-        logger.info(
-            "processing_vote",
-            message_id=message_id,
-            vote=vote
-        )
-
-        # Increment vote in database with retries
-        retries = 0
-        while retries < Config.MAX_RETRIES:
-            try:
-                option, new_count = await db_client.increment_vote(vote)
-                logger.info(
-                    "vote_processed",
-                    message_id=message_id,
-                    option=option,
-                    new_count=new_count
-                )
-                return True
-
-            except Exception as db_error:
-                retries += 1
-                logger.error(
-                    "database_error",
-                    message_id=message_id,
-                    vote=vote,
-                    attempt=retries,
-                    max_retries=Config.MAX_RETRIES,
-                    error=str(db_error)
-                )
-
-                if retries < Config.MAX_RETRIES:
-                    await asyncio.sleep(1 * retries)  # Exponential backoff
-                else:
-                    logger.error(
-                        "vote_processing_failed",
-                        message_id=message_id,
-                        vote=vote
-                    )
-                    return False
-
-        return False
-
-    except Exception as e:
-        logger.error(
-            "message_processing_error",
-            message_id=message_id,
-            error=str(e),
-            exc_info=True
-        )
-        return False
+    # Interrupt a blocking read now instead of after BLOCK_MS
+    pipeline.request_stop()
 
 
 async def process_loop() -> None:
     """
     Main processing loop.
 
-    Continuously reads messages from Redis Stream and processes them.
-    Handles errors and respects shutdown flag.
+    Runs the reader/writer/acker pipeline until the shutdown flag is set.
+    When a batch fails to commit the pipeline is restarted, which re-reads
+    the pending entries instead of retrying individual messages; any other
+    error (Redis or PostgreSQL down while it starts) restarts it as well.
+    Consecutive restarts back off up to MAX_RESTART_DELAY_S.
     """
     logger.info("starting_consumer_loop")
+    delay = RESTART_DELAY_S
 
     while not shutdown_flag:
-        try:
-            # Read messages from Redis Stream
-            messages = await redis_client.read_messages()
-
-            if not messages:
-                # No messages available (timeout)
-                continue
+        started = time.monotonic()
 
-            logger.info("messages_received", count=len(messages))
-
-            # Process each message
-            for message_id, message_data in messages:
-                if shutdown_flag:
-                    logger.info("shutdown_during_processing")
-                    break
-
-                success = await process_message(message_id, message_data)
+        try:
+            health.set_ready(True)
+            await pipeline.run(lambda: shutdown_flag)
+            continue
 
-                # Acknowledge message if processed successfully or malformed
-                # (we don't want to retry malformed messages forever)
-                if success or not message_data.get("vote"):
-                    await redis_client.ack_message(message_id)
+        except pipeline.PipelineAborted as e:
+            logger.warning("pipeline_restarting", reason=str(e))
 
         except Exception as e:
             logger.error(
@@ -161,8 +81,16 @@ async def process_loop() -> None:
                 error=str(e),
                 exc_info=True
             )
-            # Brief pause before retrying
-            await asyncio.sleep(1)
+
+        health.set_ready(False)
+        # A pipeline that ran for a while failed on its own, not in a loop
+        if time.monotonic() - started > MAX_RESTART_DELAY_S:
+            delay = RESTART_DELAY_S
+        # Pause before re-reading pending entries
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, MAX_RESTART_DELAY_S)
+
+    health.set_ready(False)
 
     logger.info("consumer_loop_stopped")
 
@@ -173,15 +101,21 @@ async def startup() -> None:
         "consumer_starting",
         version="0.2.0",
         stream=Config.STREAM_NAME,
+        partitions=Config.STREAM_PARTITIONS,
         group=Config.CONSUMER_GROUP,
-        consumer=Config.CONSUMER_NAME
+        consumer=Config.CONSUMER_NAME,
+        counter_mode=Config.COUNTER_MODE,
+        counter_slots=Config.COUNTER_SLOTS,
+        results_notify=Config.RESULTS_NOTIFY
     )
 
-    # Ensure consumer group exists
-    await redis_client.ensure_consumer_group()
+    # Ensure consumer group exists on every partition and retry stream
+    for stream in retries.all_streams():
+        await redis_client.ensure_consumer_group(stream)
 
-    # Initialize database pool
+    # Initialize database pool and the counter rows batches are added to
     await db_client.get_pool()
+    await db_client.ensure_counter_slots(Config.COUNTER_SLOTS)
 
     logger.info("consumer_initialized")
 
@@ -190,10 +124,31 @@ async def shutdown() -> None:
     """Clean up consumer resources."""
     logger.info("consumer_shutting_down")
 
+    # Persist what is only counted in Redis so far
+    if Config.COUNTER_MODE == "redis":
+        try:
+            await counters.flush()
+        except Exception as e:
+            logger.error("counters_flush_error", error=str(e))
+
+    # Let other consumers claim entries read but not committed
+    try:
+        released = await redis_client.release_pending(retries.all_streams())
+        logger.info("pending_released", count=released)
+    except Exception as e:
+        logger.error("pending_release_error", error=str(e))
+
+    # Hand partitions to the remaining replicas right away
+    try:
+        await partitions.release_all()
+    except Exception as e:
+        logger.error("partition_release_error", error=str(e))
+
     # Close connections
     await redis_client.close_client()
     await db_client.close_pool()
 
+    flush_summaries()
     logger.info("consumer_shutdown_complete")
 
 
@@ -203,9 +158,20 @@ async def main_async() -> NoReturn:
 
     Sets up signal handlers, runs processing loop, and handles shutdown.
     """
-    # Register signal handlers
-    signal.signal(signal.SIGTERM, signal_handler)
-    signal.signal(signal.SIGINT, signal_handler)
+    # Register signal handlers on the event loop, so a signal wakes it
+    # even while it waits on Redis
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, signal_handler, sig, None)
+
+    # Liveness: keeps beating as long as the event loop is responsive
+    heartbeat = asyncio.create_task(health.heartbeat())
+    # Per-batch event counts, logged once per summary interval
+    summaries = asyncio.create_task(summarizer())
+    # Write-behind persistence of the Redis counters
+    flusher = None
+    if Config.COUNTER_MODE == "redis":
+        flusher = asyncio.create_task(counters.flusher())
 
     try:
         # Startup
@@ -220,15 +186,37 @@ async def main_async() -> NoReturn:
 
     finally:
         # Shutdown
+        if flusher is not None:
+            flusher.cancel()
+        summaries.cancel()
         await shutdown()
+        heartbeat.cancel()
 
     logger.info("consumer_exiting")
     sys.exit(0)
 
 
+def run_worker() -> NoReturn:
+    """Run one consumer process."""
+    try:
+        asyncio.run(main_async())
+    finally:
+        # Forked workers exit without running atexit handlers
+        stop_logging()
+
+
 def main() -> NoReturn:
-    """Synchronous entry point."""
-    asyncio.run(main_async())
+    """
+    Synchronous entry point.
+
+    Starts the health/metrics endpoint, then runs the consumer in this
+    process or forks Config.WORKER_PROCESSES workers under a supervisor.
+    """
+    health.start_server()
+
+    if Config.WORKER_PROCESSES > 1:
+        supervisor.run(run_worker)
+    run_worker()
 
 
 if __name__ == "__main__":
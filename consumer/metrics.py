@@ -0,0 +1,109 @@
+"""
+Prometheus metrics for voting consumer.
+
+Metrics are exported by the embedded HTTP server (see health). In
+supervisor mode every worker process writes its samples to a shared
+directory (prometheus_client multiprocess mode) and the supervisor
+serves the aggregate, so one scrape covers the whole pod.
+"""
+import os
+import tempfile
+
+from config import Config
+
+# Multiprocess mode must be configured before prometheus_client is imported
+if Config.WORKER_PROCESSES > 1 and "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(
+        prefix="consumer-metrics-"
+    )
+
+from prometheus_client import (  # noqa: E402
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+MESSAGES_READ = Counter(
+    "consumer_messages_read_total",
+    "Stream entries handed to the pipeline (new, pending and reclaimed)",
+)
+MESSAGES_PROCESSED = Counter(
+    "consumer_messages_processed_total",
+    "Votes committed to PostgreSQL",
+)
+MESSAGES_FAILED = Counter(
+    "consumer_messages_failed_total",
+    "Stream entries that could not be applied",
+    ["reason"],
+)
+MESSAGES_DEFERRED = Counter(
+    "consumer_messages_deferred_total",
+    "Stream entries that failed to commit, moved to a retry or dead-letter stream",
+    ["target"],
+)
+MESSAGES_ACKED = Counter(
+    "consumer_messages_acked_total",
+    "Stream entries acknowledged with XACK",
+)
+ENTRIES_TRIMMED = Counter(
+    "consumer_stream_entries_trimmed_total",
+    "Acknowledged stream entries removed with XTRIM MINID",
+    ["stream"],
+)
+BATCH_SIZE = Histogram(
+    "consumer_batch_size",
+    "Stream entries per batch",
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500),
+)
+DB_WRITE_SECONDS = Histogram(
+    "consumer_db_write_seconds",
+    "Latency of one batch commit to PostgreSQL",
+)
+FLUSH_SECONDS = Histogram(
+    "consumer_counter_flush_seconds",
+    "Latency of one Redis counter flush to PostgreSQL (COUNTER_MODE=redis)",
+)
+STREAM_LAG = Gauge(
+    "consumer_stream_lag",
+    "Entries not yet delivered to the consumer group",
+    ["stream"],
+    multiprocess_mode="mostrecent",
+)
+PENDING_ENTRIES = Gauge(
+    "consumer_pending_entries",
+    "Entries delivered but not yet acknowledged (PEL size)",
+    ["stream"],
+    multiprocess_mode="mostrecent",
+)
+
+
+def exposition() -> bytes:
+    """
+    Render all metrics in the Prometheus text format.
+
+    Returns:
+        Encoded metrics, aggregated across worker processes in
+        supervisor mode.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+
+    return generate_latest(REGISTRY)
+
+
+def mark_process_dead(pid: int) -> None:
+    """
+    Drop live samples of a worker process that exited.
+
+    Args:
+        pid: Process ID of the exited worker.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,183 @@
+"""
+Stream partition assignment for voting consumer.
+
+With Config.STREAM_PARTITIONS > 1 the API spreads votes over the streams
+"<STREAM_NAME>:0" .. "<STREAM_NAME>:<N-1>" and every consumer replica
+reads only the partitions it holds a lease on. Leases are Redis keys
+with a TTL; live consumers announce themselves in a heartbeat sorted set
+and each one holds about ceil(partitions / live consumers) leases, so
+adding replicas spreads the partitions and a crashed replica's leases
+expire and are picked up by the others.
+
+With a single partition every consumer reads Config.STREAM_NAME and no
+leases are used.
+"""
+import asyncio
+import math
+import time
+import zlib
+from typing import Callable
+
+import structlog
+
+from config import Config
+import redis_client
+
+logger = structlog.get_logger()
+
+# Renew a lease only if this consumer still holds it
+_RENEW_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Release a lease only if this consumer still holds it
+_RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Streams this consumer currently holds leases for
+_owned: list[str] = []
+
+
+def all_streams() -> list[str]:
+    """
+    List every vote stream the API writes to.
+
+    Returns:
+        Stream names, in partition order.
+    """
+    if Config.STREAM_PARTITIONS == 1:
+        return [Config.STREAM_NAME]
+    return [f"{Config.STREAM_NAME}:{n}" for n in range(Config.STREAM_PARTITIONS)]
+
+
+def owned_streams() -> list[str]:
+    """
+    List the streams this consumer should read.
+
+    Returns:
+        Stream names this consumer holds leases for (every stream when
+        the vote stream is not partitioned).
+    """
+    if Config.STREAM_PARTITIONS == 1:
+        return all_streams()
+    return list(_owned)
+
+
+def _lease_key(stream: str) -> str:
+    """Redis key of a partition lease."""
+    return f"{stream}:lease"
+
+
+def _members_key() -> str:
+    """Redis key of the consumer heartbeat sorted set."""
+    return f"{Config.STREAM_NAME}:consumers"
+
+
+async def _fair_share() -> int:
+    """
+    Record a heartbeat and compute how many partitions to hold.
+
+    Returns:
+        ceil(partitions / live consumers).
+    """
+    client = await redis_client.get_client()
+    now_ms = int(time.time() * 1000)
+
+    async with client.pipeline(transaction=False) as pipe:
+        pipe.zadd(_members_key(), {Config.CONSUMER_NAME: now_ms})
+        pipe.zremrangebyscore(_members_key(), "-inf", now_ms - Config.LEASE_TTL_MS)
+        pipe.zcard(_members_key())
+        _, _, live = await pipe.execute()
+
+    return math.ceil(Config.STREAM_PARTITIONS / max(live, 1))
+
+
+async def rebalance() -> list[str]:
+    """
+    Renew held leases and acquire or release leases towards a fair share.
+
+    Returns:
+        Streams this consumer holds leases for after rebalancing.
+    """
+    client = await redis_client.get_client()
+    share = await _fair_share()
+    ttl = Config.LEASE_TTL_MS
+
+    owned = [
+        stream for stream in _owned
+        if await client.eval(
+            _RENEW_SCRIPT, 1, _lease_key(stream), Config.CONSUMER_NAME, ttl
+        )
+    ]
+
+    # Hand surplus partitions back so new replicas can pick them up
+    while len(owned) > share:
+        stream = owned.pop()
+        await client.eval(
+            _RELEASE_SCRIPT, 1, _lease_key(stream), Config.CONSUMER_NAME
+        )
+
+    # Start at a per-consumer offset so replicas don't race for the same keys
+    streams = all_streams()
+    offset = zlib.crc32(Config.CONSUMER_NAME.encode()) % len(streams)
+
+    for stream in streams[offset:] + streams[:offset]:
+        if len(owned) >= share:
+            break
+        if stream in owned:
+            continue
+        acquired = await client.set(
+            _lease_key(stream), Config.CONSUMER_NAME, nx=True, px=ttl
+        )
+        if acquired:
+            owned.append(stream)
+
+    if set(owned) != set(_owned):
+        logger.info("partitions_rebalanced", owned=sorted(owned), share=share)
+
+    _owned[:] = owned
+    return owned
+
+
+async def maintain(should_stop: Callable[[], bool]) -> None:
+    """
+    Keep partition leases renewed and balanced until shutdown.
+
+    Args:
+        should_stop: Returns True once shutdown has been requested.
+    """
+    if Config.STREAM_PARTITIONS == 1:
+        return
+
+    while not should_stop():
+        try:
+            await rebalance()
+        except Exception as e:
+            logger.error("rebalance_error", error=str(e), exc_info=True)
+
+        # Renew well before the TTL runs out
+        await asyncio.sleep(Config.LEASE_TTL_MS / 3000)
+
+
+async def release_all() -> None:
+    """Release every held lease and leave the heartbeat set."""
+    if Config.STREAM_PARTITIONS == 1:
+        return
+
+    client = await redis_client.get_client()
+
+    for stream in _owned:
+        await client.eval(
+            _RELEASE_SCRIPT, 1, _lease_key(stream), Config.CONSUMER_NAME
+        )
+    await client.zrem(_members_key(), Config.CONSUMER_NAME)
+
+    logger.info("partitions_released", count=len(_owned))
+    _owned.clear()
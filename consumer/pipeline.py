@@ -0,0 +1,454 @@
+"""
+Staged processing pipeline for voting consumer.
+
+Runs the consumer as concurrent asyncio stages connected by queues:
+
+    reader --(batches)--> N writers --(ack IDs)--> acker
+
+The batch queue is bounded by Config.PIPELINE_QUEUE_SIZE, so when the
+writers fall behind the reader blocks on put() instead of pulling more
+entries from Redis (backpressure). Network waits on XREADGROUP and XACK
+overlap with database work, and a slow batch only occupies one writer.
+
+Batches sharing a checkpoint are committed in the order they were read.
+A failed commit is never retried in place: its entries are moved to a
+retry stream (see retries) and the pipeline carries on. Only when that
+is not possible (the checkpoint cannot be read, or another writer moved
+it) does the pipeline abort; the next run re-reads the pending entries,
+skipping whatever the checkpoint shows as already applied.
+
+On shutdown (request_stop()) the reader and retry scheduler are
+cancelled at once, even in the middle of a blocking XREADGROUP, and the
+batches already queued get Config.DRAIN_TIMEOUT_S to commit. Anything
+read but not committed by then stays pending for the shutdown to release.
+"""
+import asyncio
+import time
+from typing import Callable
+
+import structlog
+
+from config import Config
+import adaptive
+import catchup
+import counters
+import db_client
+import metrics
+import partitions
+import processor
+import redis_client
+import retries
+import trimming
+
+logger = structlog.get_logger()
+
+
+# Set by request_stop() to interrupt the running pipeline
+_stop_requested: asyncio.Event | None = None
+
+
+def request_stop() -> None:
+    """Stop reading immediately and start draining the running pipeline."""
+    if _stop_requested is not None:
+        _stop_requested.set()
+
+
+class PipelineAborted(Exception):
+    """Raised when a batch failed to commit and the pipeline must restart."""
+
+    pass
+
+
+class CommitOrder:
+    """
+    Serialize commits per checkpoint in the order batches were read.
+
+    The reader takes a ticket for every batch; a writer may only commit
+    once every earlier ticket of the same (stream, owner) checkpoint has
+    been committed. Batches of different checkpoints commit concurrently.
+    """
+
+    def __init__(self) -> None:
+        self._issued: dict[tuple[str, str], int] = {}
+        self._committed: dict[tuple[str, str], int] = {}
+        self._changed = asyncio.Condition()
+        self.aborted = False
+
+    def ticket(self, key: tuple[str, str]) -> int:
+        """Issue the next commit ticket for a checkpoint."""
+        ticket = self._issued.get(key, 0)
+        self._issued[key] = ticket + 1
+        return ticket
+
+    async def wait_turn(self, key: tuple[str, str], ticket: int) -> None:
+        """
+        Wait until the batch holding this ticket may commit.
+
+        Raises:
+            PipelineAborted: If an earlier commit failed.
+        """
+        async with self._changed:
+            await self._changed.wait_for(
+                lambda: self.aborted or self._committed.get(key, 0) == ticket
+            )
+        if self.aborted:
+            raise PipelineAborted("earlier batch failed to commit")
+
+    async def done(self, key: tuple[str, str], ticket: int) -> None:
+        """Mark a ticket as committed and wake the next writer."""
+        async with self._changed:
+            self._committed[key] = ticket + 1
+            self._changed.notify_all()
+
+    async def abort(self) -> None:
+        """Fail every batch still waiting for its turn."""
+        async with self._changed:
+            self.aborted = True
+            self._changed.notify_all()
+
+
+async def check_streams(
+    streams: list[str],
+    submit: catchup.Submit,
+    should_stop: Callable[[], bool],
+) -> None:
+    """
+    Run periodic catch-up checks on the streams being read.
+
+    Streams whose lag crossed the threshold get a full catch-up pass;
+    the others only have stale pending entries reclaimed, so entries
+    left behind by a crashed consumer or a moved partition are picked up.
+
+    Args:
+        streams: Streams this consumer currently reads.
+        submit: Coroutine that queues a batch for the writers.
+        should_stop: Returns True once shutdown has been requested.
+    """
+    for stream in streams:
+        if await catchup.lag_exceeded(stream):
+            await catchup.run(stream, submit, should_stop, include_own=False)
+        else:
+            await catchup.reclaim_stale(stream, submit, should_stop)
+
+
+async def reader(
+    submit: catchup.Submit, should_stop: Callable[[], bool]
+) -> None:
+    """
+    Read batches from the Redis Streams and hand them to the writers.
+
+    Every stream starts with a catch-up pass (own and stale pending
+    entries, then the backlog) when this consumer begins reading it, at
+    startup or after acquiring its partition. Catch-up checks then run
+    every Config.CATCHUP_CHECK_INTERVAL_S. Read size and block timeout
+    follow consumer group lag (see adaptive).
+
+    Args:
+        submit: Coroutine that queues a batch for the writers.
+        should_stop: Returns True once shutdown has been requested.
+    """
+    streams: list[str] = []
+    next_check = time.monotonic() + Config.CATCHUP_CHECK_INTERVAL_S
+
+    while not should_stop():
+        try:
+            owned = partitions.owned_streams()
+
+            for stream in owned:
+                if stream not in streams:
+                    await catchup.run(stream, submit, should_stop, include_own=True)
+            streams = owned
+
+            if time.monotonic() >= next_check:
+                next_check = time.monotonic() + Config.CATCHUP_CHECK_INTERVAL_S
+                await check_streams(streams, submit, should_stop)
+
+            if not streams:
+                # Waiting for a partition lease
+                await asyncio.sleep(Config.IDLE_BLOCK_MS / 1000)
+                continue
+
+            await adaptive.sample(streams)
+            batches = await redis_client.read_messages(
+                streams, adaptive.batch_size(), adaptive.block_ms()
+            )
+            adaptive.observe(max((len(m) for _, m in batches), default=0))
+
+            for stream, messages in batches:
+                logger.debug("messages_received", stream=stream, count=len(messages))
+                await submit(stream, messages, Config.CONSUMER_NAME)
+
+        except Exception as e:
+            logger.error("reader_error", error=str(e), exc_info=True)
+            # Brief pause before retrying
+            await asyncio.sleep(1)
+
+    logger.info("reader_stopped")
+
+
+async def defer_batch(
+    stream: str,
+    owner: str,
+    messages: list[tuple[str, dict]],
+    error: Exception,
+) -> list[str]:
+    """
+    Move the entries of a batch that failed to commit to a retry stream.
+
+    The checkpoint is reloaded first: a commit that failed after the
+    transaction went through (e.g. the connection dropped) left it at
+    the end of the batch, and entries at or below it are applied.
+
+    Args:
+        stream: Redis Stream the batch was read from.
+        owner: Consumer whose checkpoint covers the batch.
+        messages: List of (message_id, message_data) tuples in stream order.
+        error: Why the commit failed.
+
+    Returns:
+        IDs of the entries that were applied and still need an XACK.
+
+    Raises:
+        Exception: If the checkpoint cannot be loaded or the entries
+            cannot be moved; the batch stays pending.
+    """
+    checkpoint_key = processor.stream_id_key(
+        await processor.reload_checkpoint(stream, owner)
+    )
+
+    applied = [
+        message_id
+        for message_id, _ in messages
+        if processor.stream_id_key(message_id) <= checkpoint_key
+    ]
+    failed = [
+        message
+        for message in messages
+        if processor.stream_id_key(message[0]) > checkpoint_key
+    ]
+
+    if failed:
+        await retries.defer(stream, failed, str(error))
+
+    return applied
+
+
+async def writer(
+    worker_id: int,
+    batches: asyncio.Queue,
+    acks: asyncio.Queue,
+    order: CommitOrder,
+) -> None:
+    """
+    Commit batches to PostgreSQL and forward the IDs to acknowledge.
+
+    Batches that fail to commit are moved to a retry stream; if that is
+    not possible either, the pipeline is aborted.
+
+    Args:
+        worker_id: Index of this writer, used for logging.
+        batches: Queue of (stream, owner, ticket, messages) read from Redis.
+        acks: Queue of (stream, message IDs) for the acker.
+        order: Commit ordering shared by all writers.
+    """
+    # Commits go through one pinned connection per writer
+    async with db_client.WriterConnection() as db_writer:
+        while True:
+            stream, owner, ticket, messages = await batches.get()
+            try:
+                await order.wait_turn((stream, owner), ticket)
+                ack_ids = await processor.process_batch(
+                    stream, messages, owner, db_writer
+                )
+                await order.done((stream, owner), ticket)
+                await acks.put((stream, ack_ids))
+
+            except PipelineAborted:
+                # Left pending; redelivered when the pipeline restarts
+                pass
+
+            except Exception as e:
+                logger.error(
+                    "batch_commit_failed",
+                    writer=worker_id,
+                    stream=stream,
+                    owner=owner,
+                    batch_size=len(messages),
+                    first_message_id=messages[0][0],
+                    last_message_id=messages[-1][0],
+                    error=str(e),
+                    exc_info=True
+                )
+
+                if isinstance(e, db_client.CheckpointConflictError):
+                    # Another writer moved the checkpoint; re-read from it
+                    metrics.MESSAGES_FAILED.labels(reason="commit").inc(len(messages))
+                    await order.abort()
+                    continue
+
+                try:
+                    ack_ids = await defer_batch(stream, owner, messages, e)
+                    await order.done((stream, owner), ticket)
+                    await acks.put((stream, ack_ids))
+
+                except Exception as defer_error:
+                    logger.error(
+                        "batch_defer_failed",
+                        writer=worker_id,
+                        stream=stream,
+                        owner=owner,
+                        error=str(defer_error),
+                        exc_info=True
+                    )
+                    metrics.MESSAGES_FAILED.labels(reason="commit").inc(len(messages))
+                    await order.abort()
+
+            finally:
+                batches.task_done()
+
+
+async def acker(acks: asyncio.Queue) -> None:
+    """
+    Acknowledge processed messages, coalescing queued batches.
+
+    Every ID list already waiting in the queue is merged into one
+    pipelined XACK per stream so a burst of committed batches costs one
+    round trip.
+
+    Args:
+        acks: Queue of (stream, message IDs) produced by the writers.
+    """
+    while True:
+        ack_ids: dict[str, list[str]] = {}
+        stream, ids = await acks.get()
+        ack_ids.setdefault(stream, []).extend(ids)
+        drained = 1
+
+        while not acks.empty():
+            stream, ids = acks.get_nowait()
+            ack_ids.setdefault(stream, []).extend(ids)
+            drained += 1
+
+        try:
+            acked = await redis_client.ack_messages(ack_ids)
+            metrics.MESSAGES_ACKED.inc(acked)
+
+        except Exception as e:
+            # Unacked messages stay pending; the checkpoint marks them applied
+            logger.error(
+                "ack_error",
+                count=sum(len(ids) for ids in ack_ids.values()),
+                error=str(e),
+                exc_info=True
+            )
+
+        finally:
+            for _ in range(drained):
+                acks.task_done()
+
+
+async def _drain(batches: asyncio.Queue, acks: asyncio.Queue) -> None:
+    """Wait until every queued batch is committed and acknowledged."""
+    await batches.join()
+    await acks.join()
+
+
+async def run(should_stop: Callable[[], bool]) -> None:
+    """
+    Run the pipeline until shutdown, then drain in-flight work.
+
+    Once the reader stops, or as soon as request_stop() is called, the
+    reader and retry scheduler are cancelled and the batches already
+    queued are committed and acknowledged, for at most
+    Config.DRAIN_TIMEOUT_S, before the other tasks are cancelled.
+
+    Args:
+        should_stop: Returns True once shutdown has been requested.
+
+    Raises:
+        PipelineAborted: If a batch failed to commit. Entries from that
+            batch onwards were left pending for the next run.
+    """
+    global _stop_requested
+
+    _stop_requested = asyncio.Event()
+    if should_stop():
+        _stop_requested.set()
+
+    batches: asyncio.Queue = asyncio.Queue(maxsize=Config.PIPELINE_QUEUE_SIZE)
+    acks: asyncio.Queue = asyncio.Queue()
+    order = CommitOrder()
+
+    async def submit(
+        stream: str, messages: list[tuple[str, dict]], owner: str
+    ) -> None:
+        metrics.MESSAGES_READ.inc(len(messages))
+        metrics.BATCH_SIZE.observe(len(messages))
+
+        # Blocks while the queue is full
+        ticket = order.ticket((stream, owner))
+        await batches.put((stream, owner, ticket, messages))
+
+    # Cached checkpoints may be stale after a failed commit
+    processor.reset_checkpoints()
+    if Config.COUNTER_MODE == "redis":
+        # Recreates the counters from the last flush if Redis lost them
+        await counters.seed()
+    adaptive.reset()
+
+    workers = [
+        asyncio.create_task(writer(i, batches, acks, order))
+        for i in range(Config.WRITER_CONCURRENCY)
+    ]
+    workers.append(asyncio.create_task(acker(acks)))
+    workers.append(
+        asyncio.create_task(partitions.maintain(lambda: should_stop() or order.aborted))
+    )
+    workers.append(
+        asyncio.create_task(trimming.maintain(lambda: should_stop() or order.aborted))
+    )
+
+    # Stages that put batches on the queue, stopped first on shutdown
+    feeders = [
+        asyncio.create_task(reader(submit, lambda: should_stop() or order.aborted)),
+        asyncio.create_task(
+            retries.scheduler(submit, lambda: should_stop() or order.aborted)
+        ),
+    ]
+    stopped = asyncio.create_task(_stop_requested.wait())
+
+    logger.info(
+        "pipeline_started",
+        writers=Config.WRITER_CONCURRENCY,
+        queue_size=Config.PIPELINE_QUEUE_SIZE
+    )
+
+    try:
+        await asyncio.wait(
+            [feeders[0], stopped], return_when=asyncio.FIRST_COMPLETED
+        )
+
+        # Entries read but not queued yet stay pending
+        for task in feeders:
+            task.cancel()
+        await asyncio.gather(*feeders, return_exceptions=True)
+
+        # Drain: commit queued batches, then flush their acks
+        try:
+            await asyncio.wait_for(_drain(batches, acks), Config.DRAIN_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            logger.warning(
+                "drain_timeout",
+                timeout_s=Config.DRAIN_TIMEOUT_S,
+                batches_left=batches.qsize()
+            )
+
+    finally:
+        for task in [stopped, *feeders, *workers]:
+            task.cancel()
+        await asyncio.gather(stopped, *feeders, *workers, return_exceptions=True)
+
+    if order.aborted:
+        raise PipelineAborted("batch commit failed")
+
+    logger.info("pipeline_stopped")
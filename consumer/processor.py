@@ -0,0 +1,332 @@
+"""
+Vote batch processing for voting consumer.
+
+Validates stream messages, folds them into per-option deltas and
+commits each batch to PostgreSQL.
+"""
+import ipaddress
+from datetime import datetime, timezone
+
+import structlog
+
+from config import Config
+import counters
+import db_client
+from logger import Summary, sampled
+import metrics
+import redis_client
+
+logger = structlog.get_logger()
+
+# Committed batches, messages and votes, logged once per summary interval
+summary = Summary("batches_summary")
+
+# Last applied stream ID per (stream, owning consumer), mirrored from
+# PostgreSQL (or Redis with COUNTER_MODE=redis)
+_checkpoints: dict[tuple[str, str], str] = {}
+
+
+def parse_vote(message_id: str, message_data: dict) -> str | None:
+    """
+    Extract and validate the vote option from a stream message.
+
+    Args:
+        message_id: Redis Stream message ID.
+        message_data: Message payload containing vote data.
+
+    Returns:
+        Vote option ('cats' or 'dogs'), or None if the message is malformed.
+    """
+    vote = message_data.get("option")
+
+    if not vote:
+        logger.warning(
+            "malformed_message_missing_option",
+            message_id=message_id,
+            data=message_data
+        )
+        return None
+
+    # Validate vote option
+    if vote not in ("cats", "dogs"):
+        logger.warning(
+            "invalid_vote_option",
+            message_id=message_id,
+            vote=vote
+        )
+        return None
+
+    return vote
+
+
+def audit_record(
+    message_id: str, message_data: dict, vote: str
+) -> tuple[str, datetime, str | None, str | None]:
+    """
+    Build the vote_events row for a valid vote.
+
+    The event time is the API's "timestamp" field, falling back to the
+    time part of the stream ID. Audit fields that are missing (entries
+    written before the API sent them) or not a valid IP address are
+    stored as NULL, so one bad value cannot fail the whole batch.
+
+    Args:
+        message_id: Redis Stream message ID.
+        message_data: Message payload containing vote data.
+        vote: Validated vote option.
+
+    Returns:
+        Tuple of (option, timestamp, source_ip, user_agent).
+    """
+    try:
+        timestamp_ms = int(message_data["timestamp"])
+    except (KeyError, TypeError, ValueError):
+        timestamp_ms = stream_id_key(message_id)[0]
+
+    source_ip = message_data.get("source_ip")
+    if source_ip is not None:
+        try:
+            ipaddress.ip_address(source_ip)
+        except ValueError:
+            source_ip = None
+
+    return (
+        vote,
+        datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc),
+        source_ip,
+        message_data.get("user_agent"),
+    )
+
+
+def fold_batch(
+    messages: list[tuple[str, dict]]
+) -> tuple[dict[str, int], list[tuple], list[str]]:
+    """
+    Fold a batch of stream messages into per-option vote deltas.
+
+    Args:
+        messages: List of (message_id, message_data) tuples.
+
+    Returns:
+        Tuple of (deltas, events, malformed_ids) where deltas maps each
+        option to the number of votes it received in the batch and
+        events holds one vote_events row per valid vote.
+    """
+    deltas = {"cats": 0, "dogs": 0}
+    events: list[tuple] = []
+    malformed_ids: list[str] = []
+
+    for message_id, message_data in messages:
+        vote = parse_vote(message_id, message_data)
+
+        if vote is None:
+            malformed_ids.append(message_id)
+            continue
+
+        deltas[vote] += 1
+        events.append(audit_record(message_id, message_data, vote))
+
+    return deltas, events, malformed_ids
+
+
+def minute_rollups(events: list[tuple]) -> dict[datetime, list[int]]:
+    """
+    Count a batch's votes per minute of event time.
+
+    Args:
+        events: vote_events rows from fold_batch().
+
+    Returns:
+        Mapping of minute bucket (UTC) to [cats, dogs] vote counts.
+    """
+    rollups: dict[datetime, list[int]] = {}
+
+    for option, timestamp, _, _ in events:
+        bucket = timestamp.replace(second=0, microsecond=0)
+        counts = rollups.setdefault(bucket, [0, 0])
+        counts[0 if option == "cats" else 1] += 1
+
+    return rollups
+
+
+def stream_id_key(message_id: str) -> tuple[int, int]:
+    """
+    Convert a Redis Stream ID into a sortable key.
+
+    Args:
+        message_id: Stream ID in "<milliseconds>-<sequence>" form.
+
+    Returns:
+        Tuple of (milliseconds, sequence).
+    """
+    ms, _, seq = message_id.partition("-")
+    return int(ms), int(seq or 0)
+
+
+async def get_checkpoint(stream: str, owner: str) -> str:
+    """
+    Get the last applied stream ID for an owner, loading it on first use.
+
+    Args:
+        stream: Redis Stream name.
+        owner: Consumer whose pending entries the checkpoint covers.
+
+    Returns:
+        Last applied stream ID.
+    """
+    key = (stream, owner)
+    if key not in _checkpoints:
+        if Config.COUNTER_MODE == "redis":
+            _checkpoints[key] = await counters.load_checkpoint(stream, owner)
+        else:
+            _checkpoints[key] = await db_client.load_checkpoint(
+                stream, Config.CONSUMER_GROUP, owner
+            )
+    return _checkpoints[key]
+
+
+async def reload_checkpoint(stream: str, owner: str) -> str:
+    """
+    Reload the last applied stream ID for an owner, bypassing the cache.
+
+    Args:
+        stream: Redis Stream name.
+        owner: Consumer whose pending entries the checkpoint covers.
+
+    Returns:
+        Last applied stream ID.
+    """
+    _checkpoints.pop((stream, owner), None)
+    return await get_checkpoint(stream, owner)
+
+
+def reset_checkpoints() -> None:
+    """Forget cached checkpoints so they are reloaded on next use."""
+    _checkpoints.clear()
+
+
+async def notify_results(counts: dict[str, int]) -> None:
+    """
+    Publish new vote totals, logging instead of raising on failure.
+
+    The batch is already committed; a lost notification only means the
+    API serves its cached results until their TTL expires.
+
+    Args:
+        counts: Mapping of option to its new total.
+    """
+    try:
+        await redis_client.publish_results(counts)
+    except Exception as e:
+        logger.warning("results_notify_failed", error=str(e))
+
+
+async def process_batch(
+    stream: str,
+    messages: list[tuple[str, dict]],
+    owner: str,
+    writer: db_client.WriterConnection | None = None,
+) -> list[str]:
+    """
+    Process a batch of vote messages with a single database write.
+
+    Entries at or below the owner's checkpoint were already applied (e.g.
+    redelivered after a crash between commit and XACK) and are skipped.
+    The rest are folded into per-option deltas and committed together
+    with their vote_events audit rows, the per-minute/per-hour rollups
+    and the new checkpoint in one transaction (with COUNTER_MODE=redis,
+    one Redis script; see counters). Batches of the same stream and
+    owner must be committed in stream order.
+
+    Args:
+        stream: Redis Stream the batch was read from.
+        messages: List of (message_id, message_data) tuples in stream order.
+        owner: Consumer whose checkpoint covers the batch: this consumer
+            for entries it read, the pending owner for reclaimed entries.
+        writer: Pinned PostgreSQL connection of the calling writer task.
+
+    Returns:
+        Message IDs to acknowledge (the whole batch).
+
+    Raises:
+        db_client.CheckpointConflictError: If another writer moved the
+            checkpoint; the batch is not applied.
+        Exception: If the commit fails; the batch is not applied.
+    """
+    checkpoint = await get_checkpoint(stream, owner)
+    checkpoint_key = stream_id_key(checkpoint)
+
+    fresh = [
+        (message_id, message_data)
+        for message_id, message_data in messages
+        if stream_id_key(message_id) > checkpoint_key
+    ]
+
+    if len(fresh) < len(messages):
+        logger.info(
+            "already_applied_skipped",
+            stream=stream,
+            owner=owner,
+            count=len(messages) - len(fresh),
+            checkpoint=checkpoint
+        )
+
+    deltas, events, malformed_ids = fold_batch(fresh)
+
+    if malformed_ids:
+        metrics.MESSAGES_FAILED.labels(reason="malformed").inc(len(malformed_ids))
+
+    if events:
+        last_id = fresh[-1][0]
+
+        try:
+            if Config.COUNTER_MODE == "redis":
+                new_counts = await counters.commit_batch(
+                    stream,
+                    owner,
+                    checkpoint,
+                    last_id,
+                    deltas["cats"],
+                    deltas["dogs"],
+                    events if Config.AUDIT_EVENTS else [],
+                    minute_rollups(events)
+                )
+            else:
+                new_counts = await db_client.commit_batch(
+                    stream,
+                    Config.CONSUMER_GROUP,
+                    owner,
+                    checkpoint,
+                    last_id,
+                    deltas["cats"],
+                    deltas["dogs"],
+                    events if Config.AUDIT_EVENTS else [],
+                    minute_rollups(events),
+                    writer
+                )
+        except db_client.CheckpointConflictError:
+            _checkpoints.pop((stream, owner), None)
+            raise
+
+        _checkpoints[(stream, owner)] = last_id
+        metrics.MESSAGES_PROCESSED.inc(len(events))
+
+        if Config.RESULTS_NOTIFY and new_counts:
+            await notify_results(new_counts)
+
+        summary.add(
+            batches=1, messages=len(events), cats=deltas["cats"], dogs=deltas["dogs"]
+        )
+        log = logger.info if sampled() else logger.debug
+        log(
+            "batch_processed",
+            stream=stream,
+            owner=owner,
+            count=len(events),
+            cats_delta=deltas["cats"],
+            dogs_delta=deltas["dogs"],
+            checkpoint=last_id,
+            new_counts=new_counts
+        )
+
+    return [message_id for message_id, _ in messages]
@@ -2,16 +2,25 @@
 Redis Streams client for voting consumer.
 
 Manages Redis connection and consumer group operations.
+
+Stream entries are read with a separate bytes-mode client and decoded
+by codec, so compact binary entries are never UTF-8 decoded; every other
+command uses the decoding client.
 """
+import json
+import time
+
 import redis.asyncio as redis
 import structlog
 
 from config import Config
+import codec
 
 logger = structlog.get_logger()
 
-# Global Redis client
+# Global Redis clients (decoded responses, raw bytes for stream reads)
 _client: redis.Redis | None = None
+_raw_client: redis.Redis | None = None
 
 
 async def get_client() -> redis.Redis:
@@ -40,9 +49,32 @@ async def get_client() -> redis.Redis:
     return _client
 
 
+async def get_raw_client() -> redis.Redis:
+    """
+    Get or create the bytes-mode Redis client used for stream reads.
+
+    Returns:
+        Redis client instance returning undecoded responses.
+
+    Raises:
+        Exception: If connection fails.
+    """
+    global _raw_client
+
+    if _raw_client is None:
+        _raw_client = redis.from_url(Config.REDIS_URL, decode_responses=False)
+        await _raw_client.ping()
+
+    return _raw_client
+
+
 async def close_client() -> None:
-    """Close Redis client gracefully."""
-    global _client
+    """Close Redis clients gracefully."""
+    global _client, _raw_client
+
+    if _raw_client is not None:
+        await _raw_client.aclose()
+        _raw_client = None
 
     if _client is not None:
         logger.info("closing_redis_client")
@@ -51,94 +83,475 @@ async def close_client() -> None:
         logger.info("redis_client_closed")
 
 
-async def ensure_consumer_group() -> None:
+def _decode_messages(messages: list) -> list[tuple[str, dict]]:
+    """
+    Decode stream entries read in bytes mode.
+
+    Pending entries deleted from the stream come back without data, and
+    entries that cannot be decoded are logged; both get an empty payload,
+    which is treated as malformed and acknowledged.
+
+    Args:
+        messages: Raw (message_id, fields) pairs.
+
+    Returns:
+        List of (message_id, message_data) tuples.
+    """
+    decoded = []
+
+    for raw_id, fields in messages:
+        message_id = raw_id.decode()
+        try:
+            data = codec.decode_fields(fields) if fields else {}
+        except ValueError as e:
+            logger.warning("undecodable_message", message_id=message_id, error=str(e))
+            data = {}
+        decoded.append((message_id, data))
+
+    return decoded
+
+
+async def ensure_consumer_group(stream: str) -> None:
     """
     Create consumer group if it doesn't exist.
 
     Uses XGROUP CREATE with MKSTREAM to create stream and group.
     Ignores error if group already exists.
+
+    Args:
+        stream: Redis Stream name.
     """
     client = await get_client()
 
     try:
         await client.xgroup_create(
-            name=Config.STREAM_NAME,
+            name=stream,
             groupname=Config.CONSUMER_GROUP,
             id="0",
             mkstream=True,
         )
         logger.info(
             "consumer_group_created",
-            stream=Config.STREAM_NAME,
+            stream=stream,
             group=Config.CONSUMER_GROUP
         )
     except redis.ResponseError as e:
         if "BUSYGROUP" in str(e):
             logger.info(
                 "consumer_group_exists",
-                stream=Config.STREAM_NAME,
+                stream=stream,
                 group=Config.CONSUMER_GROUP
             )
         else:
             raise
 
 
-async def read_messages() -> list[tuple[str, dict]]:
+async def read_messages(
+    streams: list[str], count: int, block_ms: int
+) -> list[tuple[str, list[tuple[str, dict]]]]:
     """
-    Read messages from Redis Stream using consumer group.
+    Read messages from Redis Streams using consumer group.
+
+    Uses XREADGROUP to read new messages for this consumer from every
+    given stream in one call.
+    Blocks for block_ms milliseconds if no messages available.
 
-    Uses XREADGROUP to read pending messages for this consumer.
-    Blocks for Config.BLOCK_MS milliseconds if no messages available.
+    Args:
+        streams: Redis Stream names to read from.
+        count: Maximum number of messages to return per stream.
+        block_ms: How long to wait for new messages.
 
     Returns:
-        List of (message_id, message_data) tuples.
+        List of (stream_name, [(message_id, message_data), ...]) tuples.
         Empty list if no messages available.
 
     Raises:
         Exception: If Redis operation fails.
     """
-    client = await get_client()
+    client = await get_raw_client()
 
     # XREADGROUP GROUP group consumer [BLOCK ms] [COUNT count] STREAMS key [key ...] id [id ...]
     response = await client.xreadgroup(
         groupname=Config.CONSUMER_GROUP,
         consumername=Config.CONSUMER_NAME,
-        streams={Config.STREAM_NAME: ">"},
-        count=Config.BATCH_SIZE,
-        block=Config.BLOCK_MS,
+        streams={stream: ">" for stream in streams},
+        count=count,
+        block=block_ms,
     )
 
     if not response:
         return []
 
-    # response format: [(stream_name, [(message_id, message_data), ...])]
-    stream_name, messages = response[0]
+    # response format: [(stream_name, [(message_id, message_data), ...]), ...]
+    batches = [
+        (stream_name.decode(), _decode_messages(messages))
+        for stream_name, messages in response
+        if messages
+    ]
 
     logger.debug(
         "messages_read",
-        stream=stream_name,
-        count=len(messages)
+        streams=len(batches),
+        count=sum(len(messages) for _, messages in batches)
     )
 
-    return messages
+    return batches
 
 
-async def ack_message(message_id: str) -> None:
+async def read_backlog(
+    stream: str, start_id: str, count: int
+) -> list[tuple[str, dict]]:
     """
-    Acknowledge message processing with XACK.
+    Read a chunk of messages from one stream without blocking.
+
+    With start_id ">" this reads new (never delivered) messages; with a
+    concrete ID such as "0" it re-reads this consumer's own pending
+    entries after that ID.
 
     Args:
-        message_id: Redis Stream message ID to acknowledge.
+        stream: Redis Stream name.
+        start_id: XREADGROUP ID (">" or a stream ID).
+        count: Maximum number of messages to return.
+
+    Returns:
+        List of (message_id, message_data) tuples.
+        Empty list if nothing is left to read.
 
     Raises:
-        Exception: If XACK fails.
+        Exception: If Redis operation fails.
+    """
+    client = await get_raw_client()
+
+    response = await client.xreadgroup(
+        groupname=Config.CONSUMER_GROUP,
+        consumername=Config.CONSUMER_NAME,
+        streams={stream: start_id},
+        count=count,
+    )
+
+    if not response:
+        return []
+
+    stream_name, messages = response[0]
+
+    return _decode_messages(messages)
+
+
+async def claim_stale_messages(
+    stream: str, start_id: str, count: int, blocked: set[str]
+) -> tuple[str | None, dict[str, list[tuple[str, dict]]]]:
+    """
+    Take over entries other consumers left pending.
+
+    Scans the pending entries list with XPENDING for entries idle for at
+    least Config.CLAIM_MIN_IDLE_MS, so messages another live consumer is
+    still working on are left alone. Each entry is re-claimed on behalf
+    of its current owner with XCLAIM, which returns its data and resets
+    its idle time (fencing off other reclaimers) without changing
+    ownership: the owner's checkpoint decides whether the entry was
+    already applied, and it must still apply if this consumer fails
+    before acknowledging.
+
+    The checkpoint is a high-water mark, so an owner's entries are only
+    taken as one run from its oldest pending entry: at the first entry
+    that is not idle or that XCLAIM does not return (another reclaimer
+    holds it), the owner is added to blocked and skipped for the rest of
+    the scan. Claiming entries above ones held elsewhere would let their
+    commit move the checkpoint past votes not yet applied.
+
+    Args:
+        stream: Redis Stream name.
+        start_id: Lower bound of the scan ("-" to start, "(<id>" exclusive).
+        count: Maximum number of pending entries to inspect.
+        blocked: Owners to skip; updated in place. Start a scan at "-"
+            with an empty set and pass the same set for every page.
+
+    Returns:
+        Tuple of (next_start_id, stale) where stale maps each owner to its
+        stale messages in stream order. next_start_id is None once the
+        whole pending entries list has been scanned.
+
+    Raises:
+        Exception: If Redis operation fails.
     """
     client = await get_client()
 
-    await client.xack(
-        Config.STREAM_NAME,
+    pending = await client.xpending_range(
+        stream,
         Config.CONSUMER_GROUP,
-        message_id
+        min=start_id,
+        max="+",
+        count=count,
     )
 
-    logger.debug("message_acked", message_id=message_id)
+    if not pending:
+        return None, {}
+
+    by_owner: dict[str, list[str]] = {}
+    for entry in pending:
+        owner = entry["consumer"]
+        if owner == Config.CONSUMER_NAME or owner in blocked:
+            continue
+        if entry["time_since_delivered"] < Config.CLAIM_MIN_IDLE_MS:
+            blocked.add(owner)
+            continue
+        by_owner.setdefault(owner, []).append(entry["message_id"])
+
+    raw_client = await get_raw_client()
+
+    stale: dict[str, list[tuple[str, dict]]] = {}
+    for owner, message_ids in by_owner.items():
+        messages = await raw_client.xclaim(
+            stream,
+            Config.CONSUMER_GROUP,
+            owner,
+            min_idle_time=Config.CLAIM_MIN_IDLE_MS,
+            message_ids=message_ids,
+        )
+        claimed = _decode_messages(messages)
+
+        # Keep the run up to the first entry another reclaimer took first
+        run = 0
+        while run < len(claimed) and claimed[run][0] == message_ids[run]:
+            run += 1
+        if run < len(message_ids):
+            blocked.add(owner)
+        if run:
+            stale[owner] = claimed[:run]
+
+    # A short page means the end of the pending entries list was reached
+    if len(pending) < count:
+        return None, stale
+
+    return "(" + pending[-1]["message_id"], stale
+
+
+async def get_group_stats(stream: str) -> tuple[int | None, int]:
+    """
+    Get consumer group lag and pending entries list size with XINFO GROUPS.
+
+    Lag is the number of stream entries not yet delivered to the group
+    (the "lag" field, Redis 7+). It is None when Redis cannot report it
+    (older Redis, or after deletions or trimming past undelivered
+    entries); the pending count is no substitute, as those entries were
+    already delivered.
+
+    Args:
+        stream: Redis Stream name.
+
+    Returns:
+        (lag, pending) for the group, (0, 0) if it does not exist yet.
+
+    Raises:
+        Exception: If Redis operation fails.
+    """
+    client = await get_client()
+
+    for group in await client.xinfo_groups(stream):
+        if group["name"] == Config.CONSUMER_GROUP:
+            pending = int(group["pending"])
+            lag = group.get("lag")
+            return (int(lag) if lag is not None else None), pending
+
+    return 0, 0
+
+
+async def get_group_lag(stream: str) -> int | None:
+    """
+    Get the number of stream entries not yet delivered to the group.
+
+    Args:
+        stream: Redis Stream name.
+
+    Returns:
+        Consumer group lag, or None if unknown (see get_group_stats).
+
+    Raises:
+        Exception: If Redis operation fails.
+    """
+    lag, _ = await get_group_stats(stream)
+    return lag
+
+
+async def release_pending(streams: list[str], count: int = 1000) -> int:
+    """
+    Make this consumer's pending entries claimable by others right away.
+
+    Redis cannot unassign a pending entry, so each one is re-claimed by
+    this consumer with XCLAIM JUSTID and its idle time set to
+    Config.CLAIM_MIN_IDLE_MS. Ownership, and with it the checkpoint that
+    filters already applied entries, stays the same, but the next stale
+    entry scan of any other consumer takes the entries over instead of
+    waiting for them to age.
+
+    Args:
+        streams: Redis Stream names.
+        count: Maximum number of entries released per XPENDING page.
+
+    Returns:
+        Number of entries released.
+
+    Raises:
+        Exception: If Redis operation fails.
+    """
+    client = await get_client()
+    released = 0
+
+    for stream in streams:
+        start_id = "-"
+
+        while True:
+            pending = await client.xpending_range(
+                stream,
+                Config.CONSUMER_GROUP,
+                min=start_id,
+                max="+",
+                count=count,
+                consumername=Config.CONSUMER_NAME,
+            )
+            if not pending:
+                break
+
+            message_ids = [entry["message_id"] for entry in pending]
+            await client.xclaim(
+                stream,
+                Config.CONSUMER_GROUP,
+                Config.CONSUMER_NAME,
+                min_idle_time=0,
+                message_ids=message_ids,
+                idle=Config.CLAIM_MIN_IDLE_MS,
+                justid=True,
+            )
+            released += len(message_ids)
+
+            if len(pending) < count:
+                break
+            start_id = "(" + message_ids[-1]
+
+    return released
+
+
+def _next_id(message_id: str) -> str:
+    """Smallest stream ID greater than message_id."""
+    ms, _, seq = message_id.partition("-")
+    return f"{ms}-{int(seq or 0) + 1}"
+
+
+async def get_trim_floor(stream: str) -> str | None:
+    """
+    Find the oldest stream ID any consumer group may still need.
+
+    For each group that is the oldest entry in its pending entries list,
+    or the entry after its last-delivered-id when nothing is pending;
+    entries below the lowest of these were delivered to and acknowledged
+    by every group.
+
+    Args:
+        stream: Redis Stream name.
+
+    Returns:
+        Stream ID to trim up to (exclusive), or None if the stream has no
+        consumer groups.
+
+    Raises:
+        Exception: If Redis operation fails.
+    """
+    client = await get_client()
+    floor: tuple[int, int] | None = None
+    floor_id = None
+
+    for group in await client.xinfo_groups(stream):
+        if int(group["pending"]):
+            summary = await client.xpending(stream, group["name"])
+            candidate = summary["min"]
+        else:
+            candidate = _next_id(group["last-delivered-id"])
+
+        ms, _, seq = candidate.partition("-")
+        key = (int(ms), int(seq or 0))
+        if floor is None or key < floor:
+            floor, floor_id = key, candidate
+
+    return floor_id
+
+
+async def trim_stream(stream: str, min_id: str) -> int:
+    """
+    Remove stream entries older than min_id with XTRIM MINID.
+
+    Uses approximate trimming ("~"), which drops whole radix tree nodes
+    and never removes entries at or above min_id.
+
+    Args:
+        stream: Redis Stream name.
+        min_id: Oldest stream ID to keep.
+
+    Returns:
+        Number of entries removed.
+
+    Raises:
+        Exception: If Redis operation fails.
+    """
+    client = await get_client()
+    return await client.xtrim(stream, minid=min_id, approximate=True)
+
+
+async def ack_messages(message_ids: dict[str, list[str]]) -> int:
+    """
+    Acknowledge processed messages with one XACK per stream.
+
+    All XACKs are sent through a single non-transactional pipeline so
+    the whole set costs one round trip instead of one per message.
+
+    Args:
+        message_ids: Mapping of stream name to message IDs to acknowledge.
+
+    Returns:
+        Number of messages Redis acknowledged.
+
+    Raises:
+        Exception: If XACK fails.
+    """
+    message_ids = {stream: ids for stream, ids in message_ids.items() if ids}
+    if not message_ids:
+        return 0
+
+    client = await get_client()
+
+    async with client.pipeline(transaction=False) as pipe:
+        for stream, ids in message_ids.items():
+            pipe.xack(stream, Config.CONSUMER_GROUP, *ids)
+        acked = sum(await pipe.execute())
+
+    logger.debug("messages_acked", streams=len(message_ids), count=acked)
+
+    return acked
+
+
+def results_channel() -> str:
+    """Name of the pub/sub channel carrying new vote totals."""
+    return f"{Config.STREAM_NAME}:results"
+
+
+async def publish_results(counts: dict[str, int]) -> int:
+    """
+    Publish the vote totals after a committed batch.
+
+    The API replicas update their cached results from these messages.
+    Pub/sub does not store messages, so subscribers that miss one catch
+    up with the next.
+
+    Args:
+        counts: Mapping of option to its new total; options the batch did
+            not change may be missing.
+
+    Returns:
+        Number of subscribers that received the message.
+
+    Raises:
+        Exception: If PUBLISH fails.
+    """
+    client = await get_client()
+    message = json.dumps({**counts, "updated_at": int(time.time() * 1000)})
+
+    return await client.publish(results_channel(), message)
@@ -0,0 +1,266 @@
+"""
+Retry and dead-letter streams for voting consumer.
+
+A batch that fails to commit is not retried in place, where it would
+hold up every batch behind it. Its entries are moved to the first retry
+stream "<stream>:retry:1" and acknowledged on the source stream in one
+atomic step, and the pipeline carries on with the next batch.
+
+Each retry level has its own stream and a fixed delay
+(Config.RETRY_BASE_DELAY_MS, doubled per level), so every retry stream
+is ordered by due time: an entry is due once its stream ID timestamp is
+that delay in the past. The scheduler reads each retry stream through
+the consumer group like any other stream and hands due entries to the
+writers one at a time, so a bad entry only ever fails alone. An entry
+that fails on retry level Config.MAX_RETRIES is moved to the
+dead-letter stream "<STREAM_NAME>:dead-letter" for inspection instead.
+
+Moved entries keep their original fields, plus the stream and ID they
+were first read from, the number of attempts and the last error.
+"""
+import asyncio
+import time
+from typing import Callable
+
+import structlog
+
+from config import Config
+import catchup
+import metrics
+import partitions
+import redis_client
+
+logger = structlog.get_logger()
+
+# Acknowledge entries on the source stream and append them to the target:
+# KEYS = source, target; ARGV = group, then per entry: ID, field count,
+# field/value pairs. Entries no longer pending in the group are skipped.
+_MOVE_SCRIPT = """
+local moved = 0
+local i = 2
+while i <= #ARGV do
+    local fields = tonumber(ARGV[i + 1])
+    if redis.call('XACK', KEYS[1], ARGV[1], ARGV[i]) == 1 then
+        redis.call('XADD', KEYS[2], '*', unpack(ARGV, i + 2, i + 1 + fields))
+        moved = moved + 1
+    end
+    i = i + 2 + fields
+end
+return moved
+"""
+
+# Longer errors are truncated in moved entries
+ERROR_MAX_LENGTH = 500
+
+
+def retry_stream(stream: str, level: int) -> str:
+    """
+    Name the retry stream of a source stream.
+
+    Args:
+        stream: Source vote stream.
+        level: Retry level, 1 .. Config.MAX_RETRIES.
+
+    Returns:
+        Retry stream name.
+    """
+    return f"{stream}:retry:{level}"
+
+
+def retry_streams(stream: str) -> list[str]:
+    """
+    List every retry stream of a source stream.
+
+    Args:
+        stream: Source vote stream.
+
+    Returns:
+        Retry stream names, in level order.
+    """
+    return [retry_stream(stream, level) for level in range(1, Config.MAX_RETRIES + 1)]
+
+
+def retry_level(stream: str) -> int:
+    """
+    Get the retry level of a stream.
+
+    Args:
+        stream: Stream name.
+
+    Returns:
+        Retry level, 0 for a source vote stream.
+    """
+    base, marker, level = stream.rpartition(":retry:")
+    return int(level) if marker else 0
+
+
+def dead_letter_stream() -> str:
+    """Name of the dead-letter stream."""
+    return f"{Config.STREAM_NAME}:dead-letter"
+
+
+def retry_delay_ms(level: int) -> int:
+    """
+    Delay before an entry on a retry level is due.
+
+    Args:
+        level: Retry level, 1 .. Config.MAX_RETRIES.
+
+    Returns:
+        Delay in milliseconds.
+    """
+    return Config.RETRY_BASE_DELAY_MS * 2 ** (level - 1)
+
+
+def all_streams() -> list[str]:
+    """
+    List every stream the consumer group reads, retry streams included.
+
+    Returns:
+        Source streams, each followed by its retry streams.
+    """
+    return [
+        name
+        for stream in partitions.all_streams()
+        for name in [stream, *retry_streams(stream)]
+    ]
+
+
+async def defer(
+    stream: str, messages: list[tuple[str, dict]], error: str
+) -> int:
+    """
+    Move entries that failed to commit to the next retry level.
+
+    Entries failing on the last retry level go to the dead-letter stream.
+
+    Args:
+        stream: Stream the entries were read from.
+        messages: List of (message_id, message_data) tuples.
+        error: Why the commit failed.
+
+    Returns:
+        Number of entries moved.
+
+    Raises:
+        Exception: If Redis operation fails; the entries stay pending.
+    """
+    level = retry_level(stream)
+    if level < Config.MAX_RETRIES:
+        base = stream.rpartition(":retry:")[0] if level else stream
+        target, kind = retry_stream(base, level + 1), "retry"
+    else:
+        target, kind = dead_letter_stream(), "dead_letter"
+
+    args: list = [Config.CONSUMER_GROUP]
+    for message_id, message_data in messages:
+        fields = {
+            **message_data,
+            "source_stream": message_data.get("source_stream", stream),
+            "source_id": message_data.get("source_id", message_id),
+            "attempts": level + 1,
+            "error": error[:ERROR_MAX_LENGTH],
+        }
+        args += [message_id, len(fields) * 2]
+        for field, value in fields.items():
+            args += [field, "" if value is None else value]
+
+    client = await redis_client.get_client()
+    moved = await client.eval(_MOVE_SCRIPT, 2, stream, target, *args)
+
+    metrics.MESSAGES_DEFERRED.labels(target=kind).inc(moved)
+    logger.warning(
+        "messages_dead_lettered" if kind == "dead_letter" else "messages_deferred",
+        stream=stream,
+        target=target,
+        count=moved,
+        attempts=level + 1,
+        error=error
+    )
+
+    return moved
+
+
+async def _release_due(
+    stream: str,
+    held: list[tuple[str, dict]],
+    cursors: dict[str, str],
+    submit: catchup.Submit,
+    should_stop: Callable[[], bool],
+) -> None:
+    """
+    Submit the due entries of one retry stream, oldest first.
+
+    Entries read but not yet due are kept in held until a later pass.
+    The first reads re-deliver this consumer's own pending entries
+    (left from an earlier run), then new entries are read.
+
+    Args:
+        stream: Retry stream name.
+        held: Entries read from the stream and not submitted yet.
+        cursors: Read position per retry stream.
+        submit: Coroutine that hands a batch to the writers.
+        should_stop: Returns True once shutdown has been requested.
+    """
+    cutoff_ms = time.time() * 1000 - retry_delay_ms(retry_level(stream))
+
+    while not should_stop():
+        if not held:
+            cursor = cursors.get(stream, "0")
+            held.extend(
+                await redis_client.read_backlog(stream, cursor, Config.BATCH_SIZE)
+            )
+
+            if cursor != ">":
+                cursors[stream] = held[-1][0] if held else ">"
+                continue
+            if not held:
+                return
+
+        # One entry per batch, so a bad entry fails alone
+        while held and int(held[0][0].partition("-")[0]) <= cutoff_ms:
+            await submit(stream, [held.pop(0)], Config.CONSUMER_NAME)
+
+        if held:
+            return
+
+
+async def scheduler(
+    submit: catchup.Submit, should_stop: Callable[[], bool]
+) -> None:
+    """
+    Hand due retry entries to the writers until shutdown.
+
+    Polls the retry streams of every stream this consumer reads each
+    Config.IDLE_BLOCK_MS. Entries other consumers left pending are
+    reclaimed every Config.CATCHUP_CHECK_INTERVAL_S and submitted right
+    away, as they have been idle for at least Config.CLAIM_MIN_IDLE_MS.
+
+    Args:
+        submit: Coroutine that hands a batch to the writers.
+        should_stop: Returns True once shutdown has been requested.
+    """
+    held: dict[str, list[tuple[str, dict]]] = {}
+    cursors: dict[str, str] = {}
+    next_reclaim = time.monotonic() + Config.CATCHUP_CHECK_INTERVAL_S
+
+    while not should_stop():
+        try:
+            reclaim = time.monotonic() >= next_reclaim
+            if reclaim:
+                next_reclaim = time.monotonic() + Config.CATCHUP_CHECK_INTERVAL_S
+
+            for stream in partitions.owned_streams():
+                for name in retry_streams(stream):
+                    if reclaim:
+                        await catchup.reclaim_stale(name, submit, should_stop)
+                    await _release_due(
+                        name, held.setdefault(name, []), cursors, submit, should_stop
+                    )
+
+        except Exception as e:
+            logger.error("retry_scheduler_error", error=str(e), exc_info=True)
+
+        await asyncio.sleep(Config.IDLE_BLOCK_MS / 1000)
+
+    logger.info("retry_scheduler_stopped")
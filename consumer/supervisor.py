@@ -0,0 +1,197 @@
+"""
+Multi-process supervisor for voting consumer.
+
+With Config.WORKER_PROCESSES > 1 the main process forks that many worker
+processes, each running the full asyncio consumer under the consumer
+name "<CONSUMER_NAME>-<n>" in the same consumer group, so one pod uses
+every core it is given. Names are stable per worker index, so a
+restarted worker re-reads its own pending entries and resumes from its
+own checkpoint.
+
+The supervisor owns the process lifecycle: SIGTERM/SIGINT are forwarded
+to every worker and the supervisor waits for them to drain, a crashed
+worker is restarted, and a crash loop brings the whole pod down so the
+kubelet restarts it. The health endpoint runs in the supervisor and
+reports on all workers.
+"""
+import multiprocessing
+import multiprocessing.connection
+import signal
+import sys
+import time
+from typing import Callable, NoReturn
+
+import structlog
+
+from config import Config
+import health
+import metrics
+
+logger = structlog.get_logger()
+
+# Pause before restarting a crashed worker
+RESTART_DELAY_S = 1.0
+# Give up after this many crashes within the window
+MAX_CRASHES = 5
+CRASH_WINDOW_S = 60.0
+
+# Shutdown flag
+shutdown_requested = False
+
+
+def signal_handler(signum: int, frame) -> None:
+    """
+    Handle shutdown signals (SIGTERM, SIGINT) in the supervisor.
+
+    Args:
+        signum: Signal number.
+        frame: Current stack frame.
+    """
+    global shutdown_requested
+
+    sig_name = signal.Signals(signum).name
+    logger.info("supervisor_shutdown_signal_received", signal=sig_name)
+    shutdown_requested = True
+
+
+def worker_name(index: int) -> str:
+    """
+    Derive the consumer name of a worker process.
+
+    Args:
+        index: Worker index, 0 .. WORKER_PROCESSES - 1.
+
+    Returns:
+        Consumer name unique within the pod and stable across restarts.
+    """
+    return f"{Config.CONSUMER_NAME}-{index}"
+
+
+def _worker_entry(index: int, target: Callable[[], None]) -> None:
+    """Run the consumer in a forked worker under its derived name."""
+    Config.CONSUMER_NAME = worker_name(index)
+    health.set_slot(index)
+    target()
+
+
+def start_worker(
+    ctx: multiprocessing.context.BaseContext,
+    index: int,
+    target: Callable[[], None],
+) -> multiprocessing.Process:
+    """
+    Fork one worker process.
+
+    Args:
+        ctx: Multiprocessing context used to create the process.
+        index: Worker index.
+        target: Consumer entry point run inside the worker.
+
+    Returns:
+        Started worker process.
+    """
+    process = ctx.Process(
+        target=_worker_entry,
+        args=(index, target),
+        name=worker_name(index),
+    )
+    process.start()
+
+    logger.info("worker_started", worker=process.name, pid=process.pid)
+    return process
+
+
+def stop_workers(workers: dict[int, multiprocessing.Process]) -> None:
+    """
+    Ask every worker to shut down and wait for it to drain.
+
+    Workers still running after Config.WORKER_SHUTDOWN_TIMEOUT_S are
+    killed; their unacknowledged entries stay pending and are picked up
+    again on restart.
+
+    Args:
+        workers: Worker processes by index.
+    """
+    for process in workers.values():
+        if process.is_alive():
+            process.terminate()  # SIGTERM: graceful drain in the worker
+
+    deadline = time.monotonic() + Config.WORKER_SHUTDOWN_TIMEOUT_S
+
+    for process in workers.values():
+        process.join(max(0.0, deadline - time.monotonic()))
+
+        if process.is_alive():
+            logger.warning("worker_kill", worker=process.name, pid=process.pid)
+            process.kill()
+            process.join()
+
+        logger.info("worker_stopped", worker=process.name, exitcode=process.exitcode)
+
+
+def run(target: Callable[[], None]) -> NoReturn:
+    """
+    Run Config.WORKER_PROCESSES workers until shutdown.
+
+    Args:
+        target: Consumer entry point run inside each worker.
+    """
+    signal.signal(signal.SIGTERM, signal_handler)
+    signal.signal(signal.SIGINT, signal_handler)
+
+    # Fork before any event loop or connection exists in this process
+    ctx = multiprocessing.get_context("fork")
+
+    logger.info(
+        "supervisor_starting",
+        workers=Config.WORKER_PROCESSES,
+        consumer=Config.CONSUMER_NAME
+    )
+
+    workers = {
+        index: start_worker(ctx, index, target)
+        for index in range(Config.WORKER_PROCESSES)
+    }
+    crashes: list[float] = []
+    exit_code = 0
+
+    while not shutdown_requested:
+        # Wake up when a worker exits (or periodically to check the flag)
+        multiprocessing.connection.wait(
+            [process.sentinel for process in workers.values()], timeout=1
+        )
+        if shutdown_requested:
+            break
+
+        for index, process in workers.items():
+            if process.is_alive():
+                continue
+
+            process.join()
+            logger.error(
+                "worker_exited",
+                worker=process.name,
+                exitcode=process.exitcode
+            )
+            health.reset_slot(index)
+            metrics.mark_process_dead(process.pid)
+
+            now = time.monotonic()
+            crashes = [t for t in crashes if now - t < CRASH_WINDOW_S]
+            crashes.append(now)
+
+            if len(crashes) >= MAX_CRASHES:
+                logger.error("worker_crash_loop", crashes=len(crashes))
+                exit_code = 1
+                break
+
+            time.sleep(RESTART_DELAY_S)
+            workers[index] = start_worker(ctx, index, target)
+
+        if exit_code:
+            break
+
+    stop_workers(workers)
+
+    logger.info("supervisor_exiting", exit_code=exit_code)
+    sys.exit(exit_code)
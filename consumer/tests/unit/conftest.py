@@ -0,0 +1,48 @@
+"""Pytest fixtures for consumer unit tests.
+
+Redis and PostgreSQL are replaced by the in-process stand-ins the
+benchmarks use (benchmarks/standins.py), so no server is needed.
+"""
+import pytest
+
+from benchmarks.standins import FakeDatabase, install_fake_redis
+from config import Config
+import db_client
+import processor
+import redis_client
+
+# db_client functions FakeDatabase.install() replaces
+_DATABASE_FUNCTIONS = [
+    "get_pool",
+    "close_pool",
+    "ensure_counter_slots",
+    "WriterConnection",
+    "load_checkpoint",
+    "commit_batch",
+    "load_counter_state",
+    "flush_counters",
+]
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    """In-memory database behind db_client, restored after the test."""
+    for name in _DATABASE_FUNCTIONS:
+        monkeypatch.setattr(db_client, name, getattr(db_client, name))
+    monkeypatch.setattr(Config, "COUNTER_MODE", "postgres")
+    monkeypatch.setattr(Config, "RESULTS_NOTIFY", False)
+
+    database = FakeDatabase()
+    database.install()
+    processor.reset_checkpoints()
+    yield database
+    processor.reset_checkpoints()
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """Empty fakeredis server behind redis_client, returning a client of it."""
+    monkeypatch.setattr(redis_client, "_client", None)
+    monkeypatch.setattr(redis_client, "_raw_client", None)
+
+    return install_fake_redis()
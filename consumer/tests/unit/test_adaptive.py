@@ -0,0 +1,108 @@
+"""Unit tests for lag-adaptive read sizing."""
+import pytest
+
+from config import Config
+import adaptive
+import redis_client
+
+
+@pytest.fixture(autouse=True)
+def settings(monkeypatch):
+    """Read sizes between 10 and 80, sampling lag on every call."""
+    monkeypatch.setattr(Config, "BATCH_SIZE", 10)
+    monkeypatch.setattr(Config, "MAX_BATCH_SIZE", 80)
+    monkeypatch.setattr(Config, "BLOCK_MS", 5000)
+    monkeypatch.setattr(Config, "IDLE_BLOCK_MS", 1000)
+    monkeypatch.setattr(Config, "LAG_SAMPLE_INTERVAL_MS", 0)
+    adaptive.reset()
+    yield
+    adaptive.reset()
+
+
+@pytest.fixture
+def group_stats(monkeypatch):
+    """Per-stream (lag, pending) returned in place of XINFO GROUPS."""
+    stats: dict[str, tuple[int | None, int]] = {}
+
+    async def get_group_stats(stream: str) -> tuple[int | None, int]:
+        return stats[stream]
+
+    monkeypatch.setattr(redis_client, "get_group_stats", get_group_stats)
+    return stats
+
+
+def test_starts_idle():
+    """Test reads start at BATCH_SIZE with the idle block time."""
+    assert (adaptive.batch_size(), adaptive.block_ms()) == (10, 1000)
+
+
+def test_full_reads_double_up_to_max():
+    """Test full reads double the batch size, clamped at MAX_BATCH_SIZE."""
+    sizes = []
+    for _ in range(5):
+        adaptive.observe(adaptive.batch_size())
+        sizes.append(adaptive.batch_size())
+
+    assert sizes == [20, 40, 80, 80, 80]
+    assert adaptive.block_ms() == 5000
+
+
+def test_empty_reads_halve_down_to_batch_size():
+    """Test an empty read halves the size, clamped at BATCH_SIZE, and blocks less."""
+    for _ in range(3):
+        adaptive.observe(adaptive.batch_size())
+
+    adaptive.observe(0)
+    assert (adaptive.batch_size(), adaptive.block_ms()) == (40, 1000)
+
+    for _ in range(3):
+        adaptive.observe(0)
+    assert (adaptive.batch_size(), adaptive.block_ms()) == (10, 1000)
+
+
+def test_partial_read_keeps_settings():
+    """Test a read that is neither full nor empty changes nothing."""
+    adaptive.observe(10)
+
+    adaptive.observe(5)
+
+    assert (adaptive.batch_size(), adaptive.block_ms()) == (20, 5000)
+
+
+@pytest.mark.asyncio
+async def test_lag_sample_grows_and_shrinks(group_stats):
+    """Test lag summed over streams grows the size; no lag returns to idle."""
+    group_stats.update({"votes:0": (8, 0), "votes:1": (7, 2)})
+
+    await adaptive.sample(["votes:0", "votes:1"])
+    assert adaptive.lag() == 15
+    assert (adaptive.batch_size(), adaptive.block_ms()) == (20, 5000)
+
+    group_stats.update({"votes:0": (0, 0), "votes:1": (0, 0)})
+    await adaptive.sample(["votes:0", "votes:1"])
+    assert (adaptive.batch_size(), adaptive.block_ms()) == (10, 1000)
+
+
+@pytest.mark.asyncio
+async def test_unknown_lag_keeps_settings(group_stats):
+    """Test a stream with unknown lag leaves the read settings alone."""
+    adaptive.observe(10)
+    group_stats.update({"votes:0": (0, 0), "votes:1": (None, 3)})
+
+    await adaptive.sample(["votes:0", "votes:1"])
+
+    assert (adaptive.batch_size(), adaptive.block_ms()) == (20, 5000)
+
+
+@pytest.mark.asyncio
+async def test_samples_spaced_by_interval(group_stats, monkeypatch):
+    """Test lag is not sampled again before LAG_SAMPLE_INTERVAL_MS passes."""
+    monkeypatch.setattr(Config, "LAG_SAMPLE_INTERVAL_MS", 60_000)
+    group_stats["votes"] = (500, 0)
+    await adaptive.sample(["votes"])
+
+    group_stats["votes"] = (0, 0)
+    await adaptive.sample(["votes"])
+
+    assert adaptive.lag() == 500
+    assert adaptive.batch_size() == 20
@@ -0,0 +1,181 @@
+"""Unit tests for backlog catch-up."""
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from config import Config
+import catchup
+import processor
+import redis_client
+
+STREAM = "votes"
+# Pending entries idle this long (ms) may be reclaimed
+MIN_IDLE_MS = 20
+
+
+@pytest_asyncio.fixture
+async def client(fake_redis, monkeypatch):
+    """Fakeredis with the consumer group on the vote stream."""
+    monkeypatch.setattr(Config, "CONSUMER_NAME", "consumer-z")
+    monkeypatch.setattr(Config, "CLAIM_MIN_IDLE_MS", MIN_IDLE_MS)
+    await redis_client.ensure_consumer_group(STREAM)
+    return fake_redis
+
+
+async def strand(client, owner: str, options: list[str]) -> list[str]:
+    """Add votes read by a consumer that then crashed; return their IDs."""
+    ids = [await client.xadd(STREAM, {"option": option}) for option in options]
+    await client.xreadgroup(Config.CONSUMER_GROUP, owner, {STREAM: ">"})
+    await asyncio.sleep(MIN_IDLE_MS * 2 / 1000)
+    return ids
+
+
+@pytest.mark.asyncio
+async def test_reclaimers_do_not_split_an_owner(client, fake_db, monkeypatch):
+    """Test a second reclaimer cannot take entries above ones held by the first."""
+    monkeypatch.setattr(Config, "CATCHUP_BATCH_SIZE", 3)
+    ids = await strand(client, "consumer-x", ["cats"] * 3 + ["dogs"] * 3)
+    batches: list[tuple[str, list, str]] = []
+
+    async def submit_y(stream, messages, owner):
+        batches.append((stream, messages, owner))
+
+    async def submit_z(stream, messages, owner):
+        batches.append((stream, messages, owner))
+        if len(batches) == 1:
+            # Replica Y scans while Z still holds the first page
+            monkeypatch.setattr(Config, "CONSUMER_NAME", "consumer-y")
+            assert await catchup.reclaim_stale(STREAM, submit_y, lambda: False) == 0
+            monkeypatch.setattr(Config, "CONSUMER_NAME", "consumer-z")
+
+    assert await catchup.reclaim_stale(STREAM, submit_z, lambda: False) == 6
+    assert [
+        [message_id for message_id, _ in messages] for _, messages, _ in batches
+    ] == [ids[:3], ids[3:]]
+    assert {owner for _, _, owner in batches} == {"consumer-x"}
+
+    # Committed in claim order, every vote is counted
+    for stream, messages, owner in batches:
+        await processor.process_batch(stream, messages, owner)
+    assert fake_db.counts == {"cats": 3, "dogs": 3}
+
+
+@pytest.mark.asyncio
+async def test_owner_blocked_after_partial_claim(client):
+    """Test an owner is skipped once another reclaimer holds a lower entry."""
+    ids = await strand(client, "consumer-x", ["cats", "dogs", "cats"])
+    # Another reclaimer took the oldest entry, resetting its idle time
+    await client.xclaim(
+        STREAM, Config.CONSUMER_GROUP, "consumer-x", MIN_IDLE_MS, [ids[0]]
+    )
+
+    blocked: set[str] = set()
+    cursor, stale = await redis_client.claim_stale_messages(STREAM, "-", 10, blocked)
+
+    assert (cursor, stale) == (None, {})
+    assert blocked == {"consumer-x"}
+
+
+class Submitted:
+    """Records submitted batches as (owner, message IDs)."""
+
+    def __init__(self) -> None:
+        self.batches: list[tuple[str, list[str]]] = []
+
+    async def __call__(self, stream, messages, owner) -> None:
+        assert stream == STREAM
+        self.batches.append((owner, [message_id for message_id, _ in messages]))
+
+
+@pytest.mark.asyncio
+async def test_own_pending_resubmitted_under_this_consumer(client, monkeypatch):
+    """Test this consumer's pending entries are read again in chunks."""
+    monkeypatch.setattr(Config, "CATCHUP_BATCH_SIZE", 2)
+    ids = await strand(client, Config.CONSUMER_NAME, ["cats", "dogs", "cats"])
+    submit = Submitted()
+
+    assert await catchup.drain_own_pending(STREAM, submit, lambda: False) == 3
+    assert submit.batches == [
+        (Config.CONSUMER_NAME, ids[:2]),
+        (Config.CONSUMER_NAME, ids[2:]),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_stale_entries_submitted_under_their_owner(client):
+    """Test idle entries of other consumers keep their owner's checkpoint."""
+    x_ids = await strand(client, "consumer-x", ["cats", "dogs"])
+    y_ids = await strand(client, "consumer-y", ["dogs"])
+    await strand(client, Config.CONSUMER_NAME, ["cats"])
+    submit = Submitted()
+
+    assert await catchup.reclaim_stale(STREAM, submit, lambda: False) == 3
+    assert sorted(submit.batches) == [("consumer-x", x_ids), ("consumer-y", y_ids)]
+    # Claimed on the owner's behalf, not moved to this consumer
+    pending = await client.xpending(STREAM, Config.CONSUMER_GROUP)
+    assert {c["name"]: c["pending"] for c in pending["consumers"]} == {
+        "consumer-x": 2,
+        "consumer-y": 1,
+        Config.CONSUMER_NAME: 1,
+    }
+
+
+@pytest.mark.asyncio
+async def test_entries_not_idle_left_alone(client, monkeypatch):
+    """Test entries a live consumer is still working on are not reclaimed."""
+    monkeypatch.setattr(Config, "CLAIM_MIN_IDLE_MS", 60_000)
+    await strand(client, "consumer-x", ["cats"])
+    submit = Submitted()
+
+    assert await catchup.reclaim_stale(STREAM, submit, lambda: False) == 0
+    assert submit.batches == []
+
+
+@pytest.mark.asyncio
+async def test_backlog_drain_stops_at_last_delivered(client, monkeypatch):
+    """Test only undelivered entries are drained, up to the stream's end."""
+    monkeypatch.setattr(Config, "CATCHUP_BATCH_SIZE", 2)
+    # Delivered to another consumer: pending, not backlog
+    await strand(client, "consumer-x", ["cats"])
+    backlog = [await client.xadd(STREAM, {"option": "dogs"}) for _ in range(5)]
+    submit = Submitted()
+
+    assert await catchup.drain_backlog(STREAM, submit, lambda: False) == 5
+    assert submit.batches == [
+        (Config.CONSUMER_NAME, backlog[:2]),
+        (Config.CONSUMER_NAME, backlog[2:4]),
+        (Config.CONSUMER_NAME, backlog[4:]),
+    ]
+    [group] = await client.xinfo_groups(STREAM)
+    assert group["last-delivered-id"] == backlog[-1]
+    assert await catchup.drain_backlog(STREAM, submit, lambda: False) == 0
+
+
+@pytest.mark.asyncio
+async def test_lag_threshold(client, monkeypatch):
+    """Test catch-up starts once undelivered entries reach the threshold."""
+    monkeypatch.setattr(Config, "CATCHUP_LAG_THRESHOLD", 3)
+    for _ in range(2):
+        await client.xadd(STREAM, {"option": "cats"})
+    assert not await catchup.lag_exceeded(STREAM)
+
+    await client.xadd(STREAM, {"option": "cats"})
+    assert await catchup.lag_exceeded(STREAM)
+
+
+@pytest.mark.asyncio
+async def test_run_reclaims_before_draining_backlog(client):
+    """Test a pass submits own pending, then stale, then new entries."""
+    own = await strand(client, Config.CONSUMER_NAME, ["cats"])
+    stale = await strand(client, "consumer-x", ["dogs"])
+    backlog = [await client.xadd(STREAM, {"option": "cats"})]
+    submit = Submitted()
+
+    await catchup.run(STREAM, submit, lambda: False, include_own=True)
+
+    assert submit.batches == [
+        (Config.CONSUMER_NAME, own),
+        ("consumer-x", stale),
+        (Config.CONSUMER_NAME, backlog),
+    ]
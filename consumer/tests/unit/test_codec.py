@@ -0,0 +1,122 @@
+"""Unit tests for stream entry decoding."""
+import importlib.util
+import struct
+import uuid
+from pathlib import Path
+
+import pytest
+
+import codec
+
+# The API's encoder, loaded from its source file: the API package has its
+# own top-level modules (redis_client, db_client) that clash with ours
+VOTE_SERVICE = (
+    Path(__file__).resolve().parents[3] / "api" / "services" / "vote_service.py"
+)
+
+REQUEST_ID = uuid.UUID("12345678-1234-5678-1234-567812345678")
+TIMESTAMP_MS = 1_700_000_000_123
+
+
+@pytest.fixture(scope="module")
+def encode_vote():
+    """The API's encode_vote(), skipped when the API source is not present."""
+    if not VOTE_SERVICE.exists():
+        pytest.skip("API source not available (consumer-only build context)")
+
+    spec = importlib.util.spec_from_file_location("api_vote_service", VOTE_SERVICE)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.encode_vote
+
+
+def compact(
+    version: int = codec.COMPACT_VERSION,
+    code: int = 1,
+    ip: bytes = b"",
+    agent: bytes = b"",
+    ip_length: int | None = None,
+    ua_length: int | None = None,
+) -> bytes:
+    """Pack a compact entry, optionally with lengths that do not match."""
+    return b"".join((
+        struct.pack(">BBQ16s", version, code, TIMESTAMP_MS, REQUEST_ID.bytes),
+        bytes((len(ip) if ip_length is None else ip_length,)),
+        ip,
+        (len(agent) if ua_length is None else ua_length).to_bytes(2, "big"),
+        agent,
+    ))
+
+
+@pytest.mark.parametrize("source_ip", ["203.0.113.7", "2001:db8::1"])
+def test_round_trip_api_encoding(encode_vote, source_ip):
+    """Test entries the API encodes decode to the fields it encoded."""
+    payload = encode_vote("dogs", TIMESTAMP_MS, REQUEST_ID, source_ip, "Mozilla/5.0 é")
+
+    assert codec.decode_fields({codec.COMPACT_FIELD: payload}) == {
+        "option": "dogs",
+        "timestamp": TIMESTAMP_MS,
+        "request_id": str(REQUEST_ID),
+        "source_ip": source_ip,
+        "user_agent": "Mozilla/5.0 é",
+    }
+
+
+def test_round_trip_without_audit_fields(encode_vote):
+    """Test entries without IP and User-Agent decode without those keys."""
+    payload = encode_vote("cats", TIMESTAMP_MS, REQUEST_ID, "not-an-ip", None)
+
+    assert codec.decode_compact(payload) == {
+        "option": "cats",
+        "timestamp": TIMESTAMP_MS,
+        "request_id": str(REQUEST_ID),
+    }
+
+
+def test_legacy_fields_decoded_as_text():
+    """Test legacy entries keep one string per field."""
+    fields = {b"option": b"cats", b"timestamp": b"1700000000123"}
+
+    assert codec.decode_fields(fields) == {
+        "option": "cats",
+        "timestamp": "1700000000123",
+    }
+
+
+def test_unknown_option_code_kept_as_number():
+    """Test an unknown option decodes to its code, to be rejected as invalid."""
+    assert codec.decode_compact(compact(code=9))["option"] == "9"
+
+
+@pytest.mark.parametrize("payload", [b"", bytes((2,)) + compact()[1:]])
+def test_unknown_version_rejected(payload):
+    """Test empty payloads and other format versions are rejected."""
+    with pytest.raises(ValueError, match="unsupported entry version"):
+        codec.decode_compact(payload)
+
+
+def test_truncated_entry_rejected():
+    """Test every truncation of a valid entry is rejected."""
+    payload = compact(ip=bytes((10, 0, 0, 1)), agent=b"curl/8.0")
+
+    for length in range(1, len(payload)):
+        with pytest.raises(ValueError, match="truncated"):
+            codec.decode_compact(payload[:length])
+
+
+def test_ip_length_past_end_rejected():
+    """Test an IP length longer than the rest of the entry is rejected."""
+    with pytest.raises(ValueError, match="truncated"):
+        codec.decode_compact(compact(ip=bytes((10, 0, 0, 1)), ip_length=16))
+
+
+def test_invalid_ip_length_rejected():
+    """Test an IP length other than 0, 4 or 16 is rejected."""
+    with pytest.raises(ValueError, match="invalid source IP length"):
+        codec.decode_compact(compact(ip=bytes(5)))
+
+
+def test_user_agent_length_past_end_rejected():
+    """Test a User-Agent length longer than the entry is rejected."""
+    with pytest.raises(ValueError, match="truncated"):
+        codec.decode_compact(compact(agent=b"curl", ua_length=5))
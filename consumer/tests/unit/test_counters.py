@@ -0,0 +1,148 @@
+"""Unit tests for the Redis vote counters and their write-behind flush."""
+from datetime import datetime, timezone
+
+import pytest
+import redis.asyncio as redis
+
+from config import Config
+import counters
+import db_client
+
+STREAM = "votes"
+OWNER = "consumer-1"
+MINUTE = datetime(2025, 11, 15, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def flushes(fake_redis, fake_db, monkeypatch):
+    """Arguments of every db_client.flush_counters() call, in order."""
+    monkeypatch.setattr(Config, "STREAM_NAME", STREAM)
+    monkeypatch.setattr(Config, "STREAM_PARTITIONS", 1)
+    calls = []
+    flush_counters = db_client.flush_counters
+
+    async def record(*args):
+        calls.append(args)
+        return await flush_counters(*args)
+
+    monkeypatch.setattr(db_client, "flush_counters", record)
+    return calls
+
+
+async def commit(expected_id: str, last_id: str, cats: int = 0, dogs: int = 0):
+    """Apply one batch of cat/dog votes, all in MINUTE."""
+    events = [("cats", MINUTE, None, None)] * cats
+    events += [("dogs", MINUTE, None, None)] * dogs
+    return await counters.commit_batch(
+        STREAM, OWNER, expected_id, last_id, cats, dogs, events, {MINUTE: [cats, dogs]}
+    )
+
+
+@pytest.mark.asyncio
+async def test_checkpoint_conflict_applies_nothing(flushes):
+    """Test a batch filtered against a stale checkpoint is rejected whole."""
+    await counters.seed()
+    assert await commit("0-0", "3-0", cats=2) == {"cats": 2, "dogs": 0}
+
+    with pytest.raises(db_client.CheckpointConflictError):
+        await commit("0-0", "5-0", dogs=4)
+
+    assert await counters.load_checkpoint(STREAM, OWNER) == "3-0"
+    assert await commit("3-0", "5-0", dogs=4) == {"cats": 2, "dogs": 4}
+
+
+@pytest.mark.asyncio
+async def test_unseeded_counters_refuse_batches_until_seeded(fake_db, flushes):
+    """Test batches fail with NOSEED, then apply on top of PostgreSQL's counts."""
+    with pytest.raises(redis.ResponseError, match="NOSEED"):
+        await commit("0-0", "1-0", cats=1)
+
+    # State of the last flush before Redis lost the counters
+    fake_db.counts = {"cats": 10, "dogs": 7}
+    fake_db.flushed_version = 4
+    fake_db.checkpoints[(STREAM, Config.CONSUMER_GROUP, OWNER)] = "8-0"
+    await counters.seed()
+
+    assert await counters.load_checkpoint(STREAM, OWNER) == "8-0"
+    assert await commit("8-0", "9-0", dogs=1) == {"cats": 10, "dogs": 8}
+
+    # Seeding again keeps the live counters
+    await counters.seed()
+    assert await commit("9-0", "10-0", cats=1) == {"cats": 11, "dogs": 8}
+
+
+@pytest.mark.asyncio
+async def test_flush_snapshots_each_version_once(fake_db, flushes):
+    """Test a flush persists the latest version and skips when nothing changed."""
+    await counters.seed()
+    assert not await counters.flush()
+
+    await commit("0-0", "1-0", cats=2)
+    await commit("1-0", "2-0", dogs=1)
+    assert await counters.flush()
+
+    _, version, cats, dogs, _, checkpoints, rollups, events = flushes[-1]
+    assert (version, cats, dogs) == (2, 2, 1)
+    assert checkpoints == {(STREAM, OWNER): "2-0"}
+    assert rollups == {MINUTE: [2, 1]}
+    assert [event[0] for event in events] == ["cats", "cats", "dogs"]
+
+    assert not await counters.flush()
+    assert len(flushes) == 1
+
+    # Only what was applied since the last flush is queued again
+    await commit("2-0", "3-0", cats=1)
+    assert await counters.flush()
+    _, version, cats, _, _, _, rollups, events = flushes[-1]
+    assert (version, cats, rollups, len(events)) == (3, 3, {MINUTE: [1, 0]}, 1)
+    assert fake_db.flushed_version == 3
+
+
+@pytest.mark.asyncio
+async def test_unfinished_snapshot_flushed_before_newer_batches(
+    fake_db, flushes, monkeypatch
+):
+    """Test a failed flush is retried with the same snapshot, not a newer one."""
+    await counters.seed()
+    await commit("0-0", "1-0", cats=1)
+    record = db_client.flush_counters
+
+    async def unavailable(*args):
+        raise ConnectionError("database unavailable")
+
+    monkeypatch.setattr(db_client, "flush_counters", unavailable)
+    with pytest.raises(ConnectionError):
+        await counters.flush()
+    monkeypatch.setattr(db_client, "flush_counters", record)
+
+    await commit("1-0", "2-0", dogs=1)
+
+    assert await counters.flush()
+    assert [call[1] for call in flushes] == [1]
+    assert fake_db.counts == {"cats": 1, "dogs": 0}
+    assert await counters.flush()
+    assert [call[1] for call in flushes] == [1, 2]
+    assert fake_db.counts == {"cats": 1, "dogs": 1}
+
+
+@pytest.mark.asyncio
+async def test_reflush_of_same_version_is_noop(fake_db, flushes, monkeypatch):
+    """Test a snapshot flushed but not finished is not applied twice."""
+    await counters.seed()
+    await commit("0-0", "1-0", cats=3)
+
+    finish = counters._FINISH_SCRIPT
+    monkeypatch.setattr(
+        counters, "_FINISH_SCRIPT", "return redis.error_reply('ERR connection lost')"
+    )
+    with pytest.raises(redis.ResponseError):
+        await counters.flush()
+    assert fake_db.flushed_version == 1
+    monkeypatch.setattr(counters, "_FINISH_SCRIPT", finish)
+
+    # Same version again: flush_counters() skips it and the snapshot is dropped
+    assert not await counters.flush()
+    assert [call[1] for call in flushes] == [1, 1]
+    assert fake_db.counts == {"cats": 3, "dogs": 0}
+    assert not await counters.flush()
+    assert len(flushes) == 2
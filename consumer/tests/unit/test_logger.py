@@ -0,0 +1,48 @@
+"""Unit tests for per-batch event summaries."""
+import asyncio
+
+import pytest
+from structlog.testing import capture_logs
+
+from config import Config
+import logger
+
+
+@pytest.fixture
+def summary(monkeypatch):
+    """A summary whose logger first logs while logs are captured."""
+    monkeypatch.setattr(logger, "_summaries", [])
+    with capture_logs() as logs:
+        yield logger.Summary("batches_summary"), logs
+
+
+@pytest.mark.asyncio
+async def test_summarizer_logs_each_interval(summary, monkeypatch):
+    """Test counts are logged once per interval, and idle intervals are skipped."""
+    monkeypatch.setattr(Config, "LOG_SUMMARY_INTERVAL_S", 0.05)
+    batches, logs = summary
+    batches.add(batches=1, cats=2)
+    batches.add(batches=1, dogs=1)
+
+    task = asyncio.create_task(logger.summarizer())
+    await asyncio.sleep(0.12)
+    task.cancel()
+
+    assert len(logs) == 1
+    assert logs[0]["event"] == "batches_summary"
+    assert logs[0]["log_level"] == "info"
+    assert {key: logs[0][key] for key in ("batches", "cats", "dogs")} == {
+        "batches": 2, "cats": 2, "dogs": 1
+    }
+
+
+def test_flush_summaries_logs_what_is_left(summary):
+    """Test shutdown logs counts added since the last interval."""
+    batches, logs = summary
+    logger.flush_summaries()
+    assert logs == []
+
+    batches.add(messages=5)
+    logger.flush_summaries()
+
+    assert [entry["messages"] for entry in logs] == [5]
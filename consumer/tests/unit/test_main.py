@@ -0,0 +1,63 @@
+"""Unit tests for the consumer's pipeline restart loop."""
+import asyncio
+
+import pytest
+
+import main
+import pipeline
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record the restart pauses instead of waiting them out."""
+    monkeypatch.setattr(main, "shutdown_flag", False)
+    delays = []
+    sleep = asyncio.sleep
+
+    async def recording_sleep(delay, *args, **kwargs):
+        delays.append(delay)
+        await sleep(0)
+
+    monkeypatch.setattr(asyncio, "sleep", recording_sleep)
+    return delays
+
+
+def fail_with(monkeypatch, errors: list[Exception]) -> list[int]:
+    """Make pipeline.run raise each error in turn, then stop the consumer."""
+    runs = []
+
+    async def run(should_stop):
+        runs.append(len(runs))
+        if runs[-1] < len(errors):
+            raise errors[runs[-1]]
+        main.shutdown_flag = True
+
+    monkeypatch.setattr(pipeline, "run", run)
+    return runs
+
+
+@pytest.mark.asyncio
+async def test_any_error_restarts_pipeline(sleeps, monkeypatch):
+    """Test errors other than PipelineAborted restart instead of exiting."""
+    runs = fail_with(monkeypatch, [
+        ConnectionError("Redis down"),
+        pipeline.PipelineAborted("batch commit failed"),
+        OSError("PostgreSQL down"),
+    ])
+
+    await main.process_loop()
+
+    assert len(runs) == 4
+    assert len(sleeps) == 3
+
+
+@pytest.mark.asyncio
+async def test_restart_backs_off(sleeps, monkeypatch):
+    """Test consecutive restarts double the pause up to MAX_RESTART_DELAY_S."""
+    monkeypatch.setattr(main, "RESTART_DELAY_S", 1.0)
+    monkeypatch.setattr(main, "MAX_RESTART_DELAY_S", 4.0)
+    fail_with(monkeypatch, [ConnectionError("Redis down")] * 5)
+
+    await main.process_loop()
+
+    assert sleeps == [1.0, 2.0, 4.0, 4.0, 4.0]
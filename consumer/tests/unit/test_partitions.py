@@ -0,0 +1,107 @@
+"""Unit tests for stream partition leases."""
+import asyncio
+
+import pytest
+
+from config import Config
+import partitions
+
+STREAMS = [f"votes:{n}" for n in range(4)]
+LEASE_TTL_MS = 200
+
+
+@pytest.fixture
+def client(fake_redis, monkeypatch):
+    """Fakeredis with four partitions and short leases."""
+    monkeypatch.setattr(Config, "STREAM_NAME", "votes")
+    monkeypatch.setattr(Config, "STREAM_PARTITIONS", 4)
+    monkeypatch.setattr(Config, "LEASE_TTL_MS", LEASE_TTL_MS)
+    # Switched by rebalance_as(); restored after the test
+    monkeypatch.setattr(Config, "CONSUMER_NAME", "consumer-a")
+    monkeypatch.setattr(partitions, "_owned", [])
+    return fake_redis
+
+
+async def rebalance_as(consumer: str, owned: dict[str, list[str]]) -> list[str]:
+    """Rebalance as one consumer, keeping each consumer's leases in owned."""
+    Config.CONSUMER_NAME = consumer
+    partitions._owned[:] = owned.get(consumer, [])
+    owned[consumer] = await partitions.rebalance()
+    return owned[consumer]
+
+
+@pytest.mark.asyncio
+async def test_single_partition_needs_no_leases(client, monkeypatch):
+    """Test an unpartitioned stream is always read, without leases."""
+    monkeypatch.setattr(Config, "STREAM_PARTITIONS", 1)
+
+    assert partitions.owned_streams() == ["votes"]
+    assert partitions.all_streams() == ["votes"]
+
+
+@pytest.mark.asyncio
+async def test_two_consumers_split_partitions(client):
+    """Test the first consumer gives up half its leases once a second joins."""
+    owned: dict[str, list[str]] = {}
+
+    assert sorted(await rebalance_as("consumer-a", owned)) == STREAMS
+
+    # b joins: its fair share is 2, but a still holds every lease
+    assert len(await rebalance_as("consumer-b", owned)) == 0
+    assert len(await rebalance_as("consumer-a", owned)) == 2
+    assert len(await rebalance_as("consumer-b", owned)) == 2
+
+    assert sorted(owned["consumer-a"] + owned["consumer-b"]) == STREAMS
+    for consumer, streams in owned.items():
+        for stream in streams:
+            assert await client.get(f"{stream}:lease") == consumer
+
+
+@pytest.mark.asyncio
+async def test_dead_consumer_leases_taken_over(client):
+    """Test leases of a consumer that stopped renewing expire and move."""
+    owned: dict[str, list[str]] = {}
+    await rebalance_as("consumer-a", owned)
+    await rebalance_as("consumer-b", owned)
+    await rebalance_as("consumer-a", owned)
+    await rebalance_as("consumer-b", owned)
+
+    # a crashes: its heartbeat and leases expire after LEASE_TTL_MS
+    await asyncio.sleep(LEASE_TTL_MS * 1.5 / 1000)
+    assert sorted(await rebalance_as("consumer-b", owned)) == STREAMS
+
+
+@pytest.mark.asyncio
+async def test_leases_renewed_while_alive(client):
+    """Test a consumer that keeps rebalancing keeps its leases."""
+    owned: dict[str, list[str]] = {}
+    await rebalance_as("consumer-a", owned)
+
+    for _ in range(3):
+        await asyncio.sleep(LEASE_TTL_MS * 0.6 / 1000)
+        assert sorted(await rebalance_as("consumer-a", owned)) == STREAMS
+
+
+@pytest.mark.asyncio
+async def test_release_all_frees_leases_at_once(client):
+    """Test released leases are free for others before their TTL runs out."""
+    owned: dict[str, list[str]] = {}
+    await rebalance_as("consumer-a", owned)
+
+    await partitions.release_all()
+
+    assert partitions.owned_streams() == []
+    assert await client.zrange("votes:consumers", 0, -1) == []
+    assert sorted(await rebalance_as("consumer-b", owned)) == STREAMS
+
+
+@pytest.mark.asyncio
+async def test_release_keeps_leases_taken_over(client):
+    """Test releasing does not delete a lease another consumer now holds."""
+    owned: dict[str, list[str]] = {}
+    await rebalance_as("consumer-a", owned)
+    await client.set("votes:0:lease", "consumer-b")
+
+    await partitions.release_all()
+
+    assert await client.get("votes:0:lease") == "consumer-b"
@@ -0,0 +1,201 @@
+"""Unit tests for the staged processing pipeline."""
+import asyncio
+
+import pytest
+
+from config import Config
+import db_client
+import pipeline
+import processor
+import redis_client
+import retries
+
+STREAM = "votes"
+OWNER = "consumer-1"
+
+
+def batch(*ids: str) -> list[tuple[str, dict]]:
+    """Build a batch of cat votes with the given IDs."""
+    return [(message_id, {"option": "cats"}) for message_id in ids]
+
+
+class Commits:
+    """Stand-in for processor.process_batch() and redis_client.ack_messages()."""
+
+    def __init__(self) -> None:
+        # Seconds a commit takes, by its first message ID
+        self.delays: dict[str, float] = {}
+        # First message ID whose commit raises, with the error
+        self.failures: dict[str, Exception] = {}
+        self.committed: list[str] = []
+        self.acked: list[str] = []
+
+    async def process_batch(self, stream, messages, owner, writer=None) -> list[str]:
+        first_id = messages[0][0]
+        await asyncio.sleep(self.delays.get(first_id, 0))
+        if first_id in self.failures:
+            raise self.failures[first_id]
+        self.committed.append(first_id)
+        return [message_id for message_id, _ in messages]
+
+    async def ack_messages(self, message_ids: dict[str, list[str]]) -> int:
+        for ids in message_ids.values():
+            self.acked.extend(ids)
+        return sum(len(ids) for ids in message_ids.values())
+
+
+@pytest.fixture
+def commits(fake_db, monkeypatch):
+    """Record commits and acknowledgements instead of writing them."""
+    fake = Commits()
+    monkeypatch.setattr(processor, "process_batch", fake.process_batch)
+    monkeypatch.setattr(redis_client, "ack_messages", fake.ack_messages)
+    monkeypatch.setattr(Config, "STREAM_PARTITIONS", 1)
+    monkeypatch.setattr(Config, "TRIM_INTERVAL_S", 0)
+    monkeypatch.setattr(Config, "WRITER_CONCURRENCY", 3)
+    return fake
+
+
+async def run_writers(
+    queued: list[tuple[str, str, list]], count: int = 3
+) -> pipeline.CommitOrder:
+    """Queue batches in read order, run writers and the acker until done."""
+    batches: asyncio.Queue = asyncio.Queue()
+    acks: asyncio.Queue = asyncio.Queue()
+    order = pipeline.CommitOrder()
+
+    for stream, owner, messages in queued:
+        ticket = order.ticket((stream, owner))
+        batches.put_nowait((stream, owner, ticket, messages))
+
+    tasks = [
+        asyncio.create_task(pipeline.writer(i, batches, acks, order))
+        for i in range(count)
+    ]
+    tasks.append(asyncio.create_task(pipeline.acker(acks)))
+    try:
+        await asyncio.wait_for(pipeline._drain(batches, acks), 2)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    return order
+
+
+@pytest.mark.asyncio
+async def test_commits_follow_ticket_order(commits):
+    """Test a slow first batch holds back later batches of its checkpoint only."""
+    commits.delays = {"1-0": 0.05}
+
+    await run_writers([
+        (STREAM, OWNER, batch("1-0")),
+        (STREAM, OWNER, batch("2-0")),
+        ("votes:retry:1", OWNER, batch("9-0")),
+        (STREAM, OWNER, batch("3-0")),
+    ])
+
+    # The other checkpoint committed while the first batch was in flight
+    assert commits.committed == ["9-0", "1-0", "2-0", "3-0"]
+    assert sorted(commits.acked) == ["1-0", "2-0", "3-0", "9-0"]
+
+
+@pytest.mark.asyncio
+async def test_abort_releases_waiting_writers(commits):
+    """Test a checkpoint conflict fails the batches queued behind it."""
+    commits.delays = {"1-0": 0.02}
+    commits.failures = {"1-0": db_client.CheckpointConflictError("moved")}
+
+    order = await run_writers([
+        (STREAM, OWNER, batch("1-0")),
+        (STREAM, OWNER, batch("2-0")),
+        (STREAM, OWNER, batch("3-0")),
+    ])
+
+    assert order.aborted
+    # Left pending for the next run to re-read
+    assert commits.committed == []
+    assert commits.acked == []
+
+
+@pytest.mark.asyncio
+async def test_wait_turn_raises_once_aborted():
+    """Test writers blocked on a ticket are woken and fail on abort."""
+    order = pipeline.CommitOrder()
+    key = (STREAM, OWNER)
+    order.ticket(key)
+    waiting = asyncio.create_task(order.wait_turn(key, order.ticket(key)))
+    await asyncio.sleep(0)
+
+    await order.abort()
+
+    with pytest.raises(pipeline.PipelineAborted):
+        await asyncio.wait_for(waiting, 1)
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_deferred_without_blocking(commits, monkeypatch):
+    """Test a batch that fails to commit is deferred and later batches commit."""
+    commits.failures = {"1-0": RuntimeError("database unavailable")}
+    deferred = []
+
+    async def defer_batch(stream, owner, messages, error):
+        deferred.append((messages[0][0], str(error)))
+        return []
+
+    monkeypatch.setattr(pipeline, "defer_batch", defer_batch)
+
+    order = await run_writers([
+        (STREAM, OWNER, batch("1-0")),
+        (STREAM, OWNER, batch("2-0")),
+    ])
+
+    assert not order.aborted
+    assert deferred == [("1-0", "database unavailable")]
+    assert commits.committed == ["2-0"]
+
+
+def start_pipeline(monkeypatch, queued: list[list]) -> asyncio.Task:
+    """Run the pipeline with a reader that submits batches, then stops it."""
+
+    async def reader(submit, should_stop):
+        for messages in queued:
+            await submit(STREAM, messages, OWNER)
+        pipeline.request_stop()
+        await asyncio.Event().wait()
+
+    async def scheduler(submit, should_stop):
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(pipeline, "reader", reader)
+    monkeypatch.setattr(retries, "scheduler", scheduler)
+
+    return asyncio.create_task(pipeline.run(lambda: False))
+
+
+@pytest.mark.asyncio
+async def test_stop_drains_queued_batches(commits, monkeypatch):
+    """Test batches queued when stop is requested are still committed."""
+    monkeypatch.setattr(Config, "DRAIN_TIMEOUT_S", 2)
+    commits.delays = {"1-0": 0.02, "2-0": 0.02, "3-0": 0.02}
+
+    await asyncio.wait_for(
+        start_pipeline(monkeypatch, [batch("1-0"), batch("2-0"), batch("3-0")]), 2
+    )
+
+    assert commits.committed == ["1-0", "2-0", "3-0"]
+    assert commits.acked == ["1-0", "2-0", "3-0"]
+
+
+@pytest.mark.asyncio
+async def test_drain_timeout_cancels_queued_batches(commits, monkeypatch):
+    """Test batches not committed within DRAIN_TIMEOUT_S are left pending."""
+    monkeypatch.setattr(Config, "DRAIN_TIMEOUT_S", 0.05)
+    commits.delays = {"2-0": 60}
+
+    await asyncio.wait_for(
+        start_pipeline(monkeypatch, [batch("1-0"), batch("2-0"), batch("3-0")]), 2
+    )
+
+    assert commits.committed == ["1-0"]
+    assert commits.acked == ["1-0"]
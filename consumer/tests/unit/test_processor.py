@@ -0,0 +1,150 @@
+"""Unit tests for vote batch processing."""
+from datetime import datetime, timezone
+
+import pytest
+
+from config import Config
+import db_client
+import processor
+
+STREAM = "votes"
+OWNER = "consumer-1"
+CHECKPOINT_KEY = (STREAM, Config.CONSUMER_GROUP, OWNER)
+
+
+def vote(option: str, timestamp_ms: int = 1_700_000_000_000) -> dict:
+    """Build the message data of one vote."""
+    return {"option": option, "timestamp": str(timestamp_ms)}
+
+
+def test_stream_id_key_orders_numerically():
+    """Test IDs compare by milliseconds, then sequence, not as strings."""
+    assert processor.stream_id_key("1700000000000-5") == (1700000000000, 5)
+    assert processor.stream_id_key("9-0") < processor.stream_id_key("10-0")
+    assert processor.stream_id_key("10-2") < processor.stream_id_key("10-10")
+
+
+def test_stream_id_key_without_sequence():
+    """Test an ID without a sequence part sorts as sequence 0."""
+    assert processor.stream_id_key("0") == (0, 0)
+    assert processor.stream_id_key("42") == processor.stream_id_key("42-0")
+
+
+def test_fold_batch_counts_valid_votes():
+    """Test valid votes become deltas and audit rows, the rest are rejected."""
+    messages = [
+        ("1-0", vote("cats")),
+        ("2-0", vote("dogs")),
+        ("3-0", vote("cats")),
+        ("4-0", {"timestamp": "1"}),
+        ("5-0", vote("birds")),
+    ]
+
+    deltas, events, malformed_ids = processor.fold_batch(messages)
+
+    assert deltas == {"cats": 2, "dogs": 1}
+    assert [event[0] for event in events] == ["cats", "dogs", "cats"]
+    assert malformed_ids == ["4-0", "5-0"]
+
+
+def test_fold_batch_audit_fields():
+    """Test audit rows fall back to the ID time and drop invalid IPs."""
+    messages = [
+        ("1-0", {**vote("cats"), "source_ip": "10.0.0.1", "user_agent": "curl"}),
+        ("1700000000500-0", {"option": "dogs", "source_ip": "not-an-ip"}),
+    ]
+
+    _, events, _ = processor.fold_batch(messages)
+
+    assert events[0] == (
+        "cats",
+        datetime.fromtimestamp(1_700_000_000, tz=timezone.utc),
+        "10.0.0.1",
+        "curl",
+    )
+    assert events[1] == (
+        "dogs",
+        datetime.fromtimestamp(1_700_000_000.5, tz=timezone.utc),
+        None,
+        None,
+    )
+
+
+def test_minute_rollups_bucket_by_minute():
+    """Test votes are counted per option in their UTC minute."""
+    minute = 1_700_000_040_000
+    messages = [
+        ("1-0", vote("cats", minute)),
+        ("2-0", vote("cats", minute + 59_999)),
+        ("3-0", vote("dogs", minute + 30_000)),
+        ("4-0", vote("dogs", minute + 60_000)),
+    ]
+    _, events, _ = processor.fold_batch(messages)
+
+    rollups = processor.minute_rollups(events)
+
+    first = datetime.fromtimestamp(minute / 1000, tz=timezone.utc)
+    second = datetime.fromtimestamp((minute + 60_000) / 1000, tz=timezone.utc)
+    assert rollups == {first: [2, 1], second: [0, 1]}
+
+
+def test_minute_rollups_empty():
+    """Test a batch without votes has no rollups."""
+    assert processor.minute_rollups([]) == {}
+
+
+@pytest.mark.asyncio
+async def test_process_batch_commits_and_advances_checkpoint(fake_db):
+    """Test a batch is committed once and moves the checkpoint to its end."""
+    messages = [("1-0", vote("cats")), ("2-0", vote("dogs")), ("3-0", vote("cats"))]
+
+    acked = await processor.process_batch(STREAM, messages, OWNER)
+
+    assert acked == ["1-0", "2-0", "3-0"]
+    assert fake_db.counts == {"cats": 2, "dogs": 1}
+    assert fake_db.checkpoints[CHECKPOINT_KEY] == "3-0"
+    assert await processor.get_checkpoint(STREAM, OWNER) == "3-0"
+
+
+@pytest.mark.asyncio
+async def test_process_batch_skips_applied_entries(fake_db):
+    """Test entries at or below the checkpoint are acknowledged, not counted."""
+    applied = [("1-0", vote("cats")), ("2-0", vote("cats"))]
+    await processor.process_batch(STREAM, applied, OWNER)
+
+    # Redelivered after a crash between commit and XACK, with one new entry
+    messages = [("1-0", vote("cats")), ("2-0", vote("cats")), ("3-0", vote("dogs"))]
+    acked = await processor.process_batch(STREAM, messages, OWNER)
+
+    assert acked == ["1-0", "2-0", "3-0"]
+    assert fake_db.counts == {"cats": 2, "dogs": 1}
+
+
+@pytest.mark.asyncio
+async def test_process_batch_fully_applied_commits_nothing(fake_db):
+    """Test a batch that was already applied makes no commit."""
+    messages = [("1-0", vote("cats"))]
+    await processor.process_batch(STREAM, messages, OWNER)
+    round_trips = fake_db.round_trips
+
+    assert await processor.process_batch(STREAM, messages, OWNER) == ["1-0"]
+    assert fake_db.round_trips == round_trips
+    assert fake_db.counts == {"cats": 1, "dogs": 0}
+
+
+@pytest.mark.asyncio
+async def test_process_batch_checkpoint_conflict(fake_db):
+    """Test a conflicting commit applies nothing and reloads the checkpoint."""
+    await processor.process_batch(STREAM, [("1-0", vote("cats"))], OWNER)
+    # Another writer commits a later batch of the same owner
+    fake_db.checkpoints[CHECKPOINT_KEY] = "5-0"
+    messages = [("2-0", vote("dogs"))]
+
+    with pytest.raises(db_client.CheckpointConflictError):
+        await processor.process_batch(STREAM, messages, OWNER)
+
+    assert fake_db.counts == {"cats": 1, "dogs": 0}
+    assert (STREAM, OWNER) not in processor._checkpoints
+    # Reloaded on next use, so the redelivered entry is skipped
+    assert await processor.process_batch(STREAM, messages, OWNER) == ["2-0"]
+    assert fake_db.counts == {"cats": 1, "dogs": 0}
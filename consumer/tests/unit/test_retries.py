@@ -0,0 +1,139 @@
+"""Unit tests for the retry and dead-letter streams."""
+import time
+
+import pytest
+import pytest_asyncio
+
+from config import Config
+import redis_client
+import retries
+
+STREAM = "votes"
+
+
+@pytest_asyncio.fixture
+async def client(fake_redis, monkeypatch):
+    """Fakeredis with the consumer group on the vote and retry streams."""
+    monkeypatch.setattr(Config, "STREAM_NAME", STREAM)
+    monkeypatch.setattr(Config, "MAX_RETRIES", 2)
+    monkeypatch.setattr(Config, "RETRY_BASE_DELAY_MS", 1000)
+
+    for name in [STREAM, *retries.retry_streams(STREAM)]:
+        await redis_client.ensure_consumer_group(name)
+
+    return fake_redis
+
+
+async def read_new(stream: str) -> list[tuple[str, dict]]:
+    """Read every new entry of a stream as this consumer."""
+    return await redis_client.read_backlog(stream, ">", 100)
+
+
+def test_retry_stream_names():
+    """Test retry streams are named and levelled per source stream."""
+    assert retries.retry_stream("votes:3", 2) == "votes:3:retry:2"
+    assert retries.retry_level("votes:3:retry:2") == 2
+    assert retries.retry_level("votes:3") == 0
+
+
+def test_retry_delay_doubles_per_level(monkeypatch):
+    """Test each retry level waits twice as long as the one before."""
+    monkeypatch.setattr(Config, "RETRY_BASE_DELAY_MS", 250)
+
+    delays = [retries.retry_delay_ms(level) for level in (1, 2, 3)]
+    assert delays == [250, 500, 1000]
+
+
+@pytest.mark.asyncio
+async def test_failed_entries_move_through_levels_to_dead_letter(client):
+    """Test a failing entry goes through each retry level to the dead letters."""
+    source_id = await client.xadd(STREAM, {"option": "cats", "timestamp": "1"})
+
+    stream = STREAM
+    for attempts in (1, 2, 3):
+        messages = await read_new(stream)
+        assert await retries.defer(stream, messages, f"failure {attempts}") == 1
+        # Acknowledged where it failed, so it is not redelivered there
+        assert (await client.xpending(stream, Config.CONSUMER_GROUP))["pending"] == 0
+
+        stream = (
+            retries.retry_stream(STREAM, attempts)
+            if attempts <= Config.MAX_RETRIES
+            else retries.dead_letter_stream()
+        )
+        [(_, fields)] = await client.xrange(stream)
+        assert fields == {
+            "option": "cats",
+            "timestamp": "1",
+            "source_stream": STREAM,
+            "source_id": source_id,
+            "attempts": str(attempts),
+            "error": f"failure {attempts}",
+        }
+
+    assert stream == "votes:dead-letter"
+
+
+@pytest.mark.asyncio
+async def test_defer_skips_entries_no_longer_pending(client):
+    """Test entries already acknowledged are not moved again."""
+    await client.xadd(STREAM, {"option": "dogs"})
+    messages = await read_new(STREAM)
+
+    assert await retries.defer(STREAM, messages, "failed") == 1
+    assert await retries.defer(STREAM, messages, "failed again") == 0
+    assert await client.xlen(retries.retry_stream(STREAM, 1)) == 1
+
+
+@pytest.mark.asyncio
+async def test_due_entries_submitted_back(client):
+    """Test due retry entries are handed to the writers one at a time."""
+    now_ms = int(time.time() * 1000)
+    retry = retries.retry_stream(STREAM, 1)
+    due_ids = [
+        await client.xadd(
+            retry, {"option": "cats", "source_stream": STREAM}, id=entry_id
+        )
+        for entry_id in (f"{now_ms - 5000}-0", f"{now_ms - 2000}-0")
+    ]
+    later_id = await client.xadd(retry, {"option": "dogs"}, id=f"{now_ms + 60_000}-0")
+
+    submitted = []
+
+    async def submit(stream, batch, owner):
+        submitted.append((stream, batch, owner))
+
+    held: list[tuple[str, dict]] = []
+    await retries._release_due(retry, held, {}, submit, lambda: False)
+
+    assert [(stream, len(batch)) for stream, batch, _ in submitted] == [
+        (retry, 1),
+        (retry, 1),
+    ]
+    assert [batch[0][0] for _, batch, _ in submitted] == due_ids
+    assert submitted[0][1][0][1]["source_stream"] == STREAM
+    assert {owner for _, _, owner in submitted} == {Config.CONSUMER_NAME}
+    # Not due yet: held for a later pass
+    assert [message_id for message_id, _ in held] == [later_id]
+
+
+@pytest.mark.asyncio
+async def test_pending_retry_entries_redelivered_first(client):
+    """Test entries this consumer left pending are released before new ones."""
+    retry = retries.retry_stream(STREAM, 1)
+    old_ms = int(time.time() * 1000) - 5000
+    pending_id = await client.xadd(retry, {"option": "cats"}, id=f"{old_ms}-0")
+    # Read by an earlier run and never acknowledged
+    await read_new(retry)
+    new_id = await client.xadd(retry, {"option": "dogs"}, id=f"{old_ms}-1")
+
+    submitted = []
+
+    async def submit(stream, batch, owner):
+        submitted.extend(message_id for message_id, _ in batch)
+
+    cursors: dict[str, str] = {}
+    await retries._release_due(retry, [], cursors, submit, lambda: False)
+
+    assert submitted == [pending_id, new_id]
+    assert cursors[retry] == ">"
@@ -0,0 +1,129 @@
+"""Unit tests for the worker supervisor and the shared heartbeats."""
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+
+import pytest
+
+from config import Config
+import health
+import supervisor
+
+WORKERS = 2
+
+
+@pytest.fixture(autouse=True)
+def slots(monkeypatch):
+    """Fresh shared heartbeat slots for WORKERS workers, as at import."""
+    monkeypatch.setattr(Config, "WORKER_PROCESSES", WORKERS)
+    monkeypatch.setattr(Config, "WORKER_SHUTDOWN_TIMEOUT_S", 5)
+    monkeypatch.setattr(health, "_beats", multiprocessing.RawArray("d", WORKERS))
+    monkeypatch.setattr(health, "_ready", multiprocessing.RawArray("b", WORKERS))
+    monkeypatch.setattr(health, "_slot", 0)
+    for index in range(WORKERS):
+        health.reset_slot(index)
+
+
+@pytest.fixture
+def supervised(monkeypatch):
+    """Supervisor state and signal handlers, restored after the test."""
+    handlers = {sig: signal.getsignal(sig) for sig in (signal.SIGTERM, signal.SIGINT)}
+    monkeypatch.setattr(supervisor, "shutdown_requested", False)
+    monkeypatch.setattr(supervisor, "RESTART_DELAY_S", 0)
+
+    started = []
+    start_worker = supervisor.start_worker
+
+    def counting_start_worker(ctx, index, target):
+        started.append(index)
+        return start_worker(ctx, index, target)
+
+    monkeypatch.setattr(supervisor, "start_worker", counting_start_worker)
+    yield started
+
+    for sig, handler in handlers.items():
+        signal.signal(sig, handler)
+
+
+def test_crash_loop_exits(supervised, monkeypatch):
+    """Test crashed workers are restarted until MAX_CRASHES, then the pod exits."""
+    monkeypatch.setattr(supervisor, "MAX_CRASHES", 3)
+
+    with pytest.raises(SystemExit) as exc_info:
+        supervisor.run(lambda: sys.exit(1))
+
+    assert exc_info.value.code == 1
+    # Both workers, then a restart after each crash but the last
+    assert len(supervised) == WORKERS + 2
+
+
+def test_crashed_worker_restarts_under_its_name(supervised, monkeypatch, tmp_path):
+    """Test a crashed worker comes back under the same name, then drains on SIGTERM."""
+    monkeypatch.setattr(Config, "WORKER_PROCESSES", 1)
+
+    def target():
+        runs = tmp_path / "runs"
+        with open(runs, "a") as f:
+            f.write(Config.CONSUMER_NAME + "\n")
+        if len(runs.read_text().splitlines()) == 1:
+            sys.exit(1)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        time.sleep(30)
+
+    def stop_after_restart():
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            runs = tmp_path / "runs"
+            if runs.exists() and len(runs.read_text().splitlines()) == 2:
+                break
+            time.sleep(0.01)
+        os.kill(os.getpid(), signal.SIGTERM)
+
+    threading.Thread(target=stop_after_restart, daemon=True).start()
+
+    with pytest.raises(SystemExit) as exc_info:
+        supervisor.run(target)
+
+    assert exc_info.value.code == 0
+    assert supervised == [0, 0]
+    name = supervisor.worker_name(0)
+    assert (tmp_path / "runs").read_text().splitlines() == [name, name]
+
+
+def test_stale_heartbeat_is_not_live(monkeypatch):
+    """Test one worker missing HEALTH_TIMEOUT_S of heartbeats fails liveness."""
+    monkeypatch.setattr(Config, "HEALTH_TIMEOUT_S", 0.05)
+    assert health.is_live()
+
+    time.sleep(0.1)
+    health.beat()  # slot 0 only
+    assert not health.is_live()
+
+    # A restarted worker starts from a fresh heartbeat
+    health.reset_slot(1)
+    assert health.is_live()
+
+
+def test_worker_heartbeat_is_shared():
+    """Test heartbeats and readiness written in a forked worker reach the parent."""
+    ctx = multiprocessing.get_context("fork")
+    health._beats[1] = 0.0
+    health.set_ready(True)
+    assert not health.is_ready()
+
+    def worker():
+        health.set_slot(1)
+        health.beat()
+        health.set_ready(True)
+
+    process = ctx.Process(target=worker)
+    process.start()
+    process.join()
+
+    assert process.exitcode == 0
+    assert health._beats[1] > 0
+    assert health.is_live()
+    assert health.is_ready()
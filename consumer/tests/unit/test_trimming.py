@@ -0,0 +1,89 @@
+"""Unit tests for stream trimming."""
+import pytest
+import pytest_asyncio
+
+from config import Config
+import redis_client
+import retries
+import trimming
+
+STREAM = "votes"
+AUDIT_GROUP = "audit"
+
+
+@pytest_asyncio.fixture
+async def client(fake_redis, monkeypatch):
+    """Fakeredis trimming exactly, so every entry below the floor goes."""
+    monkeypatch.setattr(Config, "STREAM_NAME", STREAM)
+    monkeypatch.setattr(Config, "STREAM_PARTITIONS", 1)
+    monkeypatch.setattr(Config, "MAX_RETRIES", 1)
+
+    # Approximate trimming only drops whole radix tree nodes (none of a
+    # stream this small); trimming exactly shows which entries are kept
+    async def trim_stream(stream: str, min_id: str) -> int:
+        return await fake_redis.xtrim(stream, minid=min_id, approximate=False)
+
+    monkeypatch.setattr(redis_client, "trim_stream", trim_stream)
+    return fake_redis
+
+
+async def deliver(client, stream: str, group: str, count: int, ack: int) -> None:
+    """Deliver count entries to a group and acknowledge the first ack of them."""
+    response = await client.xreadgroup(group, "reader", {stream: ">"}, count=count)
+    ids = [message_id for message_id, _ in response[0][1]] if response else []
+    if ack:
+        await client.xack(stream, group, *ids[:ack])
+
+
+async def entries(client, stream: str) -> list[str]:
+    """IDs left in a stream."""
+    return [message_id for message_id, _ in await client.xrange(stream)]
+
+
+@pytest.mark.asyncio
+async def test_pending_and_undelivered_entries_survive(client):
+    """Test only entries every group acknowledged are trimmed."""
+    await redis_client.ensure_consumer_group(STREAM)
+    await client.xgroup_create(STREAM, AUDIT_GROUP, id="0")
+    ids = [await client.xadd(STREAM, {"option": "cats"}) for _ in range(6)]
+    # Consumer group: 1-2 acknowledged, 3-4 pending, 5-6 not delivered
+    await deliver(client, STREAM, Config.CONSUMER_GROUP, count=4, ack=2)
+    # Second group: only 1-3 delivered and acknowledged
+    await deliver(client, STREAM, AUDIT_GROUP, count=3, ack=3)
+
+    assert await redis_client.get_trim_floor(STREAM) == ids[2]
+    assert await trimming.trim([STREAM]) == 2
+    assert await entries(client, STREAM) == ids[2:]
+
+    # Nothing pending: each group's floor is just past its last-delivered ID
+    await client.xack(STREAM, Config.CONSUMER_GROUP, *ids[2:4])
+    assert await trimming.trim([STREAM]) == 1
+    assert await entries(client, STREAM) == ids[3:]
+
+
+@pytest.mark.asyncio
+async def test_stream_without_groups_untouched(client):
+    """Test a stream no group reads has no floor and is not trimmed."""
+    ids = [await client.xadd(STREAM, {"option": "dogs"}) for _ in range(3)]
+
+    assert await redis_client.get_trim_floor(STREAM) is None
+    assert await trimming.trim([STREAM]) == 0
+    assert await entries(client, STREAM) == ids
+
+
+@pytest.mark.asyncio
+async def test_retry_streams_trimmed_like_vote_streams(client, monkeypatch):
+    """Test maintain() trims the retry streams of each stream it reads."""
+    monkeypatch.setattr(Config, "TRIM_INTERVAL_S", 0.01)
+    retry = retries.retry_stream(STREAM, 1)
+    kept = {}
+    for stream in (STREAM, retry):
+        await redis_client.ensure_consumer_group(stream)
+        ids = [await client.xadd(stream, {"option": "cats"}) for _ in range(3)]
+        await deliver(client, stream, Config.CONSUMER_GROUP, count=2, ack=1)
+        kept[stream] = ids[1:]
+
+    passes = iter([False, True])
+    await trimming.maintain(lambda: next(passes))
+
+    assert {stream: await entries(client, stream) for stream in kept} == kept
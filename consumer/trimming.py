@@ -0,0 +1,74 @@
+"""
+Stream trimming for voting consumer.
+
+Nothing else ever removes entries from the vote streams, so every
+Config.TRIM_INTERVAL_S the consumer trims each stream it reads, and its
+retry streams, with XTRIM MINID up to the oldest entry still pending in
+any consumer group (or not yet delivered to one). Only entries every
+group has acknowledged are removed, so Redis memory tracks the consumer
+backlog instead of every vote ever cast.
+"""
+import asyncio
+from typing import Callable
+
+import structlog
+
+from config import Config
+import metrics
+import partitions
+import redis_client
+import retries
+
+logger = structlog.get_logger()
+
+
+async def trim(streams: list[str]) -> int:
+    """
+    Trim acknowledged entries from the given streams.
+
+    Args:
+        streams: Streams to trim.
+
+    Returns:
+        Total number of entries removed.
+
+    Raises:
+        Exception: If Redis operations fail.
+    """
+    removed = 0
+
+    for stream in streams:
+        min_id = await redis_client.get_trim_floor(stream)
+        if min_id is None:
+            continue
+
+        count = await redis_client.trim_stream(stream, min_id)
+        if count:
+            metrics.ENTRIES_TRIMMED.labels(stream=stream).inc(count)
+            logger.debug("stream_trimmed", stream=stream, min_id=min_id, count=count)
+        removed += count
+
+    return removed
+
+
+async def maintain(should_stop: Callable[[], bool]) -> None:
+    """
+    Trim the streams this consumer reads until shutdown.
+
+    Args:
+        should_stop: Returns True once shutdown has been requested.
+    """
+    if not Config.TRIM_INTERVAL_S:
+        return
+
+    while not should_stop():
+        try:
+            await trim([
+                name
+                for stream in partitions.owned_streams()
+                for name in [stream, *retries.retry_streams(stream)]
+            ])
+        except Exception as e:
+            logger.error("stream_trim_error", error=str(e), exc_info=True)
+
+        await asyncio.sleep(Config.TRIM_INTERVAL_S)
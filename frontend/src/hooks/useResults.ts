@@ -1,5 +1,5 @@
 import { useState, useEffect, useCallback } from 'react';
-import { getResults } from '../services/api';
+import { getResults, subscribeResults } from '../services/api';
 import type { ResultsResponse, ApiError } from '../types/api';
 
 interface UseResultsResult {
@@ -33,6 +33,19 @@ export const useResults = (): UseResultsResult => {
     fetchResults();
   }, [fetchResults]);
 
+  // Live updates; the fetch above still covers browsers without EventSource
+  useEffect(() => {
+    try {
+      return subscribeResults((results) => {
+        setData(results);
+        setError(null);
+      });
+    } catch {
+      // API URL not configured; fetchResults() reports it
+      return undefined;
+    }
+  }, []);
+
   return {
     data,
     isLoading,
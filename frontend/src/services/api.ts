@@ -121,3 +121,22 @@ export const getResults = async (): Promise<ResultsResponse> => {
     } as ApiError;
   }
 };
+
+// Live results over Server-Sent Events; EventSource reconnects on its own
+// after errors, including when the server drops a slow client.
+// Returns a function closing the stream.
+export const subscribeResults = (
+  onResults: (results: ResultsResponse) => void,
+): (() => void) => {
+  if (typeof EventSource === 'undefined') {
+    return () => {};
+  }
+
+  const source = new EventSource(`${getApiBaseUrl()}/api/results/stream`);
+
+  source.addEventListener('results', (event) => {
+    onResults(JSON.parse((event as MessageEvent).data) as ResultsResponse);
+  });
+
+  return () => source.close();
+};